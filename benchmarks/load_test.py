@@ -0,0 +1,268 @@
+# benchmarks/load_test.py
+"""
+Load test: mixed traffic against the API with per-endpoint latency percentiles.
+
+The app runs in-process (ASGI transport, no network) or as a uvicorn server
+in a subprocess. N concurrent workers pick requests from a weighted mix of
+login, upload, dashboard, analysis and forecast calls until the duration has
+elapsed. The report is JSON: overall throughput plus count, errors and
+p50/p95/p99 latency per endpoint. Pass --compare with a previous report to
+print the change in p95 per endpoint.
+
+Run from the project root:
+    python benchmarks/load_test.py --concurrency 16 --duration 30 --output load.json
+    python benchmarks/load_test.py --mode uvicorn --workers 2 --compare load.json
+    python benchmarks/load_test.py --mix dashboard=5,cashflow=3,forecast=0
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import generate_statement, to_excel_bytes
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CREDENTIALS = {"username": "testuser", "password": "testpassword"}
+
+# Scenario -> relative weight in the default traffic mix
+DEFAULT_MIX = {
+    "login": 2,
+    "upload": 1,
+    "dashboard": 6,
+    "summary": 3,
+    "spending": 3,
+    "cashflow": 3,
+    "cashflow_monthly": 2,
+    "transactions": 3,
+    "forecast": 1,
+}
+
+class LoadTest:
+    """Shared state for the workers: client, token, uploaded statements and recorded latencies"""
+    def __init__(self, client: httpx.AsyncClient, statements: List[bytes], seed: int):
+        self.client = client
+        self.statements = statements
+        self.rng = random.Random(seed)
+        self.token: Optional[str] = None
+        self.file_id: Optional[str] = None
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def request(self, name: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """Send one request and record its latency under `name`; non-2xx responses count as errors"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            response, failed = None, True
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if failed:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+    async def login(self) -> None:
+        response = await self.request("login", "POST", "/token", data=CREDENTIALS)
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["access_token"]
+
+    async def upload(self) -> None:
+        content = self.rng.choice(self.statements)
+        response = await self.request(
+            "upload", "POST", "/upload/excel",
+            files={"file": ("statement.xlsx", content, XLSX_TYPE)}, headers=self.headers
+        )
+        if response is not None and response.status_code == 200:
+            self.file_id = response.json()["file_id"]
+
+    async def get(self, name: str, path: str, **params) -> None:
+        await self.request(name, "GET", path, params={"file_id": self.file_id, **params}, headers=self.headers)
+
+    async def run_scenario(self, scenario: str) -> None:
+        if scenario == "login":
+            await self.login()
+        elif scenario == "upload":
+            await self.upload()
+        elif scenario == "dashboard":
+            await self.get("dashboard", "/dashboard/overview")
+        elif scenario == "summary":
+            await self.get("summary", "/dashboard/summary")
+        elif scenario == "spending":
+            await self.get("spending", "/analysis/spending")
+        elif scenario == "cashflow":
+            await self.get("cashflow", "/analysis/cashflow")
+        elif scenario == "cashflow_monthly":
+            await self.get("cashflow_monthly", "/analysis/cashflow", granularity="monthly")
+        elif scenario == "transactions":
+            await self.get("transactions", "/transactions", limit=500)
+        elif scenario == "forecast":
+            await self.get("forecast", "/predict/expenses", horizon_days=30)
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+
+async def worker(test: LoadTest, mix: Dict[str, int], deadline: float) -> None:
+    scenarios, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        await test.run_scenario(test.rng.choices(scenarios, weights)[0])
+
+def percentiles(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "throughput_rps": round(len(values) / elapsed, 2),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+async def run_load(client: httpx.AsyncClient, args, mix: Dict[str, int]) -> Dict:
+    statements = [to_excel_bytes(generate_statement(args.rows, seed=seed)) for seed in range(args.statements)]
+    test = LoadTest(client, statements, args.seed)
+
+    # Every scenario needs a token and a stored statement to read
+    await test.login()
+    await test.upload()
+    if test.token is None or test.file_id is None:
+        raise RuntimeError("Setup failed: could not log in and upload a statement")
+    test.latencies.clear()
+    test.errors.clear()
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(worker(test, mix, deadline) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in test.latencies.values())
+    return {
+        "config": {
+            "mode": args.mode, "concurrency": args.concurrency, "duration_s": args.duration,
+            "rows": args.rows, "mix": mix, "seed": args.seed
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "errors": sum(test.errors.values()),
+        "endpoints": {
+            name: {**percentiles(values, elapsed), "errors": test.errors.get(name, 0)}
+            for name, values in sorted(test.latencies.items())
+        }
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def run_in_process(args, mix: Dict[str, int]) -> Dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+        return await run_load(client, args, mix)
+
+async def run_uvicorn(args, mix: Dict[str, int]) -> Dict:
+    port = free_port()
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=root, env={**os.environ, "STORAGE_DIR": os.environ["STORAGE_DIR"]}
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/docs")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            return await run_load(client, args, mix)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+def parse_mix(text: Optional[str]) -> Dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for part in text.split(","):
+            name, _, weight = part.partition("=")
+            if name.strip() not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown scenario '{name}'. Scenarios: {', '.join(DEFAULT_MIX)}")
+            mix[name.strip()] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def compare(report: Dict, previous: Dict) -> List[Tuple[str, float, float]]:
+    """(endpoint, previous p95, current p95) for endpoints present in both reports"""
+    return [
+        (name, previous["endpoints"][name]["p95_ms"], stats["p95_ms"])
+        for name, stats in report["endpoints"].items() if name in previous.get("endpoints", {})
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load after setup")
+    parser.add_argument("--rows", type=int, default=2000, help="rows per uploaded statement")
+    parser.add_argument("--statements", type=int, default=4, help="distinct statements used by upload traffic")
+    parser.add_argument("--mix", help="scenario weights, e.g. dashboard=5,forecast=0")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn mode)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep per-user rate limits on (all traffic comes from one user, so they are off by default)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report to compare p95 latencies with")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as storage_dir:
+        # Statements uploaded during the run are discarded with the directory
+        os.environ["STORAGE_DIR"] = storage_dir
+        if not args.rate_limits:
+            os.environ["RATE_LIMITING"] = "off"
+        runner = run_uvicorn if args.mode == "uvicorn" else run_in_process
+        report = asyncio.run(runner(args, mix))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\n{'endpoint':20s} {'previous p95':>14s} {'current p95':>14s} {'change':>8s}", file=sys.stderr)
+        for name, before, after in compare(report, previous):
+            change = (after / before - 1) if before else float("inf")
+            print(f"{name:20s} {before:12.1f}ms {after:12.1f}ms {change:+8.1%}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# benchmarks/monte_carlo_benchmark.py
+"""
+Timing benchmark for the vectorized Monte Carlo projection.
+
+Run from the project root:
+    python benchmarks/monte_carlo_benchmark.py --paths 10000 --years 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.monte_carlo import simulate_portfolio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=10000)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"paths={args.paths} years={args.years} (monthly steps)")
+    for label, contribution in [("lump sum", 0.0), ("monthly contributions", 500.0)]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            simulate_portfolio(10_000, 0.07, 0.15, years=args.years, monthly_contribution=contribution, paths=args.paths)
+            timings.append(time.perf_counter() - start)
+        print(f"{label:25s} median {statistics.median(timings) * 1000:7.1f} ms   best {min(timings) * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/serialization_benchmark.py
+"""
+Encode-time benchmark for the large API payloads.
+
+"before" mirrors what FastAPI does for a response_model endpoint returning a
+plain object: validate against the model, run jsonable_encoder, json.dumps.
+"after" is the FastJSONResponse path used by the endpoints now.
+
+Run from the project root:
+    python benchmarks/serialization_benchmark.py --rows 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.financial import FinancialData, TransactionCategory
+from models.prediction import PredictionResult
+from services.serialization import dumps, dataframe_to_records
+
+def make_forecast(rows: int) -> pd.DataFrame:
+    """Prophet-shaped forecast frame with a Timestamp column and float components"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"ds": pd.date_range("2000-01-01", periods=rows, freq="D")})
+    for column in ["trend", "yhat_lower", "yhat_upper", "trend_lower", "trend_upper",
+                   "weekly", "yearly", "multiplicative_terms", "additive_terms", "yhat"]:
+        df[column] = rng.normal(100, 20, rows)
+    return df
+
+def make_financial_data(rows: int) -> FinancialData:
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2000-01-01", periods=rows, freq=pd.Timedelta(hours=1))
+    amounts = rng.gamma(2.0, 50.0, rows).round(2)
+    transactions = [
+        {
+            "id": str(uuid.uuid4()),
+            "date": dates[i].to_pydatetime(),
+            "description": f"Merchant {i % 500}",
+            "amount": float(amounts[i]),
+            "category": TransactionCategory.EXPENSE if i % 7 else TransactionCategory.INCOME,
+            "subcategory": "Food",
+            "tags": [],
+            "metadata": {}
+        }
+        for i in range(rows)
+    ]
+    return FinancialData(file_id=str(uuid.uuid4()), transactions=transactions)
+
+def timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    forecast = make_forecast(args.rows)
+    summary = {"total_predicted": float(forecast["yhat"].sum())}
+
+    def forecast_before():
+        result = PredictionResult(
+            prediction_type="expense_forecast",
+            time_series=forecast.to_dict(orient="records"),
+            summary=summary
+        )
+        return json.dumps(jsonable_encoder(PredictionResult(**result.dict()))).encode("utf-8")
+
+    def forecast_after():
+        return dumps({
+            "prediction_type": "expense_forecast",
+            "time_series": dataframe_to_records(forecast),
+            "summary": summary
+        })
+
+    data = make_financial_data(args.rows)
+
+    def upload_before():
+        return json.dumps(jsonable_encoder(FinancialData(**data.dict()))).encode("utf-8")
+
+    def upload_after():
+        return dumps(data.dict())
+
+    scale = 10000 / args.rows
+    print(f"rows={args.rows} (times normalised to ms per 10k rows, best of {args.repeat})")
+    for name, before, after in [
+        ("PredictionResult.time_series", forecast_before, forecast_after),
+        ("FinancialData (upload_excel)", upload_before, upload_after),
+    ]:
+        t_before = timeit(before, args.repeat) * 1000 * scale
+        t_after = timeit(after, args.repeat) * 1000 * scale
+        print(f"{name:32s} before {t_before:9.1f} ms   after {t_after:9.1f} ms   speedup {t_before / t_after:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# benchmarks/suite.py
+"""
+Benchmark suite for the services and API endpoints, on synthetic statements.
+
+Every benchmark runs at each requested size (default 1k, 100k and 1M rows)
+and reports the median wall time. Results are compared with the stored
+baselines and the run fails if any benchmark is slower than its baseline by
+more than --threshold (a fraction; 0.25 = 25%).
+
+Run from the project root:
+    python benchmarks/suite.py                         # all benchmarks, 1k/100k/1M rows
+    python benchmarks/suite.py --sizes 1k,100k --only analysis
+    python benchmarks/suite.py --save-baseline         # record this machine's baselines
+
+Baselines are machine-specific: record them on the machine that runs the comparison.
+"""
+import argparse
+import functools
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Statements written by the endpoint benchmarks go to a scratch directory
+STORAGE_DIR = tempfile.mkdtemp(prefix="benchmarks-")
+os.environ["STORAGE_DIR"] = STORAGE_DIR
+
+from fastapi.testclient import TestClient
+
+from main import app
+from models.financial import TransactionCategory
+from models.transaction_table import TransactionTable
+from services.aggregation import aggregate_transactions, build_spending
+from services.data_processor import categorize_records, categorize_transactions, preprocess_financial_data
+from services.excel_extractor import extract_from_excel
+from services.prediction_engine import forecast_expenses, predict_savings_potential
+from services.storage import save_statement
+from services.visualization import generate_savings_forecast, generate_spending_chart
+from benchmarks.synthetic import generate_statement, to_excel_bytes, to_raw_records
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_SIZES = "1k,100k,1M"
+DEFAULT_THRESHOLD = 0.25
+
+class Fixtures:
+    """Inputs for one statement size, built on first use and shared by the benchmarks"""
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    @functools.cached_property
+    def statement(self) -> pd.DataFrame:
+        return generate_statement(self.rows)
+
+    @functools.cached_property
+    def excel(self) -> bytes:
+        return to_excel_bytes(self.statement)
+
+    @functools.cached_property
+    def raw_records(self) -> List[Dict[str, Any]]:
+        return to_raw_records(self.statement)
+
+    @functools.cached_property
+    def processed_records(self) -> List[Dict[str, Any]]:
+        return preprocess_financial_data(self.raw_records)
+
+    @functools.cached_property
+    def table(self) -> TransactionTable:
+        return TransactionTable.from_records(categorize_records([dict(r) for r in self.processed_records]))
+
+    @functools.cached_property
+    def file_id(self) -> str:
+        file_id = str(uuid.uuid4())
+        save_statement(file_id, self.table, {"user_id": "testuser", "metadata": {}})
+        return file_id
+
+    @functools.cached_property
+    def client(self) -> TestClient:
+        return TestClient(app)
+
+    @functools.cached_property
+    def headers(self) -> Dict[str, str]:
+        response = self.client.post("/token", data={"username": "testuser", "password": "testpassword"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    @functools.cached_property
+    def expense_series(self) -> pd.DataFrame:
+        expenses = self.table[self.table.category_mask(TransactionCategory.EXPENSE)]
+        return pd.DataFrame({"ds": expenses.dates.astype("datetime64[ns]"), "y": expenses.amounts})
+
+    @functools.cached_property
+    def spending(self) -> Dict[str, float]:
+        return build_spending(aggregate_transactions(self.table))["spending_by_category"]
+
+# name -> (make(fixtures) -> callable to time, max rows, repeats).
+# `make` builds every input it needs before returning, so only the call itself is timed.
+BENCHMARKS: Dict[str, tuple] = {}
+
+def benchmark(name: str, max_rows: Optional[int] = None, repeat: Optional[int] = None):
+    """Register a benchmark; `make` receives the Fixtures and returns the callable to time"""
+    def register(make: Callable[[Fixtures], Callable[[], Any]]):
+        BENCHMARKS[name] = (make, max_rows, repeat)
+        return make
+    return register
+
+def endpoint(path: str, **params) -> Callable[[Fixtures], Callable[[], Any]]:
+    def make(fx: Fixtures):
+        client, headers = fx.client, fx.headers
+        query = {"file_id": fx.file_id, **params}
+        def call():
+            response = client.get(path, params=query, headers=headers)
+            response.raise_for_status()
+        return call
+    return make
+
+# Reading .xlsx is dominated by openpyxl; 1M-row workbooks take minutes to write and read
+@benchmark("extract_from_excel", max_rows=100_000, repeat=1)
+def bench_extract(fx: Fixtures):
+    excel = fx.excel
+    return lambda: extract_from_excel(io.BytesIO(excel))
+
+@benchmark("preprocess_financial_data")
+def bench_preprocess(fx: Fixtures):
+    records = fx.raw_records
+    return lambda: preprocess_financial_data(records)
+
+@benchmark("categorize_records")
+def bench_categorize_records(fx: Fixtures):
+    records = fx.processed_records
+    return lambda: categorize_records([dict(r) for r in records])
+
+@benchmark("categorize_transactions", repeat=1)
+def bench_categorize_transactions(fx: Fixtures):
+    records = fx.processed_records
+    return lambda: categorize_transactions([dict(r) for r in records])
+
+@benchmark("aggregate_transactions")
+def bench_aggregate(fx: Fixtures):
+    table = fx.table
+    return lambda: aggregate_transactions(table)
+
+for _name, _path, _params in [
+    ("analysis/spending", "/analysis/spending", {}),
+    ("analysis/cashflow", "/analysis/cashflow", {}),
+    ("analysis/cashflow monthly", "/analysis/cashflow", {"granularity": "monthly"}),
+    ("analysis/anomalies", "/analysis/anomalies", {}),
+    ("dashboard/summary", "/dashboard/summary", {}),
+    ("dashboard/overview", "/dashboard/overview", {}),
+    ("transactions page", "/transactions", {"limit": 500}),
+]:
+    benchmark(_name)(endpoint(_path, **_params))
+
+@benchmark("generate_spending_chart")
+def bench_spending_chart(fx: Fixtures):
+    spending = fx.spending
+    return lambda: generate_spending_chart(spending)
+
+@benchmark("generate_savings_forecast")
+def bench_savings_chart(fx: Fixtures):
+    daily = fx.expense_series.groupby("ds")["y"].sum()
+    history = {str(day.date()): value for day, value in daily.items()}
+    return lambda: generate_savings_forecast(history, history)
+
+# The forecasters fit on daily totals, so their cost grows with the date span more than with rows
+@benchmark("forecast_expenses", repeat=1)
+def bench_forecast_expenses(fx: Fixtures):
+    series = fx.expense_series
+    return lambda: forecast_expenses(series, 30)
+
+@benchmark("predict_savings_potential", repeat=1)
+def bench_predict_savings(fx: Fixtures):
+    series = fx.expense_series
+    return lambda: predict_savings_potential(series, 30)
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+def size_label(rows: int) -> str:
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}M"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+def run(sizes: List[int], only: Optional[str], repeat: int) -> Dict[str, float]:
+    """Median seconds per "name@size" key"""
+    results = {}
+    for rows in sizes:
+        fixtures = Fixtures(rows)
+        for name, (make, max_rows, bench_repeat) in BENCHMARKS.items():
+            if only and only not in name:
+                continue
+            key = f"{name}@{size_label(rows)}"
+            if max_rows is not None and rows > max_rows:
+                print(f"{key:45s} skipped (max {size_label(max_rows)} rows)")
+                continue
+            call = make(fixtures)
+            if (bench_repeat or repeat) > 1:
+                call()  # warm-up
+            timings = []
+            for _ in range(bench_repeat or repeat):
+                start = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - start)
+            results[key] = statistics.median(timings)
+            print(f"{key:45s} {results[key] * 1000:12.1f} ms", flush=True)
+    return results
+
+def compare(results: Dict[str, float], baselines: Dict[str, float], threshold: float) -> List[str]:
+    """Keys slower than baseline * (1 + threshold), printing the ratio for every key with a baseline"""
+    regressions = []
+    print(f"\n{'benchmark':45s} {'baseline':>12s} {'current':>12s} {'ratio':>7s}")
+    for key, seconds in results.items():
+        if key not in baselines:
+            continue
+        ratio = seconds / baselines[key] if baselines[key] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:45s} {baselines[key] * 1000:10.1f}ms {seconds * 1000:10.1f}ms {ratio:6.2f}x{flag}")
+    return regressions
+
+def load_baselines(path: str) -> Dict[str, float]:
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except FileNotFoundError:
+        return {}
+
+def save_baselines(path: str, results: Dict[str, float]) -> None:
+    """Merge results into the baseline file, keeping entries for benchmarks that were not run"""
+    merged = {**load_baselines(path), **{key: round(value, 6) for key, value in results.items()}}
+    document = {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "python": platform.python_version()},
+        "results": dict(sorted(merged.items()))
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts, e.g. 1k,100k,1M")
+    parser.add_argument("--only", help="run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baselines")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+    np.seterr(all="ignore")
+
+    try:
+        results = run([parse_size(size) for size in args.sizes.split(",")], args.only, args.repeat)
+    finally:
+        shutil.rmtree(STORAGE_DIR, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        save_baselines(args.baseline, results)
+        print(f"\nSaved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    regressions = compare(results, load_baselines(args.baseline), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
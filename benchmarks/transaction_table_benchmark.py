@@ -0,0 +1,79 @@
+# benchmarks/transaction_table_benchmark.py
+"""
+Memory benchmark: per-row pydantic Transaction models vs TransactionTable.
+
+Both representations are built from the same stored-format row dicts and
+the retained size is measured with tracemalloc, then scaled to 1M rows.
+
+Run from the project root:
+    python benchmarks/transaction_table_benchmark.py --rows 200000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.financial import Transaction
+from models.transaction_table import TransactionTable
+
+SUBCATEGORIES = ["Food", "Housing", "Transportation", "Utilities", "Shopping", "Entertainment", None]
+
+def make_records(rows: int):
+    rng = np.random.default_rng(0)
+    days = rng.integers(0, 3650, rows)
+    merchants = rng.integers(0, 2000, rows)
+    amounts = rng.gamma(2.0, 50.0, rows).round(2)
+    start = np.datetime64("2015-01-01T00:00:00")
+    dates = np.datetime_as_string(start + days.astype("timedelta64[D]"), unit="s")
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "date": dates[i],
+            "description": f"Merchant {merchants[i]}",
+            "amount": float(amounts[i]),
+            "category": "expense" if i % 9 else "income",
+            "subcategory": SUBCATEGORIES[i % len(SUBCATEGORIES)],
+            "tags": [],
+            "metadata": {}
+        }
+        for i in range(rows)
+    ]
+
+def measure(build):
+    """Return (retained bytes, seconds) for the object produced by build()"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    scale = 1_000_000 / args.rows
+
+    print(f"rows={args.rows} (scaled to 1M rows)")
+    for name, build in [
+        ("List[Transaction] (pydantic)", lambda: [Transaction(**r) for r in records]),
+        ("TransactionTable", lambda: TransactionTable.from_records(records)),
+    ]:
+        retained, elapsed = measure(build)
+        print(f"{name:30s} {retained * scale / 2**20:9.1f} MiB   build {elapsed * scale:7.2f} s")
+
+if __name__ == "__main__":
+    main()
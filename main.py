@@ -1,8 +1,9 @@
 # app.py - Main FastAPI Application
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, status
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Request, status
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from typing import List, Optional
 import pandas as pd
 import numpy as np
@@ -23,25 +24,52 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
 from dataclasses import dataclass
+import asyncio
 import logging
 import json
 from models.user import User, UserInDB, Token, TokenData
-from models.financial import FinancialData, TransactionCategory, InvestmentSuggestion
+from models.financial import FinancialData, TransactionCategory, InvestmentSuggestion, PDFExtractResponse
 from models.prediction import PredictionResult
+from models.transaction_table import TransactionTable
+from models.money import CENTS_PER_UNIT
 from services.pdf_extractor import extract_from_pdf
 from services.excel_extractor import extract_from_excel
-from services.data_processor import preprocess_financial_data, categorize_transactions
+from services.data_processor import preprocess_financial_data, categorize_records, remove_known_transactions
 from services.prediction_engine import forecast_expenses, predict_savings_potential
-from services.investment_advisor import generate_investment_suggestions
+from services.investment_advisor import (
+    efficient_frontier, generate_investment_suggestions, investable_amount, project_suggestions
+)
 from services.visualization import generate_spending_chart, generate_savings_forecast
 from services.security import get_password_hash, verify_password, create_access_token
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("app.log"), logging.StreamHandler()]
+from services.serialization import FastJSONResponse, dataframe_to_records
+from services.storage import (
+    file_exists, get_file_version, load_rollup, load_statement, save_statement, statement_payload, update_lock
+)
+from services.http_cache import get_cache_headers, is_not_modified, not_modified_response
+from services.compression import CompressionMiddleware
+from services.upload_index import read_and_hash, find_upload, forget_file, record_upload, dedupe_stats
+from services.auto_rules import load_rules, save_rules, update_auto_investments
+from services.anomaly import ANOMALY_THRESHOLD, baselines_outdated, build_baselines, with_anomaly_scores
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, UPLOAD_BYTES, UPLOAD_ROWS, render_metrics
+from services.lifecycle import (
+    GC_INTERVAL_SECONDS, MAX_FILE_TTL_DAYS, estimate_stored_bytes, run_periodic_gc, storage_catalog
 )
+from services.logging_setup import configure_logging
+from services.memory import MemoryMiddleware, estimate_forecast_bytes, estimate_upload_bytes, exceeds_budget
+from services.profiling import ProfilingMiddleware
+from services.rate_limit import RATE_LIMITED, RATE_LIMITING, RateLimited, create_limiter
+from services.shared_cache import cache_key, compute_once
+from services.tracing import TracingMiddleware, span
+from services.streaming import RESPONSE_FORMATS, NDJSONResponse, ndjson_chunks, encode_cursor, decode_cursor
+from services.aggregation import (
+    DASHBOARD_SECTIONS, GRANULARITIES, STORED_ROLLUPS, aggregate_transactions, build_financial_summary,
+    build_expense_breakdown, build_recommendations, build_cashflow, build_spending, daily_cashflow,
+    cashflow_series, cashflow_records, merge_rollups, merge_summary, rollup_series, summarize_categories,
+    summary_to_amounts
+)
+
+# Configure logging: queued, JSON lines, rotating app.log (see services/logging_setup.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
@@ -60,12 +88,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (brotli when available, otherwise gzip)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+)
+
+# Opt-in peak memory accounting for uploads and forecasts (MEMORY_TRACKING=rss|tracemalloc)
+app.add_middleware(MemoryMiddleware)
+
+# Opt-in sampled profiling (PROFILE_SAMPLE_RATE, or the X-Profile admin header)
+app.add_middleware(ProfilingMiddleware)
+
+# Per-stage Server-Timing header and X-Request-ID on every response
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so request latency includes compression
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+async def precompute_efficient_frontier():
+    """Solve the investment efficient frontier once, so suggestion requests only do a lookup"""
+    efficient_frontier()
+
+@app.on_event("startup")
+async def start_storage_gc():
+    """Expire old uploads and clean up storage in the background (GC_INTERVAL_SECONDS, 0 disables)"""
+    app.state.storage_gc = asyncio.create_task(run_periodic_gc()) if GC_INTERVAL_SECONDS > 0 else None
+
+@app.on_event("shutdown")
+async def stop_storage_gc():
+    task = getattr(app.state, "storage_gc", None)
+    if task is not None:
+        task.cancel()
+
 # Security configuration
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-dev-only")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ADMIN_USERS = {name for name in os.getenv("ADMIN_USERS", "").split(",") if name}
 
 # Dependency to get current user
 async def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -84,19 +147,87 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     
     # In a real app, fetch from database
-    fake_users_db = {
-        "testuser": {
-            "username": "testuser",
-            "hashed_password": get_password_hash("testpassword"),
-            "email": "test@example.com"
+    with span("auth"):
+        fake_users_db = {
+            "testuser": {
+                "username": "testuser",
+                "hashed_password": get_password_hash("testpassword"),
+                "email": "test@example.com"
+            }
         }
-    }
     
     user = fake_users_db.get(token_data.username)
     if user is None:
         raise credentials_exception
     return UserInDB(**user)
 
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    """The current user, if listed in ADMIN_USERS"""
+    if current_user.username not in ADMIN_USERS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+# Per-user rate limits and concurrency caps of the expensive endpoints (see services/rate_limit.py)
+limiter = create_limiter()
+
+def admission(cost_class: str):
+    """Dependency admitting a request of `cost_class` for the current user, or rejecting it with 429"""
+    async def admit(request: Request, current_user: User = Depends(get_current_user)):
+        if not RATE_LIMITING:
+            yield
+            return
+        try:
+            limiter.acquire(current_user.username, request.url.path, cost_class)
+        except RateLimited as e:
+            RATE_LIMITED.inc(cost_class, e.reason)
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many {cost_class} requests, retry in {e.retry_after}s",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        try:
+            yield
+        finally:
+            limiter.release(current_user.username, cost_class)
+    return admit
+
+def check_date_range(start: Optional[datetime.date], end: Optional[datetime.date]) -> None:
+    """Reject inverted start/end windows on the date-filtered endpoints"""
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+
+def check_memory_budget(kind: str, estimate: int) -> None:
+    """Reject requests whose predicted memory use exceeds the per-request budget (MEMORY_BUDGET_MB)"""
+    if exceeds_budget(kind, estimate):
+        raise HTTPException(
+            status_code=413,
+            detail=f"Input too large: processing it would need about {estimate // 2**20} MB"
+        )
+
+def check_storage_quota(user_id: str, rows: int) -> None:
+    """Reject uploads whose stored rows would take the user's stored bytes over their quota (USER_QUOTA_MB)"""
+    if not storage_catalog().within_quota(user_id, estimate_stored_bytes(rows)):
+        raise HTTPException(status_code=413, detail="Storage quota exceeded: delete files or wait for them to expire")
+
+def result_cache_key(kind: str, file_id: str, *params) -> str:
+    """Shared-cache key of a computed result: changes with the stored file's version"""
+    version = get_file_version(file_id)
+    return cache_key(kind, file_id, version[0] if version else None, *params)
+
+def check_response_format(response_format: str) -> None:
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format: {response_format}. Valid formats: {', '.join(RESPONSE_FORMATS)}"
+        )
+
+def forecast_ndjson_response(forecast: pd.DataFrame, headers: dict) -> NDJSONResponse:
+    """Stream a forecast's time series rows, one JSON object per line"""
+    return NDJSONResponse(
+        ndjson_chunks(len(forecast), lambda rows: dataframe_to_records(forecast.iloc[rows])),
+        headers=headers
+    )
+
 # Authentication endpoints
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -124,245 +255,470 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Upload endpoints
-@app.post("/upload/pdf", response_model=PDFExtractResponse)
+@app.post("/upload/pdf", response_model=PDFExtractResponse, dependencies=[Depends(admission("upload"))])
 async def upload_pdf(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
     try:
+        content = await file.read()
+        UPLOAD_BYTES.inc("pdf", amount=len(content))
+        check_memory_budget("pdf", estimate_upload_bytes("pdf", len(content)))
+        
         # Save uploaded file temporarily
         temp_path = f"temp_{file.filename}"
         with open(temp_path, "wb") as buffer:
-            content = await file.read()
             buffer.write(content)
         
         # Process PDF
         result = extract_from_pdf(temp_path)
+        UPLOAD_ROWS.inc("pdf", amount=len(result.get("transactions") or []))
         
         # Clean up temp file
         if os.path.exists(temp_path):
             os.remove(temp_path)
             
         return PDFExtractResponse(**result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing PDF: {str(e)}"
         )
 
-@app.post("/upload/excel", response_model=FinancialData)
+@app.post("/upload/excel", response_model=FinancialData, response_class=FastJSONResponse, dependencies=[Depends(admission("upload"))])
 async def upload_excel(
     file: UploadFile = File(...),
+    ttl_days: Optional[int] = Query(None, ge=1, le=MAX_FILE_TTL_DAYS),
     current_user: User = Depends(get_current_user)
 ):
     try:
         logger.info(f"Uploading Excel for user: {current_user.username}")
-        contents = await file.read()
+        with span("read"):
+            contents, digest = await read_and_hash(file)
+        
+        # Identical bytes already ingested by this user: return the stored result without reparsing
+        existing_file_id = find_upload(current_user.username, digest)
+        if existing_file_id is not None:
+            logger.info(f"Duplicate upload for user {current_user.username}, reusing {existing_file_id}")
+            table, info = load_statement(existing_file_id)
+            return FastJSONResponse(
+                content=statement_payload(existing_file_id, table, info),
+                headers={"X-Upload-Deduplicated": "true"}
+            )
+        
+        check_memory_budget("excel", estimate_upload_bytes("excel", len(contents)))
         file_id = str(uuid.uuid4())
         
         # Extract data from Excel
         raw_data = extract_from_excel(io.BytesIO(contents))
+        UPLOAD_BYTES.inc("excel", amount=len(contents))
+        UPLOAD_ROWS.inc("excel", amount=len(raw_data))
+        check_storage_quota(current_user.username, len(raw_data))
         
-        # Preprocess and categorize data
+        # Preprocess, categorize and score anomalies
         processed_data = preprocess_financial_data(raw_data)
-        categorized_data = categorize_transactions(processed_data)
+        table = TransactionTable.from_records(categorize_records(processed_data))
+        baselines = build_baselines(table)
+        table = with_anomaly_scores(table, baselines)
+        info = {
+            "user_id": current_user.username, "summary_cents": summarize_categories(table), "metadata": {},
+            # Built once: the scores above and the stored baselines share them
+            "anomaly_baselines": baselines, "anomaly_baselines_rows": len(table)
+        }
+        info["auto_investments"] = update_auto_investments(current_user.username, table, table)
         
         # Save to temporary storage (in production, save to database)
-        temp_path = f"temp/{file_id}.json"
-        os.makedirs("temp", exist_ok=True)
-        with open(temp_path, "w") as f:
-            json.dump(categorized_data.dict(), f)
+        save_statement(file_id, table, info)
+        storage_catalog().register(file_id, current_user.username, ttl_days)
+        record_upload(current_user.username, digest, file_id)
         
-        return categorized_data
+        return FastJSONResponse(content=statement_payload(file_id, table, info))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing Excel: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+@app.get("/upload/stats", response_model=dict)
+async def get_upload_stats(current_user: User = Depends(get_current_user)):
+    """Counters for content-addressed upload deduplication"""
+    stats = dedupe_stats()
+    hits = stats["hits"]
+    lookups = hits + stats["misses"]
+    return {
+        "dedupe_hits": hits,
+        "dedupe_misses": stats["misses"],
+        "dedupe_hit_ratio": hits / lookups if lookups else 0.0
+    }
+
+@app.post("/upload/excel/append", response_model=dict, response_class=FastJSONResponse, dependencies=[Depends(admission("upload"))])
+async def append_excel(
+    file_id: str,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Append a new statement to an existing file_id.
+    Transactions already stored (same date, amount and description) are skipped,
+    and the stored summary is updated with the totals of the new rows only.
+    """
+    try:
+        if not file_exists(file_id):
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        logger.info(f"Appending Excel to {file_id} for user: {current_user.username}")
+        contents = await file.read()
+        check_memory_budget("excel", estimate_upload_bytes("excel", len(contents)))
+        
+        # Extract and preprocess before taking the lock; nothing here depends on the stored rows
+        raw_data = extract_from_excel(io.BytesIO(contents))
+        UPLOAD_BYTES.inc("excel_append", amount=len(contents))
+        UPLOAD_ROWS.inc("excel_append", amount=len(raw_data))
+        check_storage_quota(current_user.username, len(raw_data))
+        processed_data = preprocess_financial_data(raw_data)
+        
+        # Concurrent appends to this file_id wait here, so each one sees the rows of the others
+        with update_lock(file_id):
+            table, info = load_statement(file_id)
+            if info.get("user_id") not in (None, current_user.username):
+                raise HTTPException(status_code=403, detail="Not allowed to modify this file")
+            
+            # Drop rows we already have, then categorize only the new ones
+            new_data = remove_known_transactions(table.dedup_keys(), processed_data)
+            new_table = TransactionTable.from_records(categorize_records(new_data))
+            
+            # Score only the new rows, against the baselines stored for the earlier uploads
+            new_table = with_anomaly_scores(new_table, info.get("anomaly_baselines") or build_baselines(table))
+            
+            stored_totals = info.get("summary_cents") or summarize_categories(table)
+            info["summary_cents"] = merge_summary(stored_totals, summarize_categories(new_table))
+            stored_rollups = {granularity: load_rollup(file_id, granularity) for granularity in STORED_ROLLUPS}
+            info["rollups"] = merge_rollups(stored_rollups, new_table)
+            table = table.concat(new_table)
+            if baselines_outdated(info.get("anomaly_baselines_rows"), len(table)):
+                info.pop("anomaly_baselines", None)
+            
+            # Re-evaluate auto-investment rules for the months the new rows fall in
+            info["auto_investments"] = update_auto_investments(
+                current_user.username, table, new_table, info.get("auto_investments")
+            )
+            # Re-uploading the original bytes must not return the appended statement
+            forget_file(file_id)
+            save_statement(file_id, table, info)
+        storage_catalog().register(file_id, current_user.username)
+        
+        return FastJSONResponse(content={
+            "file_id": file_id,
+            "added": len(new_data),
+            "duplicates": len(processed_data) - len(new_data),
+            "total_transactions": len(table),
+            "summary": summary_to_amounts(info["summary_cents"])
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error appending Excel: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+
+# Transaction listing
+@app.get("/transactions", response_model=dict, response_class=FastJSONResponse)
+async def list_transactions(
+    file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    response_format: str = Query("json", alias="format"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stored transactions in date order, a page at a time.
+    Pass the returned next_cursor to fetch the following page. With
+    format=ndjson every remaining row is streamed instead, one per line.
+    """
+    try:
+        check_response_format(response_format)
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        version = get_file_version(file_id)
+        if cache_headers is None or version is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        window = f"{start or ''}..{end or ''}"
+        try:
+            offset = decode_cursor(cursor, version[0], window) if cursor else 0
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        table, info = load_statement(file_id, start, end)
+        if info.get("user_id") not in (None, current_user.username):
+            raise HTTPException(status_code=403, detail="Not allowed to read this file")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
+        
+        if response_format == "ndjson":
+            return NDJSONResponse(
+                ndjson_chunks(len(table), lambda rows: table[rows].to_records(), offset=offset),
+                headers=cache_headers
+            )
+        
+        page_end = min(offset + limit, len(table))
+        return FastJSONResponse(content={
+            "file_id": file_id,
+            "total": len(table),
+            "transactions": table[offset:page_end].to_records(),
+            "next_cursor": encode_cursor(page_end, version[0], window) if page_end < len(table) else None
+        }, headers=cache_headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing transactions: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error listing transactions: {str(e)}")
+
 # Analysis endpoints
-@app.get("/analysis/spending", response_model=dict)
+@app.get("/analysis/spending", response_model=dict, response_class=FastJSONResponse)
 async def analyze_spending(
     file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
     current_user: User = Depends(get_current_user)
 ):
     try:
-        temp_path = f"temp/{file_id}.json"
-        if not os.path.exists(temp_path):
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
             raise HTTPException(status_code=404, detail="File not found")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
         
-        with open(temp_path, "r") as f:
-            data = FinancialData(**json.load(f))
+        table, _ = load_statement(file_id, start, end)
         
         # Analyze spending patterns
-        spending_by_category = {}
-        for transaction in data.transactions:
-            if transaction.category in [TransactionCategory.EXPENSE]:
-                category = transaction.subcategory or "Other"
-                if category not in spending_by_category:
-                    spending_by_category[category] = 0
-                spending_by_category[category] += transaction.amount
+        spending = build_spending(aggregate_transactions(table))
         
         # Generate visualization
-        chart_data = generate_spending_chart(spending_by_category)
+        spending["chart"] = generate_spending_chart(spending["spending_by_category"])
         
-        return {
-            "spending_by_category": spending_by_category,
-            "total_spending": sum(spending_by_category.values()),
-            "chart": chart_data
-        }
+        return FastJSONResponse(content=spending, headers=cache_headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing spending: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error analyzing spending: {str(e)}")
 
-@app.get("/analysis/cashflow", response_model=dict)
+@app.get("/analysis/cashflow", response_model=dict, response_class=FastJSONResponse)
 async def analyze_cashflow(
     file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    granularity: str = "daily",
+    response_format: str = Query("json", alias="format"),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Cashflow per day, week (keyed by its Monday), month or year.
+    With format=ndjson the periods are streamed as one JSON object per line.
+    """
     try:
-        temp_path = f"temp/{file_id}.json"
-        if not os.path.exists(temp_path):
+        check_response_format(response_format)
+        if granularity not in GRANULARITIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown granularity: {granularity}. Valid values: {', '.join(GRANULARITIES)}"
+            )
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
             raise HTTPException(status_code=404, detail="File not found")
-        
-        with open(temp_path, "r") as f:
-            data = FinancialData(**json.load(f))
-        
-        # Organize transactions by date
-        transactions_by_date = {}
-        for transaction in data.transactions:
-            date_str = transaction.date.strftime("%Y-%m-%d")
-            if date_str not in transactions_by_date:
-                transactions_by_date[date_str] = {"income": 0, "expense": 0}
-            
-            if transaction.category == TransactionCategory.INCOME:
-                transactions_by_date[date_str]["income"] += transaction.amount
-            elif transaction.category == TransactionCategory.EXPENSE:
-                transactions_by_date[date_str]["expense"] += transaction.amount
-        
-        # Calculate net cashflow
-        net_cashflow = {}
-        cumulative_cashflow = 0
-        for date, flows in sorted(transactions_by_date.items()):
-            net = flows["income"] - flows["expense"]
-            cumulative_cashflow += net
-            net_cashflow[date] = {
-                "income": flows["income"],
-                "expense": flows["expense"],
-                "net": net,
-                "cumulative": cumulative_cashflow
-            }
-        
-        return {
-            "cashflow_by_date": net_cashflow,
-            "total_income": sum(flow["income"] for flow in transactions_by_date.values()),
-            "total_expense": sum(flow["expense"] for flow in transactions_by_date.values()),
-            "net_cashflow": sum(flow["income"] - flow["expense"] for flow in transactions_by_date.values())
-        }
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
+        
+        # Whole-statement monthly/yearly series were computed at ingest
+        rollup = None
+        if granularity in STORED_ROLLUPS and start is None and end is None:
+            rollup = load_rollup(file_id, granularity)
+        
+        if rollup is not None:
+            daily = rollup_series(rollup, granularity)
+        else:
+            table, _ = load_statement(file_id, start, end)
+            daily = daily_cashflow(table)
+        
+        if response_format == "ndjson":
+            series = cashflow_series({"daily": daily}, granularity)
+            return NDJSONResponse(
+                ndjson_chunks(len(series["periods"]), lambda rows: cashflow_records(series, rows)),
+                headers=cache_headers
+            )
+        
+        # Bucket transactions by period and calculate net cashflow
+        cashflow = build_cashflow({"daily": daily}, granularity)
+        
+        return FastJSONResponse(content=cashflow, headers=cache_headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing cashflow: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error analyzing cashflow: {str(e)}")
 
+@app.get("/analysis/anomalies", response_model=dict, response_class=FastJSONResponse)
+async def analyze_anomalies(
+    file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    threshold: float = ANOMALY_THRESHOLD,
+    current_user: User = Depends(get_current_user)
+):
+    """Transactions whose anomaly score is at least `threshold`, highest score first"""
+    try:
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
+        
+        table, _ = load_statement(file_id, start, end)
+        anomalies = table[table.anomaly_scores >= threshold]
+        anomalies = anomalies[np.argsort(-anomalies.anomaly_scores, kind="stable")]
+        
+        return FastJSONResponse(content={
+            "threshold": threshold,
+            "count": len(anomalies),
+            "anomalies": anomalies.to_records()
+        }, headers=cache_headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error detecting anomalies: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error detecting anomalies: {str(e)}")
+
 # Prediction endpoints
-@app.get("/predict/expenses", response_model=PredictionResult)
+@app.get("/predict/expenses", response_model=PredictionResult, response_class=FastJSONResponse, dependencies=[Depends(admission("forecast"))])
 async def predict_expenses(
     file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
     horizon_days: int = 30,
+    response_format: str = Query("json", alias="format"),
     current_user: User = Depends(get_current_user)
 ):
+    """Expense forecast; format=ndjson streams only the time series rows"""
     try:
-        temp_path = f"temp/{file_id}.json"
-        if not os.path.exists(temp_path):
+        check_response_format(response_format)
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
             raise HTTPException(status_code=404, detail="File not found")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
         
-        with open(temp_path, "r") as f:
-            data = FinancialData(**json.load(f))
-        
-        # Extract expense time series
-        expense_df = pd.DataFrame([
-            {"ds": t.date, "y": t.amount}
-            for t in data.transactions
-            if t.category == TransactionCategory.EXPENSE
-        ])
-        
-        if expense_df.empty:
-            raise HTTPException(status_code=400, detail="No expense data found")
-        
-        # Forecast using Prophet
-        forecast_result = forecast_expenses(expense_df, horizon_days)
-        
-        return PredictionResult(
-            prediction_type="expense_forecast",
-            time_series=forecast_result["forecast"].to_dict(orient="records"),
-            summary={
+        def fit():
+            table, _ = load_statement(file_id, start, end)
+            
+            # Extract expense time series
+            expenses = table[table.category_mask(TransactionCategory.EXPENSE)]
+            expense_df = pd.DataFrame({
+                "ds": expenses.dates.astype("datetime64[ns]"),
+                "y": expenses.amounts
+            })
+            
+            if expense_df.empty:
+                raise HTTPException(status_code=400, detail="No expense data found")
+            
+            # Forecast using Prophet
+            check_memory_budget("forecast", estimate_forecast_bytes(expense_df["ds"].nunique(), horizon_days))
+            return forecast_expenses(expense_df, horizon_days)
+        
+        # Fitted once per statement version and parameters, shared by every worker
+        key = result_cache_key("forecast_expenses", file_id, start, end, horizon_days)
+        forecast_result = await run_in_threadpool(compute_once, key, fit)
+        if response_format == "ndjson":
+            return forecast_ndjson_response(forecast_result["forecast"], cache_headers)
+        
+        return FastJSONResponse(content={
+            "prediction_type": "expense_forecast",
+            "time_series": dataframe_to_records(forecast_result["forecast"]),
+            "summary": {
                 "total_predicted": float(forecast_result["forecast"]["yhat"].sum()),
                 "average_daily": float(forecast_result["forecast"]["yhat"].mean()),
                 "upper_bound": float(forecast_result["forecast"]["yhat_upper"].sum()),
                 "lower_bound": float(forecast_result["forecast"]["yhat_lower"].sum())
             },
-            chart_data=forecast_result["chart_data"]
-        )
+            "chart_data": forecast_result["chart_data"]
+        }, headers=cache_headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error predicting expenses: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting expenses: {str(e)}")
 
-@app.get("/predict/savings", response_model=PredictionResult)
+@app.get("/predict/savings", response_model=PredictionResult, response_class=FastJSONResponse, dependencies=[Depends(admission("forecast"))])
 async def predict_savings(
     file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
     horizon_days: int = 30,
     saving_rate: Optional[float] = None,
+    response_format: str = Query("json", alias="format"),
     current_user: User = Depends(get_current_user)
 ):
+    """Savings forecast; format=ndjson streams only the time series rows"""
     try:
-        temp_path = f"temp/{file_id}.json"
-        if not os.path.exists(temp_path):
+        check_response_format(response_format)
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
             raise HTTPException(status_code=404, detail="File not found")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
         
-        with open(temp_path, "r") as f:
-            data = FinancialData(**json.load(f))
-        
-        # Calculate historical income and expenses
-        income_by_date = {}
-        expense_by_date = {}
-        
-        for t in data.transactions:
-            date_str = t.date.strftime("%Y-%m-%d")
+        def fit():
+            table, _ = load_statement(file_id, start, end)
             
-            if t.category == TransactionCategory.INCOME:
-                if date_str not in income_by_date:
-                    income_by_date[date_str] = 0
-                income_by_date[date_str] += t.amount
+            # Calculate historical income and expenses per day
+            flows = table[table.category_mask(TransactionCategory.INCOME) | table.category_mask(TransactionCategory.EXPENSE)]
+            daily = daily_cashflow(flows)
             
-            elif t.category == TransactionCategory.EXPENSE:
-                if date_str not in expense_by_date:
-                    expense_by_date[date_str] = 0
-                expense_by_date[date_str] += t.amount
-        
-        # Create net savings dataframe
-        dates = sorted(set(list(income_by_date.keys()) + list(expense_by_date.keys())))
-        savings_df = pd.DataFrame([
-            {
-                "ds": datetime.datetime.strptime(date, "%Y-%m-%d"),
-                "y": income_by_date.get(date, 0) - expense_by_date.get(date, 0)
-            }
-            for date in dates
-        ])
-        
-        if savings_df.empty:
-            raise HTTPException(status_code=400, detail="Insufficient data for savings prediction")
-        
-        # Predict savings potential
-        forecast_result = predict_savings_potential(savings_df, horizon_days, saving_rate)
-        
-        return PredictionResult(
-            prediction_type="savings_forecast",
-            time_series=forecast_result["forecast"].to_dict(orient="records"),
-            summary={
+            # Create net savings dataframe
+            savings_df = pd.DataFrame({
+                "ds": daily["dates"].astype("datetime64[ns]"),
+                "y": (daily["income_cents"] - daily["expense_cents"]) / CENTS_PER_UNIT
+            })
+            
+            if savings_df.empty:
+                raise HTTPException(status_code=400, detail="Insufficient data for savings prediction")
+            
+            # Predict savings potential
+            check_memory_budget("forecast", estimate_forecast_bytes(len(savings_df), horizon_days))
+            return predict_savings_potential(savings_df, horizon_days, saving_rate)
+        
+        key = result_cache_key("forecast_savings", file_id, start, end, horizon_days, saving_rate)
+        forecast_result = await run_in_threadpool(compute_once, key, fit)
+        if response_format == "ndjson":
+            return forecast_ndjson_response(forecast_result["forecast"], cache_headers)
+        
+        return FastJSONResponse(content={
+            "prediction_type": "savings_forecast",
+            "time_series": dataframe_to_records(forecast_result["forecast"]),
+            "summary": {
                 "total_predicted_savings": float(forecast_result["forecast"]["yhat"].sum()),
                 "average_daily_savings": float(forecast_result["forecast"]["yhat"].mean()),
                 "optimistic_scenario": float(forecast_result["forecast"]["yhat_upper"].sum()),
                 "conservative_scenario": float(forecast_result["forecast"]["yhat_lower"].sum())
             },
-            chart_data=forecast_result["chart_data"]
-        )
+            "chart_data": forecast_result["chart_data"]
+        }, headers=cache_headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error predicting savings: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error predicting savings: {str(e)}")
@@ -375,114 +731,255 @@ async def get_investment_suggestions(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        temp_path = f"temp/{file_id}.json"
-        if not os.path.exists(temp_path):
+        if not file_exists(file_id):
             raise HTTPException(status_code=404, detail="File not found")
         
-        with open(temp_path, "r") as f:
-            data = FinancialData(**json.load(f))
+        table, _ = load_statement(file_id)
         
-        # Calculate total income and expenses
-        total_income = sum(t.amount for t in data.transactions if t.category == TransactionCategory.INCOME)
-        total_expenses = sum(t.amount for t in data.transactions if t.category == TransactionCategory.EXPENSE)
-        
-        # Calculate investable amount
-        net_cashflow = total_income - total_expenses
-        investable_amount = max(0, net_cashflow * 0.3)  # Assume 30% of surplus can be invested
+        # Calculate investable amount from total income and expenses
+        amount = investable_amount(summary_to_amounts(summarize_categories(table)))
         
         # Generate investment suggestions
-        suggestions = generate_investment_suggestions(investable_amount, risk_tolerance)
+        suggestions = generate_investment_suggestions(amount, risk_tolerance)
         
         return suggestions
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating investment suggestions: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating investment suggestions: {str(e)}")
 
+@app.get("/investment/projection", response_model=dict, response_class=FastJSONResponse, dependencies=[Depends(admission("simulation"))])
+async def get_investment_projection(
+    file_id: str,
+    request: Request,
+    risk_tolerance: float = Query(0.5, ge=0, le=1),
+    years: int = Query(30, ge=1, le=50),
+    monthly_contribution: float = Query(0.0, ge=0),
+    paths: int = Query(10_000, ge=100, le=50_000),
+    seed: Optional[int] = Query(None, ge=0),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Monte Carlo projection of the suggested allocation, starting from the investable amount.
+    Results are deterministic for the same statement and parameters.
+    """
+    try:
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
+        
+        def simulate():
+            table, _ = load_statement(file_id)
+            amount = investable_amount(summary_to_amounts(summarize_categories(table)))
+            suggestions = generate_investment_suggestions(amount, risk_tolerance)
+            
+            projection = project_suggestions(
+                suggestions, amount,
+                years=years, monthly_contribution=monthly_contribution, paths=paths, seed=seed
+            )
+            projection["initial_amount"] = amount
+            projection["suggestions"] = suggestions
+            return projection
+        
+        key = result_cache_key("projection", file_id, risk_tolerance, years, monthly_contribution, paths, seed)
+        projection = await run_in_threadpool(compute_once, key, simulate)
+        
+        return FastJSONResponse(content=projection, headers=cache_headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error projecting investments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error projecting investments: {str(e)}")
+
 @app.post("/investment/auto-rules", response_model=dict)
 async def set_auto_investment_rules(
-    file_id: str,
     rules: dict,
+    file_id: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Replace the user's auto-investment rules, e.g.
+    {"rules": [{"name": "...", "when": "surplus > 500", "invest": "20% of surplus", "target": "S&P 500 Index ETF"}]}.
+    Rules run on every later upload; with a file_id they are also applied to that statement now.
+    """
     try:
-        # In a real application, save these rules to a database
+        definitions = rules.get("rules")
+        if not isinstance(definitions, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON body of the form {\"rules\": [...]}")
+        try:
+            save_rules(current_user.username, definitions)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        actions = None
+        if file_id is not None:
+            if not file_exists(file_id):
+                raise HTTPException(status_code=404, detail="File not found")
+            with update_lock(file_id):
+                table, info = load_statement(file_id)
+                if info.get("user_id") not in (None, current_user.username):
+                    raise HTTPException(status_code=403, detail="Not allowed to modify this file")
+                actions = update_auto_investments(current_user.username, table, table)
+                info["auto_investments"] = actions
+                save_statement(file_id, table, info)
+        
         return {
             "status": "success",
             "message": "Auto-investment rules set successfully",
-            "rules": rules
+            "rules": definitions,
+            "actions": actions
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error setting auto-investment rules: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error setting auto-investment rules: {str(e)}")
 
+@app.get("/investment/auto-rules", response_model=dict)
+async def get_auto_investment_rules(
+    file_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """The user's stored rules and, for a file_id, the actions they triggered on that statement"""
+    try:
+        actions = None
+        if file_id is not None:
+            if not file_exists(file_id):
+                raise HTTPException(status_code=404, detail="File not found")
+            _, info = load_statement(file_id)
+            if info.get("user_id") not in (None, current_user.username):
+                raise HTTPException(status_code=403, detail="Not allowed to read this file")
+            actions = info.get("auto_investments", [])
+        return {"rules": load_rules(current_user.username), "actions": actions}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading auto-investment rules: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error reading auto-investment rules: {str(e)}")
+
 # Dashboard endpoints
-@app.get("/dashboard/summary", response_model=dict)
+@app.get("/dashboard/summary", response_model=dict, response_class=FastJSONResponse)
 async def get_dashboard_summary(
     file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
     current_user: User = Depends(get_current_user)
 ):
     try:
-        temp_path = f"temp/{file_id}.json"
-        if not os.path.exists(temp_path):
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
             raise HTTPException(status_code=404, detail="File not found")
-        
-        with open(temp_path, "r") as f:
-            data = FinancialData(**json.load(f))
-        
-        # Calculate key metrics
-        total_income = sum(t.amount for t in data.transactions if t.category == TransactionCategory.INCOME)
-        total_expenses = sum(t.amount for t in data.transactions if t.category == TransactionCategory.EXPENSE)
-        total_savings = sum(t.amount for t in data.transactions if t.category == TransactionCategory.SAVINGS)
-        total_investments = sum(t.amount for t in data.transactions if t.category == TransactionCategory.INVESTMENT)
-        
-        # Calculate expense breakdown
-        expense_categories = {}
-        for t in data.transactions:
-            if t.category == TransactionCategory.EXPENSE:
-                category = t.subcategory or "Other"
-                if category not in expense_categories:
-                    expense_categories[category] = 0
-                expense_categories[category] += t.amount
-        
-        # Sort categories by amount
-        sorted_categories = dict(sorted(
-            expense_categories.items(),
-            key=lambda item: item[1],
-            reverse=True
-        ))
-        
-        # Generate recommendations
-        recommendations = []
-        
-        # Check savings rate
-        savings_rate = total_savings / total_income if total_income > 0 else 0
-        if savings_rate < 0.2:
-            recommendations.append("Consider increasing your savings rate to at least 20% of income.")
-        
-        # Check if any expense category exceeds 30% of total expenses
-        for category, amount in sorted_categories.items():
-            if amount / total_expenses > 0.3 and category not in ["Housing", "Mortgage"]:
-                recommendations.append(f"Your spending on {category} is relatively high at {amount/total_expenses:.1%} of expenses. Consider evaluating this area for potential savings.")
-        
-        # Check investment allocation
-        if total_investments < total_income * 0.15:
-            recommendations.append("Consider allocating at least 15% of your income to investments for long-term growth.")
-        
-        return {
-            "financial_summary": {
-                "total_income": total_income,
-                "total_expenses": total_expenses,
-                "total_savings": total_savings,
-                "total_investments": total_investments,
-                "net_cashflow": total_income - total_expenses,
-                "savings_rate": savings_rate
-            },
-            "expense_breakdown": sorted_categories,
-            "recommendations": recommendations
-        }
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
+        
+        table, _ = load_statement(file_id, start, end)
+        
+        # Calculate key metrics, expense breakdown and recommendations
+        aggregates = aggregate_transactions(table)
+        financial_summary = build_financial_summary(aggregates)
+        expense_breakdown = build_expense_breakdown(aggregates)
+        
+        return FastJSONResponse(content={
+            "financial_summary": financial_summary,
+            "expense_breakdown": expense_breakdown,
+            "recommendations": build_recommendations(financial_summary, expense_breakdown)
+        }, headers=cache_headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating dashboard summary: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating dashboard summary: {str(e)}")
 
+@app.get("/dashboard/overview", response_model=dict, response_class=FastJSONResponse)
+async def get_dashboard_overview(
+    file_id: str,
+    request: Request,
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    sections: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Everything the dashboard page shows, computed from one load and one aggregation pass.
+    `sections` is a comma-separated subset of summary, expense_breakdown,
+    recommendations, cashflow and spending (default: all).
+    """
+    try:
+        requested = DASHBOARD_SECTIONS if not sections else [section.strip() for section in sections.split(",") if section.strip()]
+        unknown = [section for section in requested if section not in DASHBOARD_SECTIONS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown sections: {', '.join(unknown)}. Valid sections: {', '.join(DASHBOARD_SECTIONS)}"
+            )
+        
+        check_date_range(start, end)
+        cache_headers = get_cache_headers(request, file_id)
+        if cache_headers is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        if is_not_modified(request, cache_headers):
+            return not_modified_response(cache_headers)
+        
+        table, _ = load_statement(file_id, start, end)
+        aggregates = aggregate_transactions(table)
+        
+        result = {}
+        financial_summary = build_financial_summary(aggregates)
+        expense_breakdown = build_expense_breakdown(aggregates)
+        if "summary" in requested:
+            result["financial_summary"] = financial_summary
+        if "expense_breakdown" in requested:
+            result["expense_breakdown"] = expense_breakdown
+        if "recommendations" in requested:
+            result["recommendations"] = build_recommendations(financial_summary, expense_breakdown)
+        if "cashflow" in requested:
+            result["cashflow"] = build_cashflow(aggregates)
+        if "spending" in requested:
+            spending = build_spending(aggregates)
+            spending["chart"] = generate_spending_chart(spending["spending_by_category"])
+            result["spending"] = spending
+        
+        return FastJSONResponse(content=result, headers=cache_headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating dashboard overview: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating dashboard overview: {str(e)}")
+
+# Observability
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the application metrics"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+# Administration
+@app.get("/admin/storage", response_model=dict)
+async def get_storage_usage(current_user: User = Depends(get_admin_user)):
+    """Stored files and bytes per user, with quotas and the next expiry"""
+    try:
+        users = await run_in_threadpool(storage_catalog().usage_report)
+        return {
+            "users": users,
+            "total_files": sum(user["files"] for user in users),
+            "total_bytes": sum(user["bytes"] for user in users)
+        }
+    except Exception as e:
+        logger.error(f"Error reporting storage usage: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error reporting storage usage: {str(e)}")
+
+@app.post("/admin/storage/gc", response_model=dict)
+async def collect_storage_garbage(current_user: User = Depends(get_admin_user)):
+    """Run a garbage-collection pass now instead of waiting for the background task"""
+    try:
+        return await run_in_threadpool(storage_catalog().collect_garbage)
+    except Exception as e:
+        logger.error(f"Error collecting storage garbage: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error collecting storage garbage: {str(e)}")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
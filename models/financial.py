@@ -21,6 +21,7 @@ class Transaction(BaseModel):
     subcategory: Optional[str] = None
     tags: List[str] = []
     metadata: Dict[str, Any] = {}
+    anomaly_score: float = 0.0
 
 class PDFTransaction(BaseModel):
     date: str
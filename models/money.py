@@ -0,0 +1,27 @@
+# models/money.py
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any
+
+import numpy as np
+
+# Amounts are held internally as int64 minor units (cents) and only turned
+# back into floats for API responses
+CENTS_PER_UNIT = 100
+
+def to_cents(value: Any) -> int:
+    """Parse an amount (number or numeric string) into integer cents, rounding half up"""
+    if isinstance(value, (int, np.integer)):
+        return int(value) * CENTS_PER_UNIT
+    amount = Decimal(str(value).strip())
+    return int((amount * CENTS_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def floats_to_cents(amounts: np.ndarray) -> np.ndarray:
+    """
+    Vectorized conversion of float amounts to int64 cents.
+    Exact for amounts with at most two decimals, which is what stored floats hold.
+    """
+    return np.rint(np.asarray(amounts, dtype=np.float64) * CENTS_PER_UNIT).astype(np.int64)
+
+def to_amount(cents: int) -> float:
+    """Integer cents back to a float amount for responses"""
+    return int(cents) / CENTS_PER_UNIT
@@ -0,0 +1,265 @@
+# models/transaction_table.py
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import orjson
+
+from models.financial import Transaction, TransactionCategory
+from models.money import CENTS_PER_UNIT, floats_to_cents
+
+# Category codes are positions in this list
+CATEGORIES = list(TransactionCategory)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+
+# Columns stored as integer codes into a per-table list of distinct values
+INTERNED_COLUMNS = ["subcategory", "description", "tags", "metadata"]
+
+def _intern(values: Iterable[Hashable]) -> Tuple[np.ndarray, List[Hashable]]:
+    """Encode values as int32 codes into a list of distinct values (first-seen order)"""
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32)
+    return codes, list(lookup)
+
+def _metadata_key(metadata: Optional[Dict[str, Any]]) -> str:
+    return orjson.dumps(metadata or {}, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+
+def _parse_dates(values: Sequence[Any]) -> np.ndarray:
+    """Dates from ISO strings, datetimes or pandas Timestamps, truncated to seconds (timezone offsets are dropped)"""
+    return np.array([str(value)[:19] for value in values], dtype="datetime64[s]")
+
+def date_range_slice(dates: np.ndarray, start: Optional[date] = None, end: Optional[date] = None) -> slice:
+    """
+    Binary-search the row range of an ascending date column covering the days
+    start..end inclusive. `dates` may be datetime64[s] or its int64 view.
+    """
+    seconds = dates.view(np.int64) if dates.dtype.kind == "M" else dates
+    lo, hi = 0, len(seconds)
+    if start is not None:
+        first = np.datetime64(start, "D").astype("datetime64[s]").astype(np.int64)
+        lo = int(np.searchsorted(seconds, first, side="left"))
+    if end is not None:
+        after = (np.datetime64(end, "D") + 1).astype("datetime64[s]").astype(np.int64)
+        hi = int(np.searchsorted(seconds, after, side="left"))
+    return slice(lo, max(lo, hi))
+
+@dataclass(eq=False)
+class TransactionTable:
+    """
+    Struct-of-arrays representation of a statement's transactions.
+
+    Services work on these columns directly; conversion to the pydantic
+    Transaction / FinancialData models only happens at the API boundary
+    (to_records / to_transactions).
+
+    - ids: fixed-width bytes
+    - dates: datetime64[s] (int64 seconds since the epoch)
+    - amount_cents: int64 minor units, so sums are exact (`amounts` gives floats)
+    - category_codes: int8 positions in CATEGORIES
+    - anomaly_scores: float64 robust z-scores from services.anomaly (0 = typical)
+    - subcategory/description/tags/metadata codes: int32 positions in the
+      matching `*_values` list, so repeated strings are stored once
+    """
+    ids: np.ndarray
+    dates: np.ndarray
+    amount_cents: np.ndarray
+    category_codes: np.ndarray
+    anomaly_scores: np.ndarray
+    subcategory_codes: np.ndarray
+    subcategory_values: List[Optional[str]]
+    description_codes: np.ndarray
+    description_values: List[str]
+    tags_codes: np.ndarray
+    tags_values: List[Tuple[str, ...]]
+    metadata_codes: np.ndarray
+    metadata_values: List[str]
+
+    @classmethod
+    def empty(cls) -> "TransactionTable":
+        return cls.from_records([])
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "TransactionTable":
+        """Build a table from transaction dicts (extractor output, stored rows or Transaction.dict())"""
+        subcategory_codes, subcategory_values = _intern(r.get("subcategory") for r in records)
+        description_codes, description_values = _intern(str(r.get("description", "")) for r in records)
+        tags_codes, tags_values = _intern(tuple(r.get("tags") or ()) for r in records)
+        metadata_codes, metadata_values = _intern(_metadata_key(r.get("metadata")) for r in records)
+
+        return cls(
+            ids=np.array([str(r["id"]).encode("utf-8") for r in records], dtype=np.bytes_),
+            dates=_parse_dates([r["date"] for r in records]),
+            amount_cents=cls._record_cents(records),
+            category_codes=np.array(
+                [CATEGORY_CODES[TransactionCategory(r.get("category") or TransactionCategory.OTHER)] for r in records],
+                dtype=np.int8
+            ),
+            anomaly_scores=np.array([float(r.get("anomaly_score") or 0.0) for r in records], dtype=np.float64),
+            subcategory_codes=subcategory_codes,
+            subcategory_values=subcategory_values,
+            description_codes=description_codes,
+            description_values=description_values,
+            tags_codes=tags_codes,
+            tags_values=tags_values,
+            metadata_codes=metadata_codes,
+            metadata_values=metadata_values
+        )
+
+    @staticmethod
+    def _record_cents(records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Use amount_cents from the extractors when present, otherwise convert the float amount"""
+        if all("amount_cents" in r for r in records):
+            return np.array([int(r["amount_cents"]) for r in records], dtype=np.int64)
+        return floats_to_cents([float(r["amount"]) for r in records])
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any], rows: slice = slice(None)) -> "TransactionTable":
+        """Inverse of to_columns(); only the `rows` slice of each column is converted"""
+        ids = np.array([value.encode("utf-8") for value in columns["id"][rows]], dtype=np.bytes_)
+        return cls(
+            ids=ids,
+            dates=np.array(columns["date"][rows], dtype=np.int64).view("datetime64[s]"),
+            amount_cents=(
+                np.array(columns["amount_cents"][rows], dtype=np.int64) if "amount_cents" in columns
+                else floats_to_cents(columns["amount"][rows])
+            ),
+            category_codes=np.array(columns["category"][rows], dtype=np.int8),
+            anomaly_scores=(
+                np.array(columns["anomaly_score"][rows], dtype=np.float64) if "anomaly_score" in columns
+                else np.zeros(len(ids), dtype=np.float64)
+            ),
+            subcategory_codes=np.array(columns["subcategory"][rows], dtype=np.int32),
+            subcategory_values=list(columns["subcategory_values"]),
+            description_codes=np.array(columns["description"][rows], dtype=np.int32),
+            description_values=list(columns["description_values"]),
+            tags_codes=np.array(columns["tags"][rows], dtype=np.int32),
+            tags_values=[tuple(tags) for tags in columns["tags_values"]],
+            metadata_codes=np.array(columns["metadata"][rows], dtype=np.int32),
+            metadata_values=list(columns["metadata_values"])
+        )
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Columnar, JSON-serializable form used by storage"""
+        return {
+            "id": np.char.decode(self.ids, "utf-8").tolist(),
+            "date": self.dates.view(np.int64),
+            "amount_cents": self.amount_cents,
+            "category": self.category_codes,
+            "anomaly_score": self.anomaly_scores,
+            "subcategory": self.subcategory_codes,
+            "subcategory_values": self.subcategory_values,
+            "description": self.description_codes,
+            "description_values": self.description_values,
+            "tags": self.tags_codes,
+            "tags_values": [list(tags) for tags in self.tags_values],
+            "metadata": self.metadata_codes,
+            "metadata_values": self.metadata_values
+        }
+
+    def __len__(self) -> int:
+        return len(self.amount_cents)
+
+    @property
+    def amounts(self) -> np.ndarray:
+        """Amounts as float64, for modelling code and responses"""
+        return self.amount_cents / CENTS_PER_UNIT
+
+    def __getitem__(self, index) -> "TransactionTable":
+        """Select rows with a slice, boolean mask or index array; value lists are shared"""
+        return TransactionTable(
+            ids=self.ids[index],
+            dates=self.dates[index],
+            amount_cents=self.amount_cents[index],
+            category_codes=self.category_codes[index],
+            anomaly_scores=self.anomaly_scores[index],
+            subcategory_codes=self.subcategory_codes[index],
+            subcategory_values=self.subcategory_values,
+            description_codes=self.description_codes[index],
+            description_values=self.description_values,
+            tags_codes=self.tags_codes[index],
+            tags_values=self.tags_values,
+            metadata_codes=self.metadata_codes[index],
+            metadata_values=self.metadata_values
+        )
+
+    def is_sorted_by_date(self) -> bool:
+        return bool(np.all(self.dates[1:] >= self.dates[:-1]))
+
+    def sort_by_date(self) -> "TransactionTable":
+        """Rows ordered by date (stable, so same-day rows keep their upload order)"""
+        if self.is_sorted_by_date():
+            return self
+        return self[np.argsort(self.dates, kind="stable")]
+
+    def between(self, start: Optional[date] = None, end: Optional[date] = None) -> "TransactionTable":
+        """Rows dated within [start, end] (inclusive days) of a date-sorted table, as views"""
+        return self[date_range_slice(self.dates, start, end)]
+
+    def category_mask(self, category: TransactionCategory) -> np.ndarray:
+        return self.category_codes == CATEGORY_CODES[category]
+
+    def subcategories(self) -> np.ndarray:
+        """Subcategory per row as an object array"""
+        return np.array(self.subcategory_values, dtype=object)[self.subcategory_codes]
+
+    def descriptions(self) -> np.ndarray:
+        """Description per row as an object array"""
+        return np.array(self.description_values, dtype=object)[self.description_codes]
+
+    def dedup_keys(self) -> Set[Tuple[str, int, str]]:
+        """(date, amount in cents, description) keys, matching data_processor.transaction_key"""
+        days = np.datetime_as_string(self.dates, unit="D").tolist()
+        descriptions = [value.strip() for value in self.descriptions().tolist()]
+        return set(zip(days, self.amount_cents.tolist(), descriptions))
+
+    def concat(self, other: "TransactionTable") -> "TransactionTable":
+        """Append another table's rows, merging the value lists"""
+        merged = {}
+        for column in INTERNED_COLUMNS:
+            values = list(getattr(self, f"{column}_values"))
+            lookup = {value: code for code, value in enumerate(values)}
+            remap = np.array([lookup.setdefault(value, len(lookup)) for value in getattr(other, f"{column}_values")],
+                             dtype=np.int32)
+            values.extend(list(lookup)[len(values):])
+            other_codes = remap[getattr(other, f"{column}_codes")] if len(remap) else getattr(other, f"{column}_codes")
+            merged[f"{column}_codes"] = np.concatenate([getattr(self, f"{column}_codes"), other_codes])
+            merged[f"{column}_values"] = values
+
+        return TransactionTable(
+            ids=np.concatenate([self.ids, other.ids]),
+            dates=np.concatenate([self.dates, other.dates]),
+            amount_cents=np.concatenate([self.amount_cents, other.amount_cents]),
+            category_codes=np.concatenate([self.category_codes, other.category_codes]),
+            anomaly_scores=np.concatenate([self.anomaly_scores, other.anomaly_scores]),
+            **merged
+        )
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Row dicts in the FinancialData.transactions wire format (ISO date strings,
+        category values), built column by column for the API boundary.
+        """
+        if not len(self):
+            return []
+        columns = {
+            "id": np.char.decode(self.ids, "utf-8").tolist(),
+            "date": np.datetime_as_string(self.dates, unit="s").tolist(),
+            "description": self._decode(self.description_values, self.description_codes),
+            "amount": self.amounts.tolist(),
+            "category": np.array([c.value for c in CATEGORIES], dtype=object)[self.category_codes].tolist(),
+            "subcategory": self._decode(self.subcategory_values, self.subcategory_codes),
+            "tags": [list(tags) for tags in self._decode(self.tags_values, self.tags_codes)],
+            "metadata": self._decode([orjson.loads(value) for value in self.metadata_values], self.metadata_codes),
+            "anomaly_score": self.anomaly_scores.tolist()
+        }
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    @staticmethod
+    def _decode(values: List[Any], codes: np.ndarray) -> List[Any]:
+        return [values[code] for code in codes.tolist()]
+
+    def to_transactions(self) -> List[Transaction]:
+        """Validated pydantic models, for callers that need them"""
+        return [Transaction(**record) for record in self.to_records()]
@@ -0,0 +1,264 @@
+
+# services/aggregation.py
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models.financial import TransactionCategory
+from models.money import CENTS_PER_UNIT, to_amount
+from models.transaction_table import CATEGORY_CODES, TransactionTable
+from services.tracing import traced
+
+DASHBOARD_SECTIONS = ["summary", "expense_breakdown", "recommendations", "cashflow", "spending"]
+
+# Cashflow bucket sizes; monthly and yearly series are also stored with each statement
+GRANULARITIES = ["daily", "weekly", "monthly", "yearly"]
+STORED_ROLLUPS = ["monthly", "yearly"]
+
+def grouped_sum(groups: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    Exact int64 sum of `values` per group id in [0, size).
+    Uses a sort + np.add.reduceat, skipping the sort when groups are already ordered.
+    """
+    totals = np.zeros(size, dtype=np.int64)
+    if len(groups) == 0:
+        return totals
+    if np.any(groups[1:] < groups[:-1]):
+        order = np.argsort(groups, kind="stable")
+        groups = groups[order]
+        values = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    totals[groups[starts]] = np.add.reduceat(values.astype(np.int64, copy=False), starts)
+    return totals
+
+@traced("aggregate")
+def aggregate_transactions(table: TransactionTable) -> Dict[str, Any]:
+    """
+    Compute every rollup the analysis and dashboard endpoints need in one vectorized pass,
+    as exact integer cents:
+    - totals per category
+    - expense totals per subcategory (in order of first appearance)
+    - income and expense per calendar date (sorted arrays)
+    """
+    cents = table.amount_cents
+    category_totals = grouped_sum(table.category_codes, cents, len(CATEGORY_CODES))
+    totals = {category: int(category_totals[code]) for category, code in CATEGORY_CODES.items()}
+
+    expense = table.category_mask(TransactionCategory.EXPENSE)
+
+    # Expenses per subcategory; missing subcategories are reported as "Other"
+    codes = table.subcategory_codes[expense]
+    sums = grouped_sum(codes, cents[expense], len(table.subcategory_values))
+    present, first_seen = np.unique(codes, return_index=True)
+    expense_by_subcategory = {}
+    for code in present[np.argsort(first_seen)].tolist():
+        name = table.subcategory_values[code] or "Other"
+        expense_by_subcategory[name] = expense_by_subcategory.get(name, 0) + int(sums[code])
+
+    return {
+        "totals_cents": totals,
+        "expense_by_subcategory_cents": expense_by_subcategory,
+        "daily": daily_cashflow(table)
+    }
+
+def daily_cashflow(table: TransactionTable) -> Dict[str, np.ndarray]:
+    """Income and expense in cents per calendar date (sorted datetime64[D] dates)"""
+    cents = table.amount_cents
+    income = table.category_mask(TransactionCategory.INCOME)
+    expense = table.category_mask(TransactionCategory.EXPENSE)
+    dates, day_index = np.unique(table.dates.astype("datetime64[D]"), return_inverse=True)
+    return {
+        "dates": dates,
+        "income_cents": grouped_sum(day_index, np.where(income, cents, 0), len(dates)),
+        "expense_cents": grouped_sum(day_index, np.where(expense, cents, 0), len(dates))
+    }
+
+def bucket_dates(dates: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    Map datetime64[D] dates to the start of their bucket: the day itself, the
+    Monday of its ISO week, its month (datetime64[M]) or its year (datetime64[Y]).
+    """
+    if granularity == "daily":
+        return dates
+    if granularity == "weekly":
+        # Day 0 of the epoch (1970-01-01) was a Thursday, three days after a Monday
+        return dates - (dates.astype(np.int64) + 3) % 7
+    if granularity == "monthly":
+        return dates.astype("datetime64[M]")
+    if granularity == "yearly":
+        return dates.astype("datetime64[Y]")
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def resample_cashflow(daily: Dict[str, np.ndarray], granularity: str) -> Dict[str, np.ndarray]:
+    """Sum a daily income/expense series into buckets of the given granularity"""
+    if granularity == "daily":
+        return daily
+    buckets = bucket_dates(daily["dates"], granularity)
+    if len(buckets) == 0:
+        return {"dates": buckets, "income_cents": daily["income_cents"], "expense_cents": daily["expense_cents"]}
+    # Dates are sorted, so each bucket is a contiguous run
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    return {
+        "dates": buckets[starts],
+        "income_cents": np.add.reduceat(daily["income_cents"], starts),
+        "expense_cents": np.add.reduceat(daily["expense_cents"], starts)
+    }
+
+def build_rollups(table: TransactionTable) -> Dict[str, Dict[str, Any]]:
+    """Monthly and yearly cashflow series in the serializable form stored with a statement"""
+    daily = daily_cashflow(table)
+    return {granularity: _stored_rollup(resample_cashflow(daily, granularity)) for granularity in STORED_ROLLUPS}
+
+def _stored_rollup(series: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    return {
+        "periods": np.datetime_as_string(series["dates"]).tolist(),
+        "income_cents": series["income_cents"],
+        "expense_cents": series["expense_cents"]
+    }
+
+def merge_rollups(stored: Dict[str, Optional[Dict[str, Any]]], table: TransactionTable) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Stored rollups plus the buckets of `table` (rows appended to the statement),
+    without revisiting the stored rows. None if a granularity was never stored.
+    """
+    if any(stored.get(granularity) is None for granularity in STORED_ROLLUPS):
+        return None
+    added = build_rollups(table)
+    merged = {}
+    for granularity in STORED_ROLLUPS:
+        old, new = rollup_series(stored[granularity], granularity), rollup_series(added[granularity], granularity)
+        dates, index = np.unique(np.concatenate([old["dates"], new["dates"]]), return_inverse=True)
+        merged[granularity] = _stored_rollup({
+            "dates": dates,
+            **{
+                column: grouped_sum(index, np.concatenate([old[column], new[column]]), len(dates))
+                for column in ("income_cents", "expense_cents")
+            }
+        })
+    return merged
+
+def rollup_series(rollup: Dict[str, Any], granularity: str) -> Dict[str, np.ndarray]:
+    """Inverse of build_rollups() for one stored granularity"""
+    unit = "datetime64[M]" if granularity == "monthly" else "datetime64[Y]"
+    return {
+        "dates": np.array(rollup["periods"], dtype=unit),
+        "income_cents": np.array(rollup["income_cents"], dtype=np.int64),
+        "expense_cents": np.array(rollup["expense_cents"], dtype=np.int64)
+    }
+
+def summarize_categories(table: TransactionTable) -> Dict[str, int]:
+    """Per-category totals in cents, as stored with each statement"""
+    category_totals = grouped_sum(table.category_codes, table.amount_cents, len(CATEGORY_CODES))
+    return {
+        "total_income": int(category_totals[CATEGORY_CODES[TransactionCategory.INCOME]]),
+        "total_expenses": int(category_totals[CATEGORY_CODES[TransactionCategory.EXPENSE]]),
+        "total_savings": int(category_totals[CATEGORY_CODES[TransactionCategory.SAVINGS]]),
+        "total_investments": int(category_totals[CATEGORY_CODES[TransactionCategory.INVESTMENT]])
+    }
+
+def summary_to_amounts(summary_cents: Dict[str, int]) -> Dict[str, float]:
+    return {key: to_amount(value) for key, value in summary_cents.items()}
+
+def build_financial_summary(aggregates: Dict[str, Any]) -> Dict[str, float]:
+    totals = aggregates["totals_cents"]
+    total_income = totals[TransactionCategory.INCOME]
+    total_expenses = totals[TransactionCategory.EXPENSE]
+    total_savings = totals[TransactionCategory.SAVINGS]
+
+    return {
+        "total_income": to_amount(total_income),
+        "total_expenses": to_amount(total_expenses),
+        "total_savings": to_amount(total_savings),
+        "total_investments": to_amount(totals[TransactionCategory.INVESTMENT]),
+        "net_cashflow": to_amount(total_income - total_expenses),
+        "savings_rate": total_savings / total_income if total_income > 0 else 0
+    }
+
+def build_expense_breakdown(aggregates: Dict[str, Any]) -> Dict[str, float]:
+    """Expense totals per subcategory, largest first"""
+    return {
+        category: to_amount(cents)
+        for category, cents in sorted(
+            aggregates["expense_by_subcategory_cents"].items(),
+            key=lambda item: item[1],
+            reverse=True
+        )
+    }
+
+def build_spending(aggregates: Dict[str, Any]) -> Dict[str, Any]:
+    """Expense totals per subcategory (first-seen order) and their exact total"""
+    by_subcategory = aggregates["expense_by_subcategory_cents"]
+    return {
+        "spending_by_category": {category: to_amount(cents) for category, cents in by_subcategory.items()},
+        "total_spending": to_amount(sum(by_subcategory.values()))
+    }
+
+def build_recommendations(summary: Dict[str, float], expense_breakdown: Dict[str, float]) -> List[str]:
+    recommendations = []
+    total_expenses = summary["total_expenses"]
+
+    # Check savings rate
+    if summary["savings_rate"] < 0.2:
+        recommendations.append("Consider increasing your savings rate to at least 20% of income.")
+
+    # Check if any expense category exceeds 30% of total expenses
+    for category, amount in expense_breakdown.items():
+        if amount / total_expenses > 0.3 and category not in ["Housing", "Mortgage"]:
+            recommendations.append(f"Your spending on {category} is relatively high at {amount/total_expenses:.1%} of expenses. Consider evaluating this area for potential savings.")
+
+    # Check investment allocation
+    if summary["total_investments"] < summary["total_income"] * 0.15:
+        recommendations.append("Consider allocating at least 15% of your income to investments for long-term growth.")
+
+    return recommendations
+
+def cashflow_series(aggregates: Dict[str, Any], granularity: str = "daily") -> Dict[str, np.ndarray]:
+    """
+    Per-period income, expense, net and running cumulative cashflow in cents.
+    Periods are labelled by date (daily, or the Monday starting each week), "YYYY-MM" or "YYYY".
+    """
+    series = resample_cashflow(aggregates["daily"], granularity)
+    income = series["income_cents"]
+    expense = series["expense_cents"]
+    net = income - expense
+    return {
+        "periods": np.datetime_as_string(series["dates"]),
+        "income_cents": income,
+        "expense_cents": expense,
+        "net_cents": net,
+        "cumulative_cents": np.cumsum(net)
+    }
+
+def cashflow_records(series: Dict[str, np.ndarray], rows: slice = slice(None)) -> List[Dict[str, Any]]:
+    """Rows of a cashflow series as {"date", "income", "expense", "net", "cumulative"} dicts"""
+    return [
+        {"date": date, "income": i, "expense": e, "net": n, "cumulative": c}
+        for date, i, e, n, c in zip(
+            series["periods"][rows].tolist(),
+            (series["income_cents"][rows] / CENTS_PER_UNIT).tolist(),
+            (series["expense_cents"][rows] / CENTS_PER_UNIT).tolist(),
+            (series["net_cents"][rows] / CENTS_PER_UNIT).tolist(),
+            (series["cumulative_cents"][rows] / CENTS_PER_UNIT).tolist()
+        )
+    ]
+
+def build_cashflow(aggregates: Dict[str, Any], granularity: str = "daily") -> Dict[str, Any]:
+    """Cashflow per period keyed by its label, plus totals"""
+    series = cashflow_series(aggregates, granularity)
+    net_cashflow = {record.pop("date"): record for record in cashflow_records(series)}
+
+    total_income = int(series["income_cents"].sum())
+    total_expense = int(series["expense_cents"].sum())
+    return {
+        "cashflow_by_date": net_cashflow,
+        "total_income": to_amount(total_income),
+        "total_expense": to_amount(total_expense),
+        "net_cashflow": to_amount(total_income - total_expense)
+    }
+
+def merge_summary(summary: Dict[str, int], delta: Dict[str, int]) -> Dict[str, int]:
+    """Add the totals (in cents) of newly ingested transactions to a stored summary"""
+    merged = dict(summary)
+    for key, value in delta.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
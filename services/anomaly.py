@@ -0,0 +1,126 @@
+
+# services/anomaly.py
+import dataclasses
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.transaction_table import TransactionTable
+from services.tracing import traced
+
+# Scores above this are reported as anomalies (Iglewicz & Hoaglin's modified z-score cutoff)
+ANOMALY_THRESHOLD = 3.5
+
+# Groups with fewer transactions than this have no usable baseline and score 0
+MIN_GROUP_SIZE = 5
+
+# Lower bound on the MAD, so groups of identical amounts (e.g. rent) still score finite values
+MIN_SCALE_CENTS = 100
+
+# Scales the MAD to a standard deviation for normally distributed amounts
+_MAD_TO_Z = 0.6745
+
+# Transactions are compared with their subcategory and with the same merchant
+GROUPINGS = ["subcategory", "merchant"]
+
+# Stored baselines are rebuilt once appends have grown the statement by this
+# fraction since they were built; until then new rows are scored against them
+BASELINE_REFRESH_GROWTH = 0.25
+
+_NON_MERCHANT_CHARS = re.compile(r"[^a-z ]+")
+
+def merchant_key(description: str) -> str:
+    """Normalize a description to a merchant name: lowercase letters only, so reference numbers and dates are ignored"""
+    return " ".join(_NON_MERCHANT_CHARS.sub(" ", description.lower()).split())
+
+def _group_codes(table: TransactionTable, grouping: str) -> Tuple[np.ndarray, List[str]]:
+    """Per-row group ids for a grouping and the group names, derived from the interned columns"""
+    if grouping == "subcategory":
+        values, codes = [value or "Other" for value in table.subcategory_values], table.subcategory_codes
+    elif grouping == "merchant":
+        values, codes = [merchant_key(value) for value in table.description_values], table.description_codes
+    else:
+        raise ValueError(f"Unknown grouping: {grouping}")
+
+    # Several interned values can normalize to the same group name
+    lookup = {}
+    remap = np.array([lookup.setdefault(value, len(lookup)) for value in values], dtype=np.int32)
+    return (remap[codes] if len(remap) else codes), list(lookup)
+
+def _grouped_median(groups: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Median of `values` per group id in [0, size) and the group sizes, from one lexsort"""
+    counts = np.bincount(groups, minlength=size)
+    medians = np.zeros(size, dtype=np.float64)
+    present = counts > 0
+    if not present.any():
+        return medians, counts
+
+    ordered = values[np.lexsort((values, groups))].astype(np.float64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lower = (starts + (counts - 1) // 2)[present]
+    upper = (starts + counts // 2)[present]
+    medians[present] = (ordered[lower] + ordered[upper]) / 2
+    return medians, counts
+
+def build_baselines(table: TransactionTable) -> Dict[str, Dict[str, Any]]:
+    """
+    Median and median absolute deviation (MAD) of amounts in cents per subcategory
+    and per merchant, keyed by group name so they can be stored with a statement
+    and applied to later uploads.
+    """
+    cents = table.amount_cents
+    baselines = {}
+    for grouping in GROUPINGS:
+        codes, names = _group_codes(table, grouping)
+        medians, counts = _grouped_median(codes, cents, len(names))
+        deviations = np.abs(cents - medians[codes])
+        mads, _ = _grouped_median(codes, deviations, len(names))
+        baselines[grouping] = {"names": names, "median_cents": medians, "mad_cents": mads, "count": counts}
+    return baselines
+
+def baselines_outdated(built_rows: Optional[int], total_rows: int) -> bool:
+    """Whether baselines built over `built_rows` rows should be rebuilt for a statement of `total_rows`"""
+    return built_rows is None or total_rows > built_rows * (1 + BASELINE_REFRESH_GROWTH)
+
+def score_transactions(table: TransactionTable, baselines: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    """
+    Robust z-score of each amount against its group baselines: how many
+    (MAD-based) standard deviations it lies above the group median, taking the
+    highest of the subcategory and merchant scores. Amounts at or below the
+    median, and groups without a usable baseline, score 0.
+    """
+    cents = table.amount_cents
+    scores = np.zeros(len(table), dtype=np.float64)
+    for grouping in GROUPINGS:
+        baseline = baselines.get(grouping)
+        if not baseline or not baseline["names"] or not len(table):
+            continue
+        codes, names = _group_codes(table, grouping)
+        lookup = {name: index for index, name in enumerate(baseline["names"])}
+        index = np.array([lookup.get(name, -1) for name in names], dtype=np.int64)[codes]
+
+        medians = np.asarray(baseline["median_cents"], dtype=np.float64)
+        mads = np.asarray(baseline["mad_cents"], dtype=np.float64)
+        counts = np.asarray(baseline["count"], dtype=np.int64)
+        known = index >= 0
+        known[known] = counts[index[known]] >= MIN_GROUP_SIZE
+
+        rows = index[known]
+        z = _MAD_TO_Z * (cents[known] - medians[rows]) / np.maximum(mads[rows], MIN_SCALE_CENTS)
+        scores[known] = np.maximum(scores[known], z)
+    return np.round(scores, 3)
+
+@traced("anomaly_scoring")
+def with_anomaly_scores(
+    table: TransactionTable,
+    baselines: Optional[Dict[str, Dict[str, Any]]] = None
+) -> TransactionTable:
+    """
+    Return the table with its anomaly_scores column filled in. New uploads are
+    scored against the stored baselines of earlier ones; without baselines the
+    table is scored against itself.
+    """
+    if baselines is None:
+        baselines = build_baselines(table)
+    return dataclasses.replace(table, anomaly_scores=score_transactions(table, baselines))
@@ -0,0 +1,269 @@
+
+# services/auto_rules.py
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from models.money import to_amount, to_cents
+from models.transaction_table import CATEGORY_CODES, TransactionTable
+from models.financial import TransactionCategory
+from services.aggregation import grouped_sum
+from services.investment_advisor import ALL_OPTIONS
+from services.metrics import CACHE_LOOKUPS
+from services.serialization import dumps, loads
+from services.tracing import traced
+from services.storage import STORAGE_DIR
+
+# Auto-investment rules are small expressions evaluated per calendar month:
+#
+#     {"name": "surplus to index", "when": "surplus > 500 and expenses < 3000",
+#      "invest": "20% of surplus", "target": "S&P 500 Index ETF"}
+#
+# `when` is one or more `<metric> <op> <amount>` clauses joined by "and" (use
+# separate rules for "or"). Metrics are monthly totals: income, expenses,
+# savings, investments and surplus (income - expenses).
+
+# Stored rule definitions, one JSON file per user
+RULES_DIR = os.path.join(STORAGE_DIR, "rules")
+
+METRICS = ["income", "expenses", "savings", "investments", "surplus"]
+METRIC_CODES = {name: code for code, name in enumerate(METRICS)}
+
+OPERATORS = [">", ">=", "<", "<=", "==", "!="]
+OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+
+# Truth of each operator given sign(value - threshold) + 1, i.e. for below / equal / above
+_OPERATOR_TRUTH = np.array([
+    [False, False, True],   # >
+    [False, True, True],    # >=
+    [True, False, False],   # <
+    [True, True, False],    # <=
+    [False, True, False],   # ==
+    [True, False, True],    # !=
+])
+
+_CLAUSE = re.compile(r"^\s*([a-z_]+)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+_INVEST = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*%\s*of\s+([a-z_]+)\s*$")
+
+_TARGETS = {option["name"] for option in ALL_OPTIONS}
+
+def parse_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate one rule definition and return its parsed form; raises ValueError with a readable message"""
+    name = str(rule.get("name") or "").strip()
+    if not name:
+        raise ValueError("Every rule needs a name")
+
+    clauses = []
+    for text in str(rule.get("when", "")).split(" and "):
+        match = _CLAUSE.match(text)
+        if not match or match.group(1) not in METRIC_CODES:
+            raise ValueError(f"Rule '{name}': cannot parse condition '{text.strip()}'")
+        metric, op, amount = match.groups()
+        clauses.append((METRIC_CODES[metric], OPERATOR_CODES[op], to_cents(amount)))
+
+    match = _INVEST.match(str(rule.get("invest", "")))
+    if not match or match.group(2) not in METRIC_CODES:
+        raise ValueError(f"Rule '{name}': invest must look like '20% of surplus'")
+    percent = float(match.group(1))
+    if not 0 < percent <= 100:
+        raise ValueError(f"Rule '{name}': invest percentage must be between 0 and 100")
+
+    target = rule.get("target")
+    if target not in _TARGETS:
+        raise ValueError(f"Rule '{name}': unknown target '{target}'")
+
+    return {"name": name, "clauses": clauses, "percent": percent, "basis": METRIC_CODES[match.group(2)], "target": target}
+
+@dataclass(eq=False)
+class CompiledRules:
+    """
+    Rules of any number of users as flat arrays, so they are evaluated together.
+
+    - users: user names; rule_users holds int32 positions in it
+    - rule_names / rule_targets: per rule
+    - rule_percent / rule_basis: invest `percent`% of metric `basis`
+    - clause_slots: (rules, max clauses) clause ids per rule, -1 padded
+    - clause_metric / clause_op / clause_threshold: per clause (threshold in cents)
+    """
+    users: List[str]
+    rule_users: np.ndarray
+    rule_names: List[str]
+    rule_targets: List[str]
+    rule_percent: np.ndarray
+    rule_basis: np.ndarray
+    clause_slots: np.ndarray
+    clause_metric: np.ndarray
+    clause_op: np.ndarray
+    clause_threshold: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rule_names)
+
+def compile_rules(rules_by_user: Dict[str, Sequence[Dict[str, Any]]]) -> CompiledRules:
+    """Parse every user's rules once into a CompiledRules table"""
+    users = list(rules_by_user)
+    parsed = [(code, parse_rule(rule)) for code, user in enumerate(users) for rule in rules_by_user[user]]
+
+    width = max((len(rule["clauses"]) for _, rule in parsed), default=0)
+    clause_slots = np.full((len(parsed), width), -1, dtype=np.int32)
+    clauses = []
+    for index, (_, rule) in enumerate(parsed):
+        for slot, clause in enumerate(rule["clauses"]):
+            clause_slots[index, slot] = len(clauses)
+            clauses.append(clause)
+
+    return CompiledRules(
+        users=users,
+        rule_users=np.array([code for code, _ in parsed], dtype=np.int32),
+        rule_names=[rule["name"] for _, rule in parsed],
+        rule_targets=[rule["target"] for _, rule in parsed],
+        rule_percent=np.array([rule["percent"] for _, rule in parsed], dtype=np.float64),
+        rule_basis=np.array([rule["basis"] for _, rule in parsed], dtype=np.int8),
+        clause_slots=clause_slots,
+        clause_metric=np.array([metric for metric, _, _ in clauses], dtype=np.int8),
+        clause_op=np.array([op for _, op, _ in clauses], dtype=np.int8),
+        clause_threshold=np.array([threshold for _, _, threshold in clauses], dtype=np.int64)
+    )
+
+def monthly_metrics(table: TransactionTable) -> Tuple[np.ndarray, np.ndarray]:
+    """(months as datetime64[M], int64 matrix of METRICS in cents with one row per month)"""
+    months, month_index = np.unique(table.dates.astype("datetime64[M]"), return_inverse=True)
+    categories = len(CATEGORY_CODES)
+    totals = grouped_sum(
+        month_index.astype(np.int64) * categories + table.category_codes, table.amount_cents, len(months) * categories
+    ).reshape(len(months), categories)
+
+    metrics = np.empty((len(months), len(METRICS)), dtype=np.int64)
+    metrics[:, METRIC_CODES["income"]] = totals[:, CATEGORY_CODES[TransactionCategory.INCOME]]
+    metrics[:, METRIC_CODES["expenses"]] = totals[:, CATEGORY_CODES[TransactionCategory.EXPENSE]]
+    metrics[:, METRIC_CODES["savings"]] = totals[:, CATEGORY_CODES[TransactionCategory.SAVINGS]]
+    metrics[:, METRIC_CODES["investments"]] = totals[:, CATEGORY_CODES[TransactionCategory.INVESTMENT]]
+    metrics[:, METRIC_CODES["surplus"]] = metrics[:, METRIC_CODES["income"]] - metrics[:, METRIC_CODES["expenses"]]
+    return months, metrics
+
+def evaluate_rules(
+    compiled: CompiledRules,
+    metrics_by_user: Dict[str, Tuple[np.ndarray, np.ndarray]]
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate all compiled rules against every user's monthly metrics in one pass.
+
+    Each rule is paired with every month row of its user, each clause slot is
+    checked for all pairs at once, and triggered pairs become actions
+    {"user", "rule", "month", "target", "amount"}.
+    """
+    user_codes = {user: code for code, user in enumerate(compiled.users)}
+    present = [user for user in metrics_by_user if user in user_codes]
+    if not present or not len(compiled):
+        return []
+
+    # Stack the month rows, grouped by user code
+    present.sort(key=user_codes.get)
+    months = np.concatenate([metrics_by_user[user][0] for user in present])
+    metrics = np.concatenate([metrics_by_user[user][1] for user in present])
+    counts = np.zeros(len(compiled.users), dtype=np.int64)
+    counts[[user_codes[user] for user in present]] = [len(metrics_by_user[user][0]) for user in present]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Every (rule, month row of the rule's user) pair
+    lengths = counts[compiled.rule_users]
+    pair_rule = np.repeat(np.arange(len(compiled)), lengths)
+    pair_offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pair_row = starts[compiled.rule_users][pair_rule] + pair_offsets
+
+    triggered = np.ones(len(pair_rule), dtype=bool)
+    for slot in range(compiled.clause_slots.shape[1]):
+        clause = compiled.clause_slots[pair_rule, slot]
+        has_clause = clause >= 0
+        clause = clause[has_clause]
+        values = metrics[pair_row[has_clause], compiled.clause_metric[clause]]
+        sign = np.sign(values - compiled.clause_threshold[clause]) + 1
+        triggered[has_clause] &= _OPERATOR_TRUTH[compiled.clause_op[clause], sign]
+
+    pair_rule = pair_rule[triggered]
+    pair_row = pair_row[triggered]
+    amounts = np.rint(metrics[pair_row, compiled.rule_basis[pair_rule]] * compiled.rule_percent[pair_rule] / 100)
+    positive = amounts > 0
+
+    return [
+        {
+            "user": compiled.users[compiled.rule_users[rule]],
+            "rule": compiled.rule_names[rule],
+            "month": month,
+            "target": compiled.rule_targets[rule],
+            "amount": to_amount(int(amount))
+        }
+        for rule, month, amount in zip(
+            pair_rule[positive].tolist(),
+            np.datetime_as_string(months[pair_row[positive]]).tolist(),
+            amounts[positive].tolist()
+        )
+    ]
+
+def _rules_path(username: str) -> str:
+    """Rules file of a user; the name is percent-encoded so it cannot contain a path separator"""
+    return os.path.join(RULES_DIR, f"{quote(username, safe='')}.json")
+
+def save_rules(username: str, rules: List[Dict[str, Any]]) -> None:
+    """Validate and store a user's rule definitions, replacing any previous ones"""
+    compile_rules({username: rules})
+    os.makedirs(RULES_DIR, exist_ok=True)
+    path = _rules_path(username)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(rules))
+    os.replace(tmp_path, path)
+    _compiled_cache.pop(username, None)
+
+def load_rules(username: str) -> List[Dict[str, Any]]:
+    try:
+        with open(_rules_path(username), "rb") as f:
+            return loads(f.read())
+    except FileNotFoundError:
+        return []
+
+# username -> (rules file mtime, compiled rules), so uploads do not re-parse unchanged rules
+_compiled_cache: Dict[str, Tuple[int, CompiledRules]] = {}
+
+def compiled_rules_for(username: str) -> Optional[CompiledRules]:
+    """The user's stored rules, compiled once per change of the rules file"""
+    try:
+        mtime = os.stat(_rules_path(username)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _compiled_cache.get(username)
+    hit = cached is not None and cached[0] == mtime
+    CACHE_LOOKUPS.inc("compiled_rules", "hit" if hit else "miss")
+    if not hit:
+        cached = (mtime, compile_rules({username: load_rules(username)}))
+        _compiled_cache[username] = cached
+    return cached[1]
+
+@traced("auto_rules")
+def update_auto_investments(
+    username: str,
+    table: TransactionTable,
+    changed: TransactionTable,
+    previous: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Incremental evaluation after an upload: only the months containing rows of
+    `changed` are re-evaluated, using their full totals from `table`, and
+    their actions replace those months' entries in `previous`.
+    """
+    previous = previous or []
+    compiled = compiled_rules_for(username)
+    if compiled is None or not len(changed):
+        return previous
+
+    changed_months = np.unique(changed.dates.astype("datetime64[M]"))
+    affected = table[np.isin(table.dates.astype("datetime64[M]"), changed_months)]
+    actions = evaluate_rules(compiled, {username: monthly_metrics(affected)})
+
+    changed_labels = set(np.datetime_as_string(changed_months).tolist())
+    kept = [action for action in previous if action["month"] not in changed_labels]
+    return sorted(kept + actions, key=lambda action: (action["month"], action["rule"]))
@@ -3,10 +3,32 @@
 import pandas as pd
 import numpy as np
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set, Tuple
 from models.financial import FinancialData, Transaction, TransactionCategory
+from models.money import to_cents
+from services.tracing import traced
 import uuid
 
+# Columns that identify the same transaction across uploads
+DEDUPLICATION_KEY = ['date', 'amount', 'description']
+
+def transaction_key(transaction: Dict[str, Any]) -> Tuple[str, int, str]:
+    """
+    Deduplication key for a raw or stored transaction.
+    Only the calendar date is compared, and amounts are compared in cents.
+    """
+    amount_cents = transaction.get('amount_cents')
+    return (
+        str(transaction['date'])[:10],
+        int(amount_cents) if amount_cents is not None else to_cents(transaction['amount']),
+        str(transaction['description']).strip()
+    )
+
+def remove_known_transactions(known: Set[Tuple[str, int, str]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop transactions from `new` whose deduplication key is already in `known`"""
+    return [t for t in new if transaction_key(t) not in known]
+
+@traced("preprocess")
 def preprocess_financial_data(raw_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Preprocess raw financial data:
@@ -14,7 +36,8 @@ def preprocess_financial_data(raw_data: List[Dict[str, Any]]) -> List[Dict[str,
     - Normalize date formats
     - Standardize amounts
     - Remove duplicates
-    - Detect and flag anomalies
+    
+    Anomalies are scored after categorization (services.anomaly), per subcategory and merchant.
     """
     if not raw_data:
         return []
@@ -26,19 +49,9 @@ def preprocess_financial_data(raw_data: List[Dict[str, Any]]) -> List[Dict[str,
     if 'description' in df.columns:
         df['description'] = df['description'].fillna('Unknown Transaction')
     
-    if 'amount' in df.columns:
-        # Flag potential anomalies (amounts significantly larger than average)
-        mean_amount = df['amount'].mean()
-        std_amount = df['amount'].std()
-        threshold = mean_amount + 3 * std_amount
-        
-        anomalies = df[df['amount'] > threshold]
-        for idx, row in anomalies.iterrows():
-            df.loc[idx, 'tags'] = df.loc[idx, 'tags'] + ['potential_anomaly'] if isinstance(df.loc[idx, 'tags'], list) else ['potential_anomaly']
-    
     # Remove duplicates
-    if 'date' in df.columns and 'amount' in df.columns and 'description' in df.columns:
-        df = df.drop_duplicates(subset=['date', 'amount', 'description'])
+    if all(column in df.columns for column in DEDUPLICATION_KEY):
+        df = df.drop_duplicates(subset=DEDUPLICATION_KEY)
     
     # Ensure all transactions have IDs
     if 'id' not in df.columns:
@@ -47,10 +60,12 @@ def preprocess_financial_data(raw_data: List[Dict[str, Any]]) -> List[Dict[str,
     # Convert back to list of dicts
     return df.to_dict('records')
 
-def categorize_transactions(transactions: List[Dict[str, Any]]) -> FinancialData:
+@traced("categorize")
+def categorize_records(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Categorize transactions into income, expenses, savings, investments, etc.
     Apply machine learning or rule-based approaches to determine subcategories.
+    Updates and returns the transaction dicts.
     """
     # Keywords for categorization
     category_keywords = {
@@ -133,6 +148,13 @@ def categorize_transactions(transactions: List[Dict[str, Any]]) -> FinancialData
         if 'metadata' not in transaction:
             transaction['metadata'] = {}
     
+    return transactions
+
+@traced("categorize")
+def categorize_transactions(transactions: List[Dict[str, Any]]) -> FinancialData:
+    """Categorize transactions and wrap them in a validated FinancialData model"""
+    transactions = categorize_records(transactions)
+    
     # Create FinancialData object
     financial_data = FinancialData(
         file_id=str(uuid.uuid4()),
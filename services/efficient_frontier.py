@@ -0,0 +1,89 @@
+
+# services/efficient_frontier.py
+from typing import List, Optional
+
+import numpy as np
+from scipy.optimize import minimize
+
+# Frontier portfolios solved by the optimizer, and the risk-tolerance grid they are interpolated onto
+FRONTIER_POINTS = 101
+GRID_SIZE = 1001
+
+class EfficientFrontier:
+    """
+    Long-only mean-variance efficient frontier over a fixed set of assets,
+    tabulated on a risk-tolerance grid so each lookup is an index.
+
+    Risk tolerance 0 maps to the minimum-variance portfolio and 1 to the
+    highest-return asset; values in between target volatilities spaced
+    evenly between the two.
+    """
+    def __init__(self, names: List[str], expected_returns: np.ndarray, covariance: np.ndarray):
+        self.names = list(names)
+        self.expected_returns = np.asarray(expected_returns, dtype=np.float64)
+        self.covariance = np.asarray(covariance, dtype=np.float64)
+
+        returns, volatilities, weights = self._solve_frontier()
+        self.frontier_volatilities = volatilities
+
+        # Interpolate frontier weights at evenly spaced target volatilities
+        targets = np.linspace(volatilities[0], volatilities[-1], GRID_SIZE)
+        self.weights = np.stack(
+            [np.interp(targets, volatilities, weights[:, asset]) for asset in range(len(self.names))],
+            axis=1
+        )
+        self.weights /= self.weights.sum(axis=1, keepdims=True)
+        self.returns = self.weights @ self.expected_returns
+        self.volatilities = np.sqrt(np.einsum("gi,ij,gj->g", self.weights, self.covariance, self.weights))
+
+    def _minimum_variance(self, target_return: Optional[float], start: np.ndarray) -> np.ndarray:
+        """Long-only weights with the lowest variance, optionally constrained to a target return"""
+        constraints = [{"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: np.ones_like(w)}]
+        if target_return is not None:
+            constraints.append({
+                "type": "eq",
+                "fun": lambda w: w @ self.expected_returns - target_return,
+                "jac": lambda w: self.expected_returns
+            })
+        result = minimize(
+            lambda w: w @ self.covariance @ w,
+            start,
+            jac=lambda w: 2 * self.covariance @ w,
+            bounds=[(0.0, 1.0)] * len(start),
+            constraints=constraints,
+            method="SLSQP",
+            options={"ftol": 1e-12, "maxiter": 200}
+        )
+        weights = np.clip(result.x, 0.0, None)
+        return weights / weights.sum()
+
+    def _solve_frontier(self):
+        """Solve FRONTIER_POINTS portfolios from the minimum-variance return up to the highest asset return"""
+        size = len(self.names)
+        min_variance = self._minimum_variance(None, np.full(size, 1.0 / size))
+        targets = np.linspace(min_variance @ self.expected_returns, self.expected_returns.max(), FRONTIER_POINTS)
+
+        weights = [min_variance]
+        for target in targets[1:-1]:
+            # Warm-start each point from its neighbour
+            weights.append(self._minimum_variance(target, weights[-1]))
+        weights.append(np.eye(size)[int(np.argmax(self.expected_returns))])
+
+        weights = np.array(weights)
+        returns = weights @ self.expected_returns
+        volatilities = np.sqrt(np.einsum("fi,ij,fj->f", weights, self.covariance, weights))
+        # Guard against solver noise so np.interp sees increasing volatilities
+        volatilities = np.maximum.accumulate(volatilities)
+        return returns, volatilities, weights
+
+    def _index(self, risk_tolerance: float) -> int:
+        return int(round(min(max(risk_tolerance, 0.0), 1.0) * (GRID_SIZE - 1)))
+
+    def allocation(self, risk_tolerance: float) -> np.ndarray:
+        """Asset weights (summing to 1) for a risk tolerance in [0, 1]"""
+        return self.weights[self._index(risk_tolerance)]
+
+    def statistics(self, risk_tolerance: float):
+        """(expected return, volatility) of the allocation for a risk tolerance"""
+        index = self._index(risk_tolerance)
+        return float(self.returns[index]), float(self.volatilities[index])
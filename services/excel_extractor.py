@@ -5,7 +5,10 @@ import uuid
 from datetime import datetime
 from typing import List, Dict, Any, BinaryIO
 from models.financial import TransactionCategory
+from models.money import to_cents, to_amount
+from services.tracing import traced
 
+@traced("extract")
 def extract_from_excel(file: BinaryIO) -> List[Dict[str, Any]]:
     try:
         # Read Excel file
@@ -15,20 +18,22 @@ def extract_from_excel(file: BinaryIO) -> List[Dict[str, Any]]:
         transactions = []
         for _, row in df.iterrows():
             try:
-                # Convert Timestamp to string format
-                date = pd.to_datetime(row['Date']).strftime('%Y-%m-%d')
+                # Convert Timestamp to an ISO string at midnight (pydantic rejects bare dates for datetime fields)
+                date = pd.to_datetime(row['Date']).strftime('%Y-%m-%dT00:00:00')
                 
-                amount = float(row['Amount'])
+                # Parse the amount exactly into cents; the float is kept for preprocessing
+                amount_cents = to_cents(row['Amount'])
                 description = str(row['Description'])
                 
                 # Determine category based on amount
-                category = TransactionCategory.EXPENSE if amount < 0 else TransactionCategory.INCOME
+                category = TransactionCategory.EXPENSE if amount_cents < 0 else TransactionCategory.INCOME
                 
                 transactions.append({
                     "id": str(uuid.uuid4()),
-                    "date": date,  # Now a string in YYYY-MM-DD format
+                    "date": date,  # Now a string in YYYY-MM-DDT00:00:00 format
                     "description": description.strip(),
-                    "amount": abs(amount),
+                    "amount": to_amount(abs(amount_cents)),
+                    "amount_cents": abs(amount_cents),
                     "category": category,
                     "subcategory": None,
                     "tags": []
@@ -0,0 +1,73 @@
+
+# services/http_cache.py
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from services.metrics import CACHE_LOOKUPS
+from services.storage import get_file_version
+
+def get_cache_headers(request: Request, file_id: str) -> Optional[Dict[str, str]]:
+    """
+    Build ETag / Last-Modified headers for a response derived from a stored file.
+
+    The ETag covers the file version, the route and the query string, so
+    e.g. two horizons of the same forecast get different tags. Returns None
+    if the file does not exist.
+    """
+    version = get_file_version(file_id)
+    if version is None:
+        return None
+    file_version, last_modified = version
+
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    key = f"{file_id}:{file_version}:{request.url.path}?{query}"
+    # Weak validator: the body is equivalent across content encodings, not byte-identical
+    etag = 'W/"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+def is_not_modified(request: Request, cache_headers: Dict[str, str]) -> bool:
+    """Evaluate the conditional request headers, counting the outcome as an HTTP cache hit or miss"""
+    not_modified = _validators_match(request, cache_headers)
+    CACHE_LOOKUPS.inc("http_conditional", "hit" if not_modified else "miss")
+    return not_modified
+
+def _validators_match(request: Request, cache_headers: Dict[str, str]) -> bool:
+    """
+    Evaluate If-None-Match or, only when there is none, If-Modified-Since
+    against the current validators. Last-Modified has one-second resolution,
+    so a file rewritten within the second of the client's date keeps it:
+    If-Modified-Since matches only when Last-Modified is strictly older.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etag = _opaque_tag(cache_headers["ETag"])
+        return any(_opaque_tag(tag) == etag for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            last_modified = parsedate_to_datetime(cache_headers["Last-Modified"])
+        except (TypeError, ValueError):
+            return False
+        return last_modified < since
+
+    return False
+
+def not_modified_response(cache_headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=cache_headers)
+
+def _opaque_tag(tag: str) -> str:
+    """Weak comparison: ignore the W/ prefix"""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
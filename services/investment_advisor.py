@@ -1,167 +1,202 @@
-
 # services/investment_advisor.py
-from typing import List, Dict, Any, Optional
-import random
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from models.financial import InvestmentSuggestion
+from services.efficient_frontier import EfficientFrontier
+from services.monte_carlo import DEFAULT_PATHS, simulate_portfolio
+
+# Investment options by risk profile; expected returns and volatilities are annual assumptions
+low_risk_options = [
+    {
+        "type": "Bond",
+        "name": "Treasury Bonds",
+        "expected_return": 0.03,
+        "volatility": 0.05,
+        "risk_level": "Low",
+        "description": "Government bonds with stable returns and low risk",
+        "min_investment": 100
+    },
+    {
+        "type": "ETF",
+        "name": "Short-Term Bond ETF",
+        "expected_return": 0.035,
+        "volatility": 0.03,
+        "risk_level": "Low",
+        "description": "Exchange-traded fund focusing on short-term bonds",
+        "min_investment": 50
+    },
+    {
+        "type": "Fund",
+        "name": "Money Market Fund",
+        "expected_return": 0.02,
+        "volatility": 0.01,
+        "risk_level": "Very Low",
+        "description": "Liquid investments in high-quality, short-term debt",
+        "min_investment": 500
+    }
+]
+
+medium_risk_options = [
+    {
+        "type": "ETF",
+        "name": "S&P 500 Index ETF",
+        "expected_return": 0.07,
+        "volatility": 0.16,
+        "risk_level": "Medium",
+        "description": "Broad market exposure to the top 500 US companies",
+        "min_investment": 100
+    },
+    {
+        "type": "Fund",
+        "name": "Balanced Mutual Fund",
+        "expected_return": 0.06,
+        "volatility": 0.10,
+        "risk_level": "Medium",
+        "description": "Mix of stocks and bonds for balanced growth and income",
+        "min_investment": 1000
+    },
+    {
+        "type": "ETF",
+        "name": "Dividend Aristocrats ETF",
+        "expected_return": 0.055,
+        "volatility": 0.13,
+        "risk_level": "Medium-Low",
+        "description": "Companies with a history of increasing dividends",
+        "min_investment": 200
+    }
+]
+
+high_risk_options = [
+    {
+        "type": "ETF",
+        "name": "Technology Sector ETF",
+        "expected_return": 0.12,
+        "volatility": 0.25,
+        "risk_level": "High",
+        "description": "Exposure to high-growth technology companies",
+        "min_investment": 200
+    },
+    {
+        "type": "ETF",
+        "name": "Small Cap Growth ETF",
+        "expected_return": 0.10,
+        "volatility": 0.22,
+        "risk_level": "High",
+        "description": "Small companies with high growth potential",
+        "min_investment": 150
+    },
+    {
+        "type": "Fund",
+        "name": "Emerging Markets Fund",
+        "expected_return": 0.11,
+        "volatility": 0.24,
+        "risk_level": "Very High",
+        "description": "Investments in developing economies with high growth potential",
+        "min_investment": 500
+    }
+]
+
+RISK_BUCKETS = {
+    "low_risk": low_risk_options,
+    "medium_risk": medium_risk_options,
+    "high_risk": high_risk_options
+}
+
+# Every option, in the order used by the efficient frontier
+ALL_OPTIONS = [option for options in RISK_BUCKETS.values() for option in options]
+
+# Frontier weights below this share are not suggested
+MIN_ALLOCATION = 0.02
+
+# Assumed correlation of returns between options in the same bucket and across buckets
+SAME_BUCKET_CORRELATION = 0.7
+CROSS_BUCKET_CORRELATION = 0.3
+
+# Share of the net cashflow surplus assumed to be investable
+INVESTABLE_SHARE = 0.3
+
+def investable_amount(summary: Dict[str, float]) -> float:
+    """Amount available for investment given a statement's totals"""
+    net_cashflow = summary["total_income"] - summary["total_expenses"]
+    return max(0, net_cashflow * INVESTABLE_SHARE)
+
+def covariance_matrix(names: List[str]) -> np.ndarray:
+    """Annual return covariance of the named options, from their volatilities and the bucket correlations"""
+    options = {option["name"]: (bucket, option) for bucket, bucket_options in RISK_BUCKETS.items() for option in bucket_options}
+    buckets = np.array([options[name][0] for name in names])
+    volatility = np.array([options[name][1]["volatility"] for name in names])
+    correlation = np.where(buckets[:, None] == buckets[None, :], SAME_BUCKET_CORRELATION, CROSS_BUCKET_CORRELATION)
+    np.fill_diagonal(correlation, 1.0)
+    return correlation * np.outer(volatility, volatility)
+
+def portfolio_statistics(suggestions: List[InvestmentSuggestion]) -> Tuple[float, float]:
+    """Expected annual return and volatility of a suggested allocation"""
+    if not suggestions:
+        return 0.0, 0.0
+    weights = np.array([s.allocation_percentage for s in suggestions], dtype=np.float64)
+    weights /= weights.sum()
+    returns = np.array([s.expected_return for s in suggestions], dtype=np.float64)
+    covariance = covariance_matrix([s.name for s in suggestions])
+    return float(weights @ returns), float(np.sqrt(weights @ covariance @ weights))
+
+def project_suggestions(
+    suggestions: List[InvestmentSuggestion],
+    initial_amount: float,
+    years: int = 30,
+    monthly_contribution: float = 0.0,
+    paths: int = DEFAULT_PATHS,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Monte Carlo projection of a suggested allocation (see services.monte_carlo)"""
+    expected_return, volatility = portfolio_statistics(suggestions)
+    projection = simulate_portfolio(
+        initial_amount, expected_return, volatility,
+        years=years, monthly_contribution=monthly_contribution, paths=paths, seed=seed
+    )
+    projection["expected_return"] = expected_return
+    projection["volatility"] = volatility
+    return projection
+
+@lru_cache(maxsize=None)
+def efficient_frontier() -> EfficientFrontier:
+    """The frontier over ALL_OPTIONS, solved once per process (at application startup)"""
+    names = [option["name"] for option in ALL_OPTIONS]
+    expected_returns = np.array([option["expected_return"] for option in ALL_OPTIONS])
+    return EfficientFrontier(names, expected_returns, covariance_matrix(names))
 
 def generate_investment_suggestions(investable_amount: float, risk_tolerance: float) -> List[InvestmentSuggestion]:
     """
     Generate investment suggestions based on available funds and risk tolerance.
-    
+
+    The allocation is the mean-variance efficient portfolio for the risk
+    tolerance, looked up in the precomputed frontier. Options with a very small
+    weight, or whose share of the amount is below their minimum investment,
+    are dropped and the remaining weights rescaled.
+
     Args:
         investable_amount: Amount available for investment
         risk_tolerance: 0 (low risk) to 1 (high risk)
-    
+
     Returns:
         List of investment suggestions
     """
-    suggestions = []
-    
-    # Define investment options based on risk profiles
-    low_risk_options = [
-        {
-            "type": "Bond",
-            "name": "Treasury Bonds",
-            "expected_return": 0.03,
-            "risk_level": "Low",
-            "description": "Government bonds with stable returns and low risk",
-            "min_investment": 100
-        },
-        {
-            "type": "ETF",
-            "name": "Short-Term Bond ETF",
-            "expected_return": 0.035,
-            "risk_level": "Low",
-            "description": "Exchange-traded fund focusing on short-term bonds",
-            "min_investment": 50
-        },
-        {
-            "type": "Fund",
-            "name": "Money Market Fund",
-            "expected_return": 0.02,
-            "risk_level": "Very Low",
-            "description": "Liquid investments in high-quality, short-term debt",
-            "min_investment": 500
-        }
-    ]
-    
-    medium_risk_options = [
-        {
-            "type": "ETF",
-            "name": "S&P 500 Index ETF",
-            "expected_return": 0.07,
-            "risk_level": "Medium",
-            "description": "Broad market exposure to the top 500 US companies",
-            "min_investment": 100
-        },
-        {
-            "type": "Fund",
-            "name": "Balanced Mutual Fund",
-            "expected_return": 0.06,
-            "risk_level": "Medium",
-            "description": "Mix of stocks and bonds for balanced growth and income",
-            "min_investment": 1000
-        },
-        {
-            "type": "ETF",
-            "name": "Dividend Aristocrats ETF",
-            "expected_return": 0.055,
-            "risk_level": "Medium-Low",
-            "description": "Companies with a history of increasing dividends",
-            "min_investment": 200
-        }
+    weights = efficient_frontier().allocation(risk_tolerance)
+    selected = [
+        (option, weight) for option, weight in zip(ALL_OPTIONS, weights.tolist())
+        if weight >= MIN_ALLOCATION and option["min_investment"] <= investable_amount * weight
     ]
-    
-    high_risk_options = [
-        {
-            "type": "ETF",
-            "name": "Technology Sector ETF",
-            "expected_return": 0.12,
-            "risk_level": "High",
-            "description": "Exposure to high-growth technology companies",
-            "min_investment": 200
-        },
-        {
-            "type": "ETF",
-            "name": "Small Cap Growth ETF",
-            "expected_return": 0.10,
-            "risk_level": "High",
-            "description": "Small companies with high growth potential",
-            "min_investment": 150
-        },
-        {
-            "type": "Fund",
-            "name": "Emerging Markets Fund",
-            "expected_return": 0.11,
-            "risk_level": "Very High",
-            "description": "Investments in developing economies with high growth potential",
-            "min_investment": 500
-        }
+    total = sum(weight for _, weight in selected)
+
+    return [
+        InvestmentSuggestion(
+            type=option["type"],
+            name=option["name"],
+            allocation_percentage=round(100 * weight / total, 1),
+            expected_return=option["expected_return"],
+            risk_level=option["risk_level"],
+            description=option["description"],
+            min_investment=option["min_investment"]
+        )
+        for option, weight in selected
     ]
-    
-    # Allocate percentages based on risk tolerance
-    # Higher risk tolerance = more allocation to high risk investments
-    allocations = {
-        "low_risk": max(10, int(100 * (1 - risk_tolerance) * 0.7)),
-        "medium_risk": max(10, int(100 * (1 - abs(risk_tolerance - 0.5) * 1.5))),
-        "high_risk": max(10, int(100 * risk_tolerance * 0.7))
-    }
-    
-    # Normalize to ensure they sum to 100
-    total = sum(allocations.values())
-    allocations = {k: v * 100 // total for k, v in allocations.items()}
-    
-    # Adjust to ensure sum is 100
-    remaining = 100 - sum(allocations.values())
-    if risk_tolerance < 0.33:
-        allocations["low_risk"] += remaining
-    elif risk_tolerance < 0.66:
-        allocations["medium_risk"] += remaining
-    else:
-        allocations["high_risk"] += remaining
-    
-    # Select investment options based on allocations
-    if allocations["low_risk"] > 0:
-        # Choose options based on available amount
-        options = [opt for opt in low_risk_options if opt["min_investment"] <= investable_amount * allocations["low_risk"] / 100]
-        if options:
-            selection = random.choice(options)
-            suggestions.append(InvestmentSuggestion(
-                type=selection["type"],
-                name=selection["name"],
-                allocation_percentage=allocations["low_risk"],
-                expected_return=selection["expected_return"],
-                risk_level=selection["risk_level"],
-                description=selection["description"],
-                min_investment=selection["min_investment"]
-            ))
-    
-    if allocations["medium_risk"] > 0:
-        options = [opt for opt in medium_risk_options if opt["min_investment"] <= investable_amount * allocations["medium_risk"] / 100]
-        if options:
-            selection = random.choice(options)
-            suggestions.append(InvestmentSuggestion(
-                type=selection["type"],
-                name=selection["name"],
-                allocation_percentage=allocations["medium_risk"],
-                expected_return=selection["expected_return"],
-                risk_level=selection["risk_level"],
-                description=selection["description"],
-                min_investment=selection["min_investment"]
-            ))
-    
-    if allocations["high_risk"] > 0:
-        options = [opt for opt in high_risk_options if opt["min_investment"] <= investable_amount * allocations["high_risk"] / 100]
-        if options:
-            selection = random.choice(options)
-            suggestions.append(InvestmentSuggestion(
-                type=selection["type"],
-                name=selection["name"],
-                allocation_percentage=allocations["high_risk"],
-                expected_return=selection["expected_return"],
-                risk_level=selection["risk_level"],
-                description=selection["description"],
-                min_investment=selection["min_investment"]
-            ))
-    
-    return suggestions
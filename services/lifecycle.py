@@ -0,0 +1,205 @@
+# services/lifecycle.py
+import asyncio
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from services.serialization import loads
+from services.shared_cache import get_backend
+from services.storage import STORAGE_DIR, delete_statement, stored_bytes
+from services.upload_index import forget_file
+
+# Lifecycle of stored statements.
+#
+# A catalog (SQLite, shared by the workers) records the owner, size and expiry
+# of every stored file_id. Uploads are refused once a user's stored bytes
+# reach their quota, and a periodic garbage collection removes expired files,
+# leftover temporary files and column directories from interrupted writes and
+# catalog rows whose files are gone, adopts files written before the catalog existed, and
+# compacts the catalog.
+
+FILE_TTL_DAYS = float(os.getenv("FILE_TTL_DAYS", "30"))          # 0 keeps files forever
+MAX_FILE_TTL_DAYS = 365
+USER_QUOTA_MB = float(os.getenv("USER_QUOTA_MB", "500"))         # 0 means no quota
+GC_INTERVAL_SECONDS = float(os.getenv("GC_INTERVAL_SECONDS", "3600"))  # 0 disables the background task
+CATALOG_PATH = os.path.join(STORAGE_DIR, "index", "catalog.sqlite3")
+
+# Temporary files older than this are left over from interrupted writes
+STALE_TMP_SECONDS = 3600
+
+SECONDS_PER_DAY = 86400
+
+# Stored size of a statement: the columns and document take about 80-110 bytes a
+# row (more for long descriptions) plus a few KB of headers and summaries
+STORED_BYTES_PER_ROW = 120
+STORED_BYTES_OVERHEAD = 16 * 1024
+
+logger = logging.getLogger(__name__)
+
+class StorageCatalog:
+    """Owner, size and expiry of stored files; `storage_dir` must be the directory services.storage writes to"""
+    def __init__(self, path: str = CATALOG_PATH, storage_dir: str = STORAGE_DIR):
+        self.path = path
+        self.storage_dir = storage_dir
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " file_id TEXT PRIMARY KEY, user_id TEXT, bytes INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._connection().execute("CREATE INDEX IF NOT EXISTS files_user ON files (user_id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def register(self, file_id: str, user_id: Optional[str], ttl_days: Optional[float] = None) -> None:
+        """
+        Record a file after it is written. New files expire after `ttl_days`
+        (FILE_TTL_DAYS by default); for known files only the size is updated,
+        unless a new TTL is given.
+        """
+        now = time.time()
+        ttl = FILE_TTL_DAYS if ttl_days is None else ttl_days
+        expires_at = now + ttl * SECONDS_PER_DAY if ttl > 0 else None
+        self._connection().execute(
+            "INSERT INTO files (file_id, user_id, bytes, created_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (file_id) DO UPDATE SET bytes = excluded.bytes"
+            + (", expires_at = excluded.expires_at" if ttl_days is not None else ""),
+            (file_id, user_id, stored_bytes(file_id), now, expires_at)
+        )
+
+    def usage(self, user_id: str) -> int:
+        row = self._connection().execute("SELECT COALESCE(SUM(bytes), 0) FROM files WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0]
+
+    def within_quota(self, user_id: str, incoming_bytes: int, quota_mb: Optional[float] = None) -> bool:
+        """Whether `incoming_bytes` more fit in the user's quota"""
+        quota_mb = USER_QUOTA_MB if quota_mb is None else quota_mb
+        return quota_mb <= 0 or self.usage(user_id) + incoming_bytes <= quota_mb * 1024 * 1024
+
+    def usage_report(self) -> List[Dict[str, Any]]:
+        """Files, bytes and expiry range per user"""
+        rows = self._connection().execute(
+            "SELECT user_id, COUNT(*), SUM(bytes), MIN(created_at), MIN(expires_at) FROM files "
+            "GROUP BY user_id ORDER BY SUM(bytes) DESC"
+        ).fetchall()
+        quota = int(USER_QUOTA_MB * 1024 * 1024) if USER_QUOTA_MB > 0 else None
+        return [
+            {
+                "user_id": user_id,
+                "files": files,
+                "bytes": total,
+                "quota_bytes": quota,
+                "oldest_created_at": oldest,
+                "next_expiry_at": next_expiry
+            }
+            for user_id, files, total, oldest, next_expiry in rows
+        ]
+
+    def _delete(self, file_id: str) -> int:
+        freed = delete_statement(file_id)
+        forget_file(file_id)
+        self._connection().execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+        return freed
+
+    def collect_garbage(self, now: Optional[float] = None) -> Dict[str, int]:
+        """One garbage-collection pass; returns what it did"""
+        now = time.time() if now is None else now
+        connection = self._connection()
+        stats = {"expired": 0, "stale_tmp": 0, "orphaned_columns": 0, "missing": 0, "adopted": 0, "bytes_freed": 0}
+
+        expired = connection.execute("SELECT file_id FROM files WHERE expires_at <= ?", (now,)).fetchall()
+        for (file_id,) in expired:
+            stats["bytes_freed"] += self._delete(file_id)
+            stats["expired"] += 1
+
+        known = {file_id for (file_id,) in connection.execute("SELECT file_id FROM files")}
+        on_disk = set()
+        for entry in os.scandir(self.storage_dir):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".tmp"):
+                if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                    stats["bytes_freed"] += entry.stat().st_size
+                    os.remove(entry.path)
+                    stats["stale_tmp"] += 1
+            elif entry.name.endswith(".json"):
+                on_disk.add(entry.name[:-len(".json")])
+
+        columns_dir = os.path.join(self.storage_dir, "columns")
+        for entry in os.scandir(columns_dir) if os.path.isdir(columns_dir) else ():
+            # Columns are written before their document, so only old directories are orphans
+            if entry.name not in on_disk and now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                stats["bytes_freed"] += _directory_bytes(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+                stats["orphaned_columns"] += 1
+
+        for file_id in known - on_disk:
+            connection.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+            stats["missing"] += 1
+
+        for file_id in on_disk - known:
+            self._adopt(file_id, now)
+            stats["adopted"] += 1
+
+        if stats["expired"] or stats["missing"]:
+            connection.execute("VACUUM")
+        return stats
+
+    def _adopt(self, file_id: str, now: float) -> None:
+        """
+        Catalog a file written before the catalog existed. Its TTL starts now,
+        not when it was written, so existing statements are not deleted unannounced.
+        """
+        path = os.path.join(self.storage_dir, f"{file_id}.json")
+        try:
+            with open(path, "rb") as f:
+                user_id = loads(f.read()).get("user_id")
+        except (OSError, ValueError):
+            user_id = None
+        written = os.path.getmtime(path)
+        expires_at = now + FILE_TTL_DAYS * SECONDS_PER_DAY if FILE_TTL_DAYS > 0 else None
+        self._connection().execute(
+            "INSERT OR IGNORE INTO files (file_id, user_id, bytes, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (file_id, user_id, os.path.getsize(path), written, expires_at)
+        )
+
+def _directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for directory, _, names in os.walk(path) for name in names)
+
+def estimate_stored_bytes(rows: int) -> int:
+    """Bytes that storing a statement of `rows` rows will add, as the catalog counts them"""
+    return STORED_BYTES_OVERHEAD + STORED_BYTES_PER_ROW * rows
+
+@lru_cache(maxsize=None)
+def storage_catalog() -> StorageCatalog:
+    return StorageCatalog()
+
+async def run_periodic_gc(interval: float = GC_INTERVAL_SECONDS) -> None:
+    """
+    Background task: collect garbage (and expired shared cache entries) every
+    `interval` seconds. With several workers, the shared cache lease makes only
+    one of them run each pass.
+    """
+    while True:
+        try:
+            if get_backend().add("lifecycle:gc", b"running", interval * 0.9):
+                stats = await run_in_threadpool(storage_catalog().collect_garbage)
+                stats["cache_entries_purged"] = await run_in_threadpool(get_backend().purge_expired)
+                logger.info(f"Storage garbage collection: {stats}")
+        except Exception as e:
+            logger.error(f"Storage garbage collection failed: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,133 @@
+# services/logging_setup.py
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import Optional
+
+from services.tracing import current_request_id
+
+# Request handlers only put records on an in-memory queue; a QueueListener
+# thread formats them and does the file and console I/O, so a slow disk never
+# blocks the event loop. The file rotates by size.
+#
+# Several processes must not rotate one file. With several uvicorn workers,
+# either give each worker its own file ("{pid}" in LOG_FILE is replaced by the
+# process id, e.g. LOG_FILE=app.{pid}.log), or set LOG_ROTATION=external to
+# append to a shared file that an external tool such as logrotate rotates
+# (the file is reopened when it is moved away).
+
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size").lower()  # "size" or "external"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; any other attribute was passed in `extra`
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, the request id
+    when there is one, and the fields passed in `extra`.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _RequestIdFilter(logging.Filter):
+    """Captures the request id on the logging thread, before the record is queued, unless passed in `extra`"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = current_request_id()
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep exc_info for the listener's formatter instead of flattening it into the message
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+class _QueueListener(logging.handlers.QueueListener):
+    def stop(self) -> None:
+        # Safe to call twice: explicitly and again at interpreter exit
+        if self._thread is not None:
+            super().stop()
+
+# The listener of the current configuration, replaced on reconfiguration
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(
+    log_file: str = LOG_FILE,
+    level: str = LOG_LEVEL,
+    log_format: str = LOG_FORMAT,
+    logger: Optional[logging.Logger] = None,
+    console: bool = True,
+    rotation: str = LOG_ROTATION
+) -> logging.handlers.QueueListener:
+    """
+    Route `logger` (the root logger by default) through a queue to a rotating
+    file handler and the console. Returns the started listener; it is also
+    stopped at interpreter exit, flushing whatever is still queued.
+    """
+    global _listener
+    logger = logger or logging.getLogger()
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+
+    log_file = log_file.replace("{pid}", str(os.getpid()))
+    if rotation == "external":
+        file_handler: logging.Handler = logging.handlers.WatchedFileHandler(log_file, encoding="utf-8")
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    handlers = [file_handler]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_RequestIdFilter())
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    if _listener is not None and logger is logging.getLogger():
+        atexit.unregister(_listener.stop)
+        _listener.stop()
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+
+    listener = _QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    if logger is logging.getLogger():
+        _listener = listener
+    return listener
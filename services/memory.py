@@ -0,0 +1,120 @@
+# services/memory.py
+import logging
+import os
+import resource
+import time
+import tracemalloc
+from typing import Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from services.metrics import Counter, Histogram
+
+# Per-request memory accounting for the upload and prediction endpoints.
+#
+# MEMORY_TRACKING selects the instrumentation (off by default):
+#   - "rss": growth of the resident set size and of the process peak RSS during
+#     the request (cheap but approximate: it includes other requests running at
+#     the same time, and a peak below the process's earlier high-water mark is
+#     not visible)
+#   - "tracemalloc": peak of Python-tracked allocations during the request
+#     (precise for a single request; slows allocation-heavy code noticeably)
+#
+# MEMORY_BUDGET_MB is a hard per-request budget, enforced up front from the
+# input size: the estimates below were calibrated with tracemalloc on synthetic
+# statements. 0 disables the budget.
+
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "off").lower()
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "1024"))
+
+# Paths whose requests are measured
+TRACKED_PATHS = ("/upload/excel", "/upload/excel/append", "/upload/pdf", "/predict/expenses", "/predict/savings")
+
+# Peak bytes per uploaded byte through extraction, preprocessing and categorization
+# (~47 for .xlsx, rounded up for scoring and persistence); PDF parsing runs in tabula's JVM
+UPLOAD_BYTES_PER_BYTE = {"excel": 60, "pdf": 20}
+
+# Prophet: fixed model overhead plus a per-day cost over history + horizon
+FORECAST_BASE_BYTES = 12 * 1024 * 1024
+FORECAST_BYTES_PER_DAY = 28 * 1024
+
+MEMORY_BUCKETS = tuple(float(2 ** power * 1024 * 1024) for power in range(0, 13))  # 1 MB .. 4 GB
+
+REQUEST_MEMORY_PEAK = Histogram(
+    "request_memory_peak_bytes", "Peak memory growth of tracked requests", ("path",), buckets=MEMORY_BUCKETS
+)
+MEMORY_BUDGET_REJECTIONS = Counter(
+    "memory_budget_rejections_total", "Requests rejected because their estimated memory exceeds the budget", ("kind",)
+)
+
+logger = logging.getLogger(__name__)
+
+def estimate_upload_bytes(kind: str, size: int) -> int:
+    """Predicted peak memory for processing an upload of `size` bytes"""
+    return int(size * UPLOAD_BYTES_PER_BYTE[kind])
+
+def estimate_forecast_bytes(history_days: int, horizon_days: int) -> int:
+    """Predicted peak memory for fitting and predicting a Prophet model"""
+    return FORECAST_BASE_BYTES + (history_days + max(horizon_days, 0)) * FORECAST_BYTES_PER_DAY
+
+def exceeds_budget(kind: str, estimate: int, budget_mb: Optional[float] = None) -> bool:
+    """True (and counted) when `estimate` bytes would exceed the per-request budget"""
+    budget_mb = MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    if budget_mb <= 0 or estimate <= budget_mb * 1024 * 1024:
+        return False
+    MEMORY_BUDGET_REJECTIONS.inc(kind)
+    return True
+
+def _current_rss() -> int:
+    """Resident set size in bytes (Linux /proc; falls back to the peak elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _peak_rss()
+
+def _peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class _Measurement:
+    def __init__(self, mode: str):
+        self.mode = mode
+        if mode == "tracemalloc":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+        else:
+            self.baseline = _current_rss()
+            self.peak_before = _peak_rss()
+
+    def finish(self) -> Tuple[int, int]:
+        """(peak growth, net growth) in bytes since the measurement started"""
+        if self.mode == "tracemalloc":
+            current, peak = tracemalloc.get_traced_memory()
+            return max(peak - self.baseline, 0), current - self.baseline
+        current = _current_rss()
+        return max(_peak_rss() - self.peak_before, current - self.baseline, 0), current - self.baseline
+
+class MemoryMiddleware:
+    """Logs and records the peak memory growth of requests to TRACKED_PATHS"""
+    def __init__(self, app: ASGIApp, mode: str = MEMORY_TRACKING):
+        self.app = app
+        self.mode = mode if mode in ("rss", "tracemalloc") else "off"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.mode == "off" or scope["type"] != "http" or scope["path"] not in TRACKED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        measurement = _Measurement(self.mode)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            peak, net = measurement.finish()
+            REQUEST_MEMORY_PEAK.observe(peak, scope["path"])
+            logger.info(
+                f"Memory {scope['method']} {scope['path']}: peak +{peak / 2**20:.1f} MB, "
+                f"net {net / 2**20:+.1f} MB ({self.mode}, {time.perf_counter() - start:.2f}s)"
+            )
@@ -0,0 +1,238 @@
+# services/metrics.py
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus text exposition (format 0.0.4), without the client library.
+#
+# Hot-path updates never take a lock: every metric keeps one shard per thread,
+# only the owning thread writes to its shard, and /metrics sums the shards
+# when it is scraped. A shard is registered once per (metric, thread).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FIT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+        return shard
+
+    def _totals(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterable[str]:
+        for key, value in sorted(self._totals().items()):
+            yield f"{self.name}{self._labels(key)} {_format(value)}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._totals().get(labels, 0)
+
+class Gauge(_Metric):
+    """A gauge summed over threads; with `function`, the value is computed at scrape time instead"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def _totals(self) -> Dict[Tuple[str, ...], float]:
+        return self.function() if self.function is not None else super()._totals()
+
+class Histogram(_Metric):
+    """Cumulative buckets plus _sum and _count; each shard entry is [bucket counts..., +Inf count, sum]"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _totals(self) -> Dict[Tuple[str, ...], List[float]]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in list(self._shards):
+            for key, counts in list(shard.items()):
+                total = totals.setdefault(key, [0] * len(counts))
+                for index, value in enumerate(list(counts)):
+                    total[index] += value
+        return totals
+
+    def count(self, *labels: str) -> int:
+        counts = self._totals().get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> Iterable[str]:
+        for key, counts in sorted(self._totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format(bound)}"'
+                yield f"{self.name}_bucket{self._labels(key, le)} {_format(cumulative)}"
+            yield f"{self.name}_sum{self._labels(key)} {_format(counts[-1])}"
+            yield f"{self.name}_count{self._labels(key)} {_format(cumulative)}"
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+REGISTRY: List[_Metric] = []
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+# Application metrics
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+FORECAST_FIT_SECONDS = Histogram(
+    "forecast_fit_duration_seconds", "Time spent fitting forecast models", ("model",), buckets=FIT_BUCKETS
+)
+STAGE_LATENCY = Histogram("stage_duration_seconds", "Time spent in each traced service stage", ("stage",))
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes of uploaded statements processed", ("kind",))
+UPLOAD_ROWS = Counter("upload_rows_total", "Transactions extracted from uploaded statements", ("kind",))
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result"))
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    lookups = CACHE_LOOKUPS._totals()
+    caches = {cache for cache, _ in lookups}
+    ratios = {}
+    for cache in caches:
+        hits = lookups.get((cache, "hit"), 0)
+        total = hits + lookups.get((cache, "miss"), 0)
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+def _threadpool_queue_depth() -> Dict[Tuple[str, ...], float]:
+    """Work items waiting for a thread in the event loop's default executor (used by run_in_threadpool)"""
+    try:
+        executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    except RuntimeError:
+        executor = None
+    queue = getattr(executor, "_work_queue", None)
+    return {(): queue.qsize() if queue is not None else 0}
+
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Share of cache lookups that were hits", ("cache",), function=_cache_hit_ratios)
+THREADPOOL_QUEUE_DEPTH = Gauge(
+    "threadpool_queue_depth", "Tasks queued for the worker thread pool", function=_threadpool_queue_depth
+)
+
+# endpoint -> route template, filled as routes are first seen
+_route_templates: Dict[Callable, str] = {}
+
+def route_template(scope: Scope) -> str:
+    """The path template of the route that handled a request, once the router has run"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    route = _route_templates.get(endpoint)
+    if route is None:
+        route = next((r.path for r in scope["app"].routes if getattr(r, "endpoint", None) is endpoint), "unmatched")
+        _route_templates[endpoint] = route
+    return route
+
+class MetricsMiddleware:
+    """
+    Records in-flight requests and latency per route template. The route is
+    resolved after the router has run (it stores the endpoint in the scope),
+    so unmatched paths are grouped under "unmatched" instead of adding series.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], route_template(scope), status)
@@ -4,7 +4,10 @@ import uuid
 from typing import List, Dict, Any
 from datetime import datetime
 from models.financial import TransactionCategory, PDFTransaction
+from models.money import to_cents, to_amount
+from services.tracing import traced
 
+@traced("extract")
 def extract_from_pdf(file_path: str) -> Dict[str, Any]:
     try:
         # Read tables from PDF
@@ -30,7 +33,7 @@ def extract_from_pdf(file_path: str) -> Dict[str, Any]:
                 
                 # Clean and convert amount
                 amount_str = str(row['Amount']).replace('$', '').replace(',', '')
-                amount = float(amount_str)
+                amount = to_amount(to_cents(amount_str))
                 
                 # Create transaction
                 transaction = PDFTransaction(
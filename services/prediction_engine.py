@@ -9,6 +9,10 @@ from sklearn.ensemble import RandomForestRegressor
 import plotly.graph_objects as go
 import json
 
+from services.metrics import FORECAST_FIT_SECONDS
+from services.tracing import traced
+
+@traced("forecast")
 def forecast_expenses(expense_df: pd.DataFrame, horizon_days: int = 30) -> Dict[str, Any]:
     """
     Forecast future expenses using Prophet time series model
@@ -28,7 +32,8 @@ def forecast_expenses(expense_df: pd.DataFrame, horizon_days: int = 30) -> Dict[
         seasonality_mode='multiplicative'
     )
     
-    model.fit(daily_expenses)
+    with FORECAST_FIT_SECONDS.time("expenses"):
+        model.fit(daily_expenses)
     
     # Create future dataframe for prediction
     future = model.make_future_dataframe(periods=horizon_days)
@@ -82,6 +87,7 @@ def forecast_expenses(expense_df: pd.DataFrame, horizon_days: int = 30) -> Dict[
         "chart_data": chart_data
     }
 
+@traced("forecast")
 def predict_savings_potential(savings_df: pd.DataFrame, horizon_days: int = 30, saving_rate: float = None) -> Dict[str, Any]:
     """
     Predict potential savings based on historical data and optional saving rate
@@ -112,7 +118,8 @@ def predict_savings_potential(savings_df: pd.DataFrame, horizon_days: int = 30,
         changepoint_prior_scale=0.05  # More flexible trend changes
     )
     
-    model.fit(daily_savings)
+    with FORECAST_FIT_SECONDS.time("savings"):
+        model.fit(daily_savings)
     
     # Create future dataframe for prediction
     future = model.make_future_dataframe(periods=horizon_days)
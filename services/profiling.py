@@ -0,0 +1,164 @@
+# services/profiling.py
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from typing import Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.metrics import Counter, route_template
+from services.storage import STORAGE_DIR
+from services.tracing import current_request_id
+
+# Opt-in statistical profiling of individual requests.
+#
+# A request is profiled when it is sampled (PROFILE_SAMPLE_RATE, 0..1) or when
+# it carries `X-Profile: <PROFILE_ADMIN_TOKEN>` (disabled while no token is
+# set). A sampler thread records the stack of the thread serving the request
+# every PROFILE_INTERVAL_MS and writes, per request:
+#
+#     PROFILE_DIR/<route>/<request id>.folded   collapsed stacks, for flamegraph.pl / speedscope
+#     PROFILE_DIR/<route>/<request id>.json     route, status, duration and the top self-time frames
+#
+# The async handlers (including authentication and parsing) run on the event
+# loop thread, which is the thread sampled. Other requests interleaved on the
+# loop at the same time show up in the same profile.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(STORAGE_DIR, "profiles"))
+PROFILE_HEADER = "x-profile"
+TOP_FRAMES = 25
+
+PROFILES_CAPTURED = Counter("profiles_captured_total", "Requests profiled, by route", ("route",))
+
+logger = logging.getLogger(__name__)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a background thread"""
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_self(self, limit: int = TOP_FRAMES) -> List[Dict[str, object]]:
+        """Frames by the number of samples in which they were innermost"""
+        leaves: StackCounter = StackCounter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {"frame": frame, "samples": count, "share": round(count / total, 4)}
+            for frame, count in leaves.most_common(limit)
+        ]
+
+def _route_slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", route).strip("_") or "root"
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled or admin-requested requests and stores the result keyed by
+    route and request id; profiled responses carry an X-Profile-ID header.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        admin_token: str = PROFILE_ADMIN_TOKEN,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        profile_dir: str = PROFILE_DIR
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.interval = interval_ms / 1000
+        self.profile_dir = profile_dir
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self.admin_token:
+            requested = dict(scope["headers"]).get(PROFILE_HEADER.encode(), b"").decode("latin-1")
+            if requested == self.admin_token:
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = current_request_id() or f"{time.time_ns():x}"
+        status: Optional[int] = None
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-ID", request_id)
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), self.interval).start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            self._store(scope, request_id, status, time.perf_counter() - start, sampler)
+
+    def _store(self, scope: Scope, request_id: str, status: Optional[int], elapsed: float, sampler: StackSampler) -> None:
+        route = route_template(scope)
+        directory = os.path.join(self.profile_dir, _route_slug(route))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{request_id}.folded"), "w") as f:
+                f.write(sampler.folded())
+            with open(os.path.join(directory, f"{request_id}.json"), "w") as f:
+                json.dump({
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "interval_ms": self.interval * 1000,
+                    "samples": sum(sampler.stacks.values()),
+                    "top_self": sampler.top_self()
+                }, f, indent=2)
+            PROFILES_CAPTURED.inc(route)
+        except OSError as e:
+            # Profiling must never fail the request it observed
+            logger.error(f"Could not store profile {request_id}: {str(e)}")
@@ -0,0 +1,123 @@
+# services/rate_limit.py
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from services.metrics import Counter
+from services.shared_cache import CacheBackend, get_backend
+
+# Per-user admission control for the expensive endpoints. Each endpoint has a
+# cost class; per user, every route of a class has its own token bucket
+# (`per_minute` refill, `burst` capacity) and the class as a whole allows at
+# most `concurrency` requests in flight.
+#
+#   RATE_LIMITING=off          disable admission control
+#   RATE_LIMITS='{"forecast": {"per_minute": 30, "burst": 10, "concurrency": 2}}'
+#   RATE_LIMIT_BACKEND=shared  enforce across workers through the shared cache backend
+#                              (fixed one-minute windows instead of token buckets)
+
+RATE_LIMITING = os.getenv("RATE_LIMITING", "on").lower() != "off"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local").lower()
+
+@dataclass(frozen=True)
+class CostClass:
+    per_minute: float
+    burst: int
+    concurrency: int
+
+COST_CLASSES: Dict[str, CostClass] = {
+    "forecast": CostClass(per_minute=12, burst=5, concurrency=1),      # Prophet fits
+    "simulation": CostClass(per_minute=30, burst=10, concurrency=2),   # Monte Carlo projections
+    "upload": CostClass(per_minute=30, burst=20, concurrency=2),       # parsing and categorization
+}
+for _name, _limits in json.loads(os.getenv("RATE_LIMITS", "{}")).items():
+    COST_CLASSES[_name] = CostClass(**{**COST_CLASSES.get(_name, CostClass(60, 10, 4)).__dict__, **_limits})
+
+# The shared in-flight counter of a user and class expires this long after its last
+# acquire or release, so slots held by a killed worker are eventually given back
+SLOT_LEASE_SECONDS = 300.0
+
+# How often the local limiter drops buckets that have refilled to `burst` (a
+# missing bucket is a full one), so idle users do not accumulate
+BUCKET_SWEEP_SECONDS = 60.0
+
+RATE_LIMITED = Counter("rate_limited_total", "Requests rejected by admission control", ("cost_class", "reason"))
+
+class RateLimited(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(int(retry_after), 1)
+
+class LocalLimiter:
+    """Token buckets and concurrency counters of this process; only used from the event loop"""
+    def __init__(self, classes: Dict[str, CostClass] = COST_CLASSES):
+        self.classes = classes
+        # (user, route) -> (tokens, updated, time the bucket is full again)
+        self._buckets: Dict[Tuple[str, str], Tuple[float, float, float]] = {}
+        self._active: Dict[Tuple[str, str], int] = {}
+        self._next_sweep = time.monotonic() + BUCKET_SWEEP_SECONDS
+
+    def acquire(self, user: str, route: str, cost_class: str) -> None:
+        """Take a token and a concurrency slot, or raise RateLimited"""
+        limits = self.classes[cost_class]
+        active = self._active.get((user, cost_class), 0)
+        if active >= limits.concurrency:
+            raise RateLimited("concurrency", 1)
+
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        rate = limits.per_minute / 60
+        tokens, updated, _ = self._buckets.get((user, route), (limits.burst, now, now))
+        tokens = min(limits.burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self._buckets[(user, route)] = (tokens, now, now + (limits.burst - tokens) / rate)
+            raise RateLimited("rate", math.ceil((1 - tokens) / rate))
+
+        self._buckets[(user, route)] = (tokens - 1, now, now + (limits.burst - tokens + 1) / rate)
+        self._active[(user, cost_class)] = active + 1
+
+    def release(self, user: str, cost_class: str) -> None:
+        active = self._active[(user, cost_class)] - 1
+        if active:
+            self._active[(user, cost_class)] = active
+        else:
+            del self._active[(user, cost_class)]
+
+    def _sweep(self, now: float) -> None:
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._next_sweep = now + BUCKET_SWEEP_SECONDS
+
+class SharedLimiter:
+    """Limits enforced by every worker sharing a cache backend"""
+    def __init__(self, backend: Optional[CacheBackend] = None, classes: Dict[str, CostClass] = COST_CLASSES):
+        self.backend = backend
+        self.classes = classes
+
+    def _backend(self) -> CacheBackend:
+        return self.backend or get_backend()
+
+    def acquire(self, user: str, route: str, cost_class: str) -> None:
+        limits = self.classes[cost_class]
+        backend = self._backend()
+        slot_key = f"ratelimit:active:{user}:{cost_class}"
+        if backend.incr(slot_key, 1, SLOT_LEASE_SECONDS) > limits.concurrency:
+            backend.decr(slot_key, 1, SLOT_LEASE_SECONDS)
+            raise RateLimited("concurrency", 1)
+
+        now = time.time()
+        window = int(now // 60)
+        if backend.incr(f"ratelimit:rate:{user}:{route}:{window}", 1, 61) > max(limits.per_minute, 1):
+            backend.decr(slot_key, 1, SLOT_LEASE_SECONDS)
+            raise RateLimited("rate", math.ceil(60 - now % 60))
+
+    def release(self, user: str, cost_class: str) -> None:
+        # A counter that expired during a long request is not recreated (it would go negative)
+        self._backend().decr(f"ratelimit:active:{user}:{cost_class}", 1, SLOT_LEASE_SECONDS)
+
+def create_limiter(backend: str = RATE_LIMIT_BACKEND):
+    return SharedLimiter() if backend == "shared" else LocalLimiter()
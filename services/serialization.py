@@ -0,0 +1,75 @@
+
+# services/serialization.py
+import datetime
+import decimal
+from typing import Any, Dict, List
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# NumPy scalars/arrays and datetime64 are encoded natively by orjson;
+# dict keys such as dates or enums are allowed as well.
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(obj: Any) -> Any:
+    """Encode the pandas/pydantic types orjson does not know about"""
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.to_pydatetime().isoformat()
+    if isinstance(obj, pd.DataFrame):
+        return dataframe_to_records(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(obj: Any) -> bytes:
+    """Serialize an API payload to JSON bytes"""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes or str"""
+    return orjson.loads(data)
+
+def dataframe_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a DataFrame to a list of row dicts, column by column.
+    Datetime columns become ISO strings, matching what jsonable_encoder
+    produces for to_dict(orient="records") output; NaN is left for dumps()
+    to encode as null.
+    """
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            values = np.datetime_as_string(series.to_numpy(dtype="datetime64[ns]"), unit="s").astype(object)
+            values[series.isna().to_numpy()] = None
+            columns.append(values.tolist())
+        else:
+            columns.append(series.tolist())
+    names = [str(name) for name in df.columns]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Returning this from an endpoint skips response_model validation and
+    jsonable_encoder, so it is used for the large payloads (transactions,
+    forecast time series, cashflow by date) whose shape is already known.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
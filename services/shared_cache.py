@@ -0,0 +1,326 @@
+# services/shared_cache.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from services.metrics import CACHE_LOOKUPS
+from services.storage import STORAGE_DIR
+
+try:
+    import redis
+except ImportError:  # redis is optional, only needed for a network backend
+    redis = None
+
+# Results shared between uvicorn workers (and nodes, with a network backend),
+# so a forecast fitted or a projection simulated by one worker is reused by the
+# others. CACHE_BACKEND selects the implementation:
+#
+#   sqlite (default)      one SQLite file (CACHE_PATH) shared by the processes on one box
+#   memory                per-process only; for a single worker and tests
+#   redis://host:port/db  any number of boxes (needs the redis package)
+#
+# Values are pickled, so the backend must only be reachable by this application.
+# Keys include the stored file version, so results of a rewritten statement are
+# never served; entries also expire after their TTL.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(STORAGE_DIR, "cache.sqlite3"))
+DEFAULT_TTL = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+
+# How long a worker may hold a job before others stop waiting for it, and how often they check
+JOB_LEASE_SECONDS = 300.0
+JOB_POLL_SECONDS = 0.05
+
+# Local backends drop expired entries every this many writes (and on each storage GC pass)
+PURGE_EVERY_WRITES = 1000
+
+class CacheBackend:
+    """Bytes key-value store with expiry; `add` must be atomic across every process using the backend"""
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Store only if the key is absent (or expired); True if this call stored it"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add `amount` to an integer counter and return the new value; a `ttl` (re)sets its expiry"""
+        raise NotImplementedError
+
+    def decr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically subtract `amount` from an existing counter, stopping at 0, and
+        return the new value. A missing (or expired) counter is left missing.
+        """
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Remove expired entries; returns how many. Backends that expire keys themselves do nothing"""
+        return 0
+
+class _PurgingBackend(CacheBackend):
+    """Purges expired entries every PURGE_EVERY_WRITES writes, since expired keys are only hidden on read"""
+    _writes = 0
+
+    def _written(self) -> None:
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self.purge_expired()
+
+def _expires_at(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl else None
+
+class MemoryBackend(_PurgingBackend):
+    def __init__(self):
+        self._entries: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (value, _expires_at(ttl))
+        self._written()
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self.get(key) is not None:
+                return False
+            self.set(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in list(self._entries.items())
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            current = self.get(key)
+            value = amount if current is None else int(current) + amount
+            expires_at = _expires_at(ttl) if ttl or current is None else self._entries[key][1]
+            self._entries[key] = (str(value).encode(), expires_at)
+            self._written()
+            return value
+
+    def decr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            current = self.get(key)
+            if current is None:
+                return 0
+            value = max(int(current) - amount, 0)
+            self._entries[key] = (str(value).encode(), _expires_at(ttl) if ttl else self._entries[key][1])
+            return value
+
+class SQLiteBackend(_PurgingBackend):
+    """One table in a WAL-mode SQLite file; each thread uses its own connection"""
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        self.purge_expired()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, _expires_at(ttl))
+        )
+        self._written()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction: concurrent writers from other processes wait for it"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, time.time()))
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, _expires_at(ttl))
+            )
+        self._written()
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        return self._connection().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            value = int(row[0]) + amount if row else amount
+            expires_at = _expires_at(ttl) if ttl or not row else row[1]
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(value).encode(), expires_at)
+            )
+        self._written()
+        return value
+
+    def decr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                return 0
+            value = max(int(row[0]) - amount, 0)
+            connection.execute(
+                "UPDATE cache SET value = ?, expires_at = ? WHERE key = ?",
+                (str(value).encode(), _expires_at(ttl) if ttl else row[1], key)
+            )
+        return value
+
+class RedisBackend(CacheBackend):
+    """Network backend for several boxes; keys are namespaced with `prefix`"""
+    # KEYS[1]: counter; ARGV: amount, ttl in ms (0 keeps the current expiry)
+    _DECR_SCRIPT = """
+        local value = redis.call('GET', KEYS[1])
+        if not value then return 0 end
+        value = math.max(tonumber(value) - tonumber(ARGV[1]), 0)
+        if tonumber(ARGV[2]) > 0 then
+            redis.call('SET', KEYS[1], value, 'PX', ARGV[2])
+        else
+            redis.call('SET', KEYS[1], value, 'KEEPTTL')
+        end
+        return value
+    """
+
+    def __init__(self, url: str, prefix: str = "financial-api:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND is a redis:// URL but the redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(self.prefix + key, value, nx=True, px=int(ttl * 1000) if ttl else None))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        pipeline = self.client.pipeline()
+        pipeline.incrby(self.prefix + key, amount)
+        if ttl:
+            pipeline.pexpire(self.prefix + key, int(ttl * 1000))
+        return pipeline.execute()[0]
+
+    def decr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return int(self.client.eval(self._DECR_SCRIPT, 1, self.prefix + key, amount, int(ttl * 1000) if ttl else 0))
+
+def create_backend(spec: str = CACHE_BACKEND, path: str = CACHE_PATH) -> CacheBackend:
+    if spec == "memory":
+        return MemoryBackend()
+    if spec == "sqlite":
+        return SQLiteBackend(path)
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisBackend(spec)
+    raise ValueError(f"Unknown CACHE_BACKEND: {spec}")
+
+@lru_cache(maxsize=None)
+def get_backend() -> CacheBackend:
+    """The process-wide backend configured by CACHE_BACKEND"""
+    return create_backend()
+
+def cache_key(*parts: Any) -> str:
+    return ":".join(str(part) for part in parts)
+
+def compute_once(
+    key: str,
+    compute: Callable[[], Any],
+    ttl: float = DEFAULT_TTL,
+    backend: Optional[CacheBackend] = None
+) -> Any:
+    """
+    Return the cached result for `key`, or compute and share it.
+
+    The first worker to miss takes a job lease (`job:<key>`) and computes;
+    workers that miss while the job is running wait for its result instead of
+    repeating the work. If the job fails or its lease expires, the waiting
+    worker computes the result itself. Exceptions are not cached.
+    """
+    backend = backend or get_backend()
+    cached = backend.get(key)
+    if cached is not None:
+        CACHE_LOOKUPS.inc("shared_results", "hit")
+        return pickle.loads(cached)
+    CACHE_LOOKUPS.inc("shared_results", "miss")
+
+    job_key = f"job:{key}"
+    owns_job = backend.add(job_key, b"running", JOB_LEASE_SECONDS)
+    if not owns_job:
+        while backend.get(job_key) is not None:
+            time.sleep(JOB_POLL_SECONDS)
+            cached = backend.get(key)
+            if cached is not None:
+                return pickle.loads(cached)
+        cached = backend.get(key)
+        if cached is not None:
+            return pickle.loads(cached)
+        owns_job = backend.add(job_key, b"running", JOB_LEASE_SECONDS)
+
+    try:
+        result = compute()
+        backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        return result
+    finally:
+        if owns_job:
+            backend.delete(job_key)
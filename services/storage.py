@@ -0,0 +1,286 @@
+
+# services/storage.py
+import fcntl
+import os
+import re
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from models.financial import FinancialData
+from models.money import to_amount
+from models.transaction_table import TransactionTable, date_range_slice
+from services.aggregation import build_rollups
+from services.anomaly import build_baselines
+from services.serialization import dumps, loads
+from services.tracing import traced
+
+# Uploaded statements are stored as one JSON document per file_id (header
+# fields, rollups, baselines and the interned value lists) plus one .npy file
+# per fixed-width transaction column under columns/<file_id>/<generation>/
+# (in production, this would be a database). Columns are memory-mapped on load,
+# so every worker reads them through the shared OS page cache and a date window
+# is a slice of the mapping rather than a copy. Each save writes a new
+# generation and the document switch to it is atomic; the generation it
+# replaced is removed afterwards (readers that already mapped it keep working).
+# Saves of one file_id are serialized across workers by a lock file.
+STORAGE_DIR = os.getenv("STORAGE_DIR", "temp")
+
+# .npy file name -> TransactionTable attribute, for the memory-mapped columns
+MAPPED_COLUMNS = {
+    "id": "ids",
+    "date": "dates",
+    "amount_cents": "amount_cents",
+    "category": "category_codes",
+    "anomaly_score": "anomaly_scores",
+    "subcategory": "subcategory_codes",
+    "description": "description_codes",
+    "tags": "tags_codes",
+    "metadata": "metadata_codes",
+}
+
+# How often a load re-reads the document when a concurrent save removed the generation it named
+_LOAD_ATTEMPTS = 3
+
+_FILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+def get_file_path(file_id: str) -> str:
+    """Return the storage path for a file_id, rejecting ids that could escape the storage directory"""
+    if not _FILE_ID_PATTERN.match(file_id or ""):
+        raise FileNotFoundError(f"Invalid file id: {file_id}")
+    return os.path.join(STORAGE_DIR, f"{file_id}.json")
+
+def _columns_root(file_id: str) -> str:
+    return os.path.join(STORAGE_DIR, "columns", file_id)
+
+def file_exists(file_id: str) -> bool:
+    try:
+        return os.path.exists(get_file_path(file_id))
+    except FileNotFoundError:
+        return False
+
+def _write_document(file_id: str, document: Dict[str, Any]) -> None:
+    """Written to a temporary file and renamed so readers never see a partial document"""
+    path = get_file_path(file_id)
+    os.makedirs(STORAGE_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(document))
+    os.replace(tmp_path, path)
+
+@traced("persist")
+def save_statement(file_id: str, table: TransactionTable, info: Dict[str, Any]) -> None:
+    """
+    Persist a statement: its transactions plus the FinancialData header
+    fields in `info` (user_id, summary, metadata).
+    Rows are written sorted by date so date windows can be found by binary search,
+    alongside monthly and yearly cashflow rollups and the anomaly baselines
+    that later uploads are scored against. Rollups and baselines given in
+    `info` (kept or merged by an append) are stored as they are; otherwise
+    they are built from the whole table.
+    """
+    derived = (
+        "transactions", "columns", "sorted_by_date", "column_generation", "column_values",
+        "rollups", "anomaly_baselines", "anomaly_baselines_rows"
+    )
+    document = {key: value for key, value in info.items() if key not in derived}
+    table = table.sort_by_date()
+    document["file_id"] = file_id
+    document["rollups"] = info.get("rollups") or build_rollups(table)
+    if info.get("anomaly_baselines") is not None:
+        document["anomaly_baselines"] = info["anomaly_baselines"]
+        document["anomaly_baselines_rows"] = info.get("anomaly_baselines_rows")
+    else:
+        document["anomaly_baselines"] = build_baselines(table)
+        document["anomaly_baselines_rows"] = len(table)
+    document["column_values"] = {
+        "subcategory": table.subcategory_values,
+        "description": table.description_values,
+        "tags": [list(tags) for tags in table.tags_values],
+        "metadata": table.metadata_values
+    }
+    with _save_lock(file_id):
+        replaced = _current_generation(file_id)
+        document["column_generation"] = _write_columns(file_id, table)
+        _write_document(file_id, document)
+        if replaced is not None:
+            shutil.rmtree(os.path.join(_columns_root(file_id), replaced), ignore_errors=True)
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on `path` (created if needed), held across processes and threads"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def update_lock(file_id: str) -> ContextManager[None]:
+    """
+    Held by read-modify-write updates of a statement (load_statement through
+    save_statement), so concurrent updates cannot drop each other's changes.
+    Not reentrant: take it around save_statement, never inside it.
+    """
+    return file_lock(os.path.join(_columns_root(file_id), ".update.lock"))
+
+def _save_lock(file_id: str) -> ContextManager[None]:
+    """Serializes saves of a file_id, so concurrent saves cannot remove each other's generation"""
+    return file_lock(os.path.join(_columns_root(file_id), ".lock"))
+
+def _current_generation(file_id: str) -> Optional[str]:
+    try:
+        return _read_document(file_id).get("column_generation")
+    except FileNotFoundError:
+        return None
+
+def _write_columns(file_id: str, table: TransactionTable) -> str:
+    """Write the fixed-width columns as a new generation; returns its name"""
+    generation = uuid.uuid4().hex
+    directory = os.path.join(_columns_root(file_id), generation)
+    os.makedirs(directory)
+    for name, attribute in MAPPED_COLUMNS.items():
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(table, attribute), allow_pickle=False)
+    return generation
+
+def _map_columns(file_id: str, generation: str) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-map a generation's columns (read-only); None if it no longer exists"""
+    directory = os.path.join(_columns_root(file_id), generation)
+    try:
+        return {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in MAPPED_COLUMNS
+        }
+    except FileNotFoundError:
+        return None
+
+def _mapped_table(columns: Dict[str, np.ndarray], values: Dict[str, Any], rows: slice) -> TransactionTable:
+    """A table whose arrays are views of the `rows` window of the mappings; nothing is copied"""
+    arrays = {attribute: columns[name][rows].view(np.ndarray) for name, attribute in MAPPED_COLUMNS.items()}
+    return TransactionTable(
+        **arrays,
+        subcategory_values=values["subcategory"],
+        description_values=values["description"],
+        tags_values=[tuple(tags) for tags in values["tags"]],
+        metadata_values=values["metadata"]
+    )
+
+def _read_document(file_id: str) -> Dict[str, Any]:
+    with open(get_file_path(file_id), "rb") as f:
+        return loads(f.read())
+
+@traced("load")
+def load_statement(
+    file_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Tuple[TransactionTable, Dict[str, Any]]:
+    """
+    Load a stored statement as (transactions, header fields), optionally only
+    the rows dated start..end (inclusive). Raises FileNotFoundError if it does not exist.
+    The transaction arrays of statements stored with mapped columns are read-only.
+    """
+    for _ in range(_LOAD_ATTEMPTS):
+        document = _read_document(file_id)
+        document.pop("rollups", None)
+        generation = document.pop("column_generation", None)
+        if generation is None:
+            return _load_document_columns(document, start, end)
+
+        columns = _map_columns(file_id, generation)
+        if columns is not None:
+            rows = date_range_slice(columns["date"], start, end)
+            return _mapped_table(columns, document.pop("column_values"), rows), document
+        # A concurrent save replaced the generation between reading the document and mapping it
+    raise FileNotFoundError(f"Columns of {file_id} keep changing")
+
+def _load_document_columns(
+    document: Dict[str, Any],
+    start: Optional[date],
+    end: Optional[date]
+) -> Tuple[TransactionTable, Dict[str, Any]]:
+    """Statements written before the columns were memory-mapped: columns (or rows) inside the JSON document"""
+    columns = document.pop("columns", None)
+    if columns is not None and document.pop("sorted_by_date", False):
+        # Locate the window on the date column and convert only those rows
+        rows = date_range_slice(np.asarray(columns["date"], dtype=np.int64), start, end)
+        return TransactionTable.from_columns(columns, rows), document
+
+    if columns is not None:
+        table = TransactionTable.from_columns(columns)
+    else:
+        # Row-per-transaction document written before the columnar layout
+        table = TransactionTable.from_records(document.pop("transactions", []))
+    return table.sort_by_date().between(start, end), document
+
+def load_rollup(file_id: str, granularity: str) -> Optional[Dict[str, Any]]:
+    """
+    The cashflow rollup stored for a granularity at ingest, or None for
+    documents written before rollups were stored.
+    """
+    return _read_document(file_id).get("rollups", {}).get(granularity)
+
+def save_financial_data(file_id: str, payload: Dict[str, Any]) -> None:
+    """Persist a FinancialData-shaped payload (transactions as a list of dicts)"""
+    save_statement(file_id, TransactionTable.from_records(payload.get("transactions", [])), payload)
+
+def statement_payload(file_id: str, table: TransactionTable, info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    FinancialData wire format for a statement, built without per-row validation.
+    Summary totals are kept in cents (summary_cents) and converted to amounts here.
+    """
+    if "summary_cents" in info:
+        summary = {key: to_amount(value) for key, value in info["summary_cents"].items()}
+    else:
+        summary = info.get("summary", {})
+    return {
+        "user_id": info.get("user_id"),
+        "file_id": file_id,
+        "transactions": table.to_records(),
+        "summary": summary,
+        "metadata": info.get("metadata", {})
+    }
+
+def load_financial_data(file_id: str) -> FinancialData:
+    """Load a stored statement as a validated FinancialData model"""
+    table, info = load_statement(file_id)
+    return FinancialData(**statement_payload(file_id, table, info))
+
+def stored_paths(file_id: str) -> List[str]:
+    """Every path on disk that belongs to a stored statement: its document and column files"""
+    path = get_file_path(file_id)
+    paths = [path] if os.path.exists(path) else []
+    for directory, _, names in os.walk(_columns_root(file_id)):
+        paths.extend(os.path.join(directory, name) for name in names)
+    return paths
+
+def stored_bytes(file_id: str) -> int:
+    return sum(os.path.getsize(path) for path in stored_paths(file_id))
+
+def delete_statement(file_id: str) -> int:
+    """Remove a stored statement; returns the bytes freed"""
+    # Under the save lock, so a concurrent save_statement cannot name a generation being removed
+    freed = 0
+    with _save_lock(file_id):
+        for path in stored_paths(file_id):
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        shutil.rmtree(_columns_root(file_id), ignore_errors=True)
+    return freed
+
+def get_file_version(file_id: str) -> Optional[Tuple[str, float]]:
+    """
+    Return (version, last_modified) for a stored file, or None if it does not exist.
+    The version changes whenever the stored document is rewritten.
+    """
+    try:
+        stat = os.stat(get_file_path(file_id))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_mtime
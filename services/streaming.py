@@ -0,0 +1,62 @@
+
+# services/streaming.py
+import base64
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from services.serialization import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+RESPONSE_FORMATS = ["json", "ndjson"]
+
+# Rows rendered per streamed chunk
+BATCH_ROWS = 1000
+
+def ndjson_chunks(
+    total: int,
+    render: Callable[[slice], List[Dict[str, Any]]],
+    offset: int = 0,
+    batch_size: int = BATCH_ROWS
+) -> Iterator[bytes]:
+    """
+    Yield rows offset..total as newline-delimited JSON, one chunk per batch.
+    `render` turns a slice of row positions into row dicts, so only one batch
+    of dicts and encoded bytes exists at a time.
+    """
+    for lo in range(offset, total, batch_size):
+        rows = render(slice(lo, min(lo + batch_size, total)))
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+class NDJSONResponse(StreamingResponse):
+    """Streaming response of newline-delimited JSON rows"""
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(self, chunks: Iterator[bytes], headers: Optional[Dict[str, str]] = None):
+        super().__init__(chunks, headers=headers, media_type=NDJSON_MEDIA_TYPE)
+
+def encode_cursor(offset: int, version: str, window: str = "") -> str:
+    """
+    Opaque page cursor: a row offset tied to the stored file version and the
+    query window (e.g. the start/end filter) it was issued for
+    """
+    return base64.urlsafe_b64encode(f"{offset}:{version}:{window}".encode("ascii")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, version: str, window: str = "") -> int:
+    """
+    Row offset of a cursor; raises ValueError if it is malformed, the file has
+    changed since, or it was issued for a different window
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        offset, cursor_version, cursor_window = raw.split(":", 2)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    if cursor_version != version:
+        raise ValueError("Cursor is stale, the file has changed")
+    if cursor_window != window:
+        raise ValueError("Cursor was issued for a different start/end window")
+    return offset
@@ -0,0 +1,123 @@
+# services/tracing.py
+import functools
+import logging
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.metrics import STAGE_LATENCY
+
+# Lightweight stage spans for request breakdowns.
+#
+#     with span("persist"):
+#         save_statement(...)
+#
+#     @traced("extract")
+#     def extract_from_excel(...): ...
+#
+# Every span is observed in the stage_duration_seconds histogram. Inside a
+# request, spans are also collected for the Server-Timing response header
+# (visible in browser devtools) and, with TRACE_LOG=1, logged as one line per
+# request whose fields (method, path, status, total_ms, spans) are fields of the
+# JSON log line.
+
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"
+REQUEST_ID_HEADER = "x-request-id"
+
+logger = logging.getLogger(__name__)
+
+# (name, milliseconds) spans of the current request; None outside a request
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("spans", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, name)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((name, elapsed * 1000))
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator form of span() for service functions"""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def server_timing(spans: List[Tuple[str, float]], total_ms: float) -> str:
+    entries = [f"{name};dur={ms:.1f}" for name, ms in spans]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+class TracingMiddleware:
+    """
+    Collects the spans of each request and adds them as a Server-Timing header,
+    with an X-Request-ID (taken from the request when it carries a valid one).
+    Spans that end after the response has started, e.g. while streaming, only
+    reach the log line.
+    """
+    def __init__(self, app: ASGIApp, log_spans: bool = TRACE_LOG):
+        self.app = app
+        self.log_spans = log_spans
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        spans: List[Tuple[str, float]] = []
+        spans_token = _spans.set(spans)
+        request_id_token = _request_id.set(request_id)
+        start = time.perf_counter()
+        status = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(spans, (time.perf_counter() - start) * 1000))
+                headers.append("X-Request-ID", request_id)
+                # Let cross-origin dashboards read the timings, matching the permissive CORS setup
+                headers.append("Timing-Allow-Origin", "*")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(spans_token)
+            _request_id.reset(request_id_token)
+            if self.log_spans:
+                total_ms = round((time.perf_counter() - start) * 1000, 3)
+                # The fields go in `extra`, so the JSON log format emits them as fields of the line
+                logger.info("%s %s %s in %.1f ms", scope["method"], scope["path"], status, total_ms, extra={
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "total_ms": total_ms,
+                    "spans": [{"name": name, "ms": round(ms, 3)} for name, ms in spans]
+                })
@@ -0,0 +1,90 @@
+
+# services/upload_index.py
+import hashlib
+import io
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import UploadFile
+
+from services.metrics import CACHE_LOOKUPS
+from services.serialization import dumps, loads
+from services.shared_cache import get_backend
+from services.storage import STORAGE_DIR, file_exists, file_lock
+
+# Maps (user, SHA-256 of the uploaded bytes) -> file_id. Readers see whole
+# documents (they are replaced atomically); updates hold INDEX_LOCK_PATH so
+# workers updating the index at the same time do not lose each other's entries.
+INDEX_PATH = os.path.join(STORAGE_DIR, "index", "uploads.json")
+INDEX_LOCK_PATH = f"{INDEX_PATH}.lock"
+CHUNK_SIZE = 1024 * 1024
+
+# Hit/miss counters exposed through /upload/stats, kept in the shared cache backend so
+# they add up over every worker
+STATS_KEY = "upload_dedupe:{}"
+
+async def read_and_hash(file: UploadFile) -> Tuple[bytes, str]:
+    """Read an upload in chunks, computing its SHA-256 while the bytes arrive"""
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        buffer.write(chunk)
+    return buffer.getvalue(), digest.hexdigest()
+
+def _load_index() -> Dict[str, Dict[str, str]]:
+    try:
+        with open(INDEX_PATH, "rb") as f:
+            return loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+def _save_index(index: Dict[str, Dict[str, str]]) -> None:
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    tmp_path = f"{INDEX_PATH}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps(index))
+    os.replace(tmp_path, INDEX_PATH)
+
+def find_upload(username: str, digest: str) -> Optional[str]:
+    """
+    Return the file_id this user already created from identical bytes, if it is still stored.
+    Updates the hit/miss counters.
+    """
+    file_id = _load_index().get(username, {}).get(digest)
+    if file_id is not None and file_exists(file_id):
+        _count("hits")
+        CACHE_LOOKUPS.inc("upload_dedupe", "hit")
+        return file_id
+    _count("misses")
+    CACHE_LOOKUPS.inc("upload_dedupe", "miss")
+    return None
+
+def _count(result: str) -> None:
+    get_backend().incr(STATS_KEY.format(result))
+
+def dedupe_stats() -> Dict[str, int]:
+    """Deduplication hits and misses of all workers"""
+    backend = get_backend()
+    return {result: int(backend.get(STATS_KEY.format(result)) or 0) for result in ("hits", "misses")}
+
+def record_upload(username: str, digest: str, file_id: str) -> None:
+    with file_lock(INDEX_LOCK_PATH):
+        index = _load_index()
+        index.setdefault(username, {})[digest] = file_id
+        _save_index(index)
+
+def forget_file(file_id: str) -> None:
+    """Remove every index entry pointing at a file_id"""
+    with file_lock(INDEX_LOCK_PATH):
+        index = _load_index()
+        changed = False
+        for uploads in index.values():
+            for digest in [d for d, f in uploads.items() if f == file_id]:
+                del uploads[digest]
+                changed = True
+        if changed:
+            _save_index(index)
@@ -4,7 +4,9 @@ from typing import Dict, Any
 import plotly.express as px
 import plotly.graph_objects as go
 import json
+from services.tracing import traced
 
+@traced("chart")
 def generate_spending_chart(spending_by_category: Dict[str, float]) -> Dict[str, Any]:
     """Generate a pie chart for spending by category"""
     # Create pie chart
@@ -21,6 +23,7 @@ def generate_spending_chart(spending_by_category: Dict[str, float]) -> Dict[str,
     # Convert to JSON for API response
     return json.loads(fig.to_json())
 
+@traced("chart")
 def generate_savings_forecast(historical_data: Dict[str, float], forecast_data: Dict[str, float]) -> Dict[str, Any]:
     """Generate a line chart for historical and forecasted savings"""
     fig = go.Figure()
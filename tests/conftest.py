@@ -1,14 +1,57 @@
 import pytest
 import os
+import shutil
 import sys
+import tempfile
+import uuid
+from datetime import datetime
 from fastapi.testclient import TestClient
 
 # Add project root to Python path
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
-from main import app
+# Computed results are shared through a per-process cache in tests
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+def pytest_configure(config):
+    # Statements, indexes, rules, profiles and logs of a run go to a fresh directory, not
+    # the repository; set before any service module reads STORAGE_DIR at import
+    config.storage_dir = tempfile.mkdtemp(prefix="financial-api-tests-")
+    os.environ["STORAGE_DIR"] = config.storage_dir
+    os.environ["LOG_FILE"] = os.path.join(config.storage_dir, "app.log")
+
+def pytest_unconfigure(config):
+    shutil.rmtree(config.storage_dir, ignore_errors=True)
 
 @pytest.fixture(scope="session")
 def client():
-    return TestClient(app)
\ No newline at end of file
+    from main import app
+    return TestClient(app)
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post("/token", data={"username": "testuser", "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def stored_file_id():
+    """Store a small categorized statement directly and remove it afterwards"""
+    from services.storage import delete_statement, save_financial_data
+    file_id = str(uuid.uuid4())
+    transactions = [
+        {
+            "id": str(uuid.uuid4()),
+            "date": datetime(2024, 3, day % 28 + 1),
+            "description": f"Grocery store {day}",
+            "amount": 10.0 + day,
+            "category": "expense" if day % 5 else "income",
+            "subcategory": "Food" if day % 3 else "Housing",
+            "tags": [],
+            "metadata": {}
+        }
+        for day in range(200)
+    ]
+    save_financial_data(file_id, {"file_id": file_id, "user_id": "testuser", "transactions": transactions})
+    yield file_id
+    delete_statement(file_id)
@@ -0,0 +1,37 @@
+from models.transaction_table import TransactionTable
+from services.anomaly import ANOMALY_THRESHOLD, baselines_outdated, build_baselines, merchant_key, with_anomaly_scores
+from services.serialization import dumps, loads
+
+def make_records(amounts, subcategory="Food", description="Coffee Shop #{i}"):
+    return [
+        {"id": f"{subcategory}-{i}", "date": f"2024-03-{i % 28 + 1:02d}T00:00:00",
+         "description": description.format(i=i), "amount": amount, "category": "expense",
+         "subcategory": subcategory, "tags": [], "metadata": {}}
+        for i, amount in enumerate(amounts)
+    ]
+
+def test_scores_are_relative_to_each_group():
+    # Rent is always large but never anomalous; a large coffee purchase is
+    rent = make_records([1500.0] * 6, subcategory="Housing", description="Rent Payment")
+    coffee = make_records([4.5, 5.0, 4.0, 5.5, 4.75, 60.0])
+    table = with_anomaly_scores(TransactionTable.from_records(rent + coffee))
+
+    flagged = table[table.anomaly_scores >= ANOMALY_THRESHOLD]
+    assert flagged.amounts.tolist() == [60.0]
+    assert merchant_key("Coffee Shop #1234 03/05") == "coffee shop"
+
+def test_new_uploads_scored_against_stored_baselines():
+    history = TransactionTable.from_records(make_records([4.5, 5.0, 4.0, 5.5, 4.75, 5.25]))
+    baselines = loads(dumps(build_baselines(history)))
+
+    upload = TransactionTable.from_records(make_records([5.0, 45.0]) + make_records([900.0], subcategory="Travel", description="Airline Ticket"))
+    scores = with_anomaly_scores(upload, baselines).anomaly_scores
+    assert scores[0] < 1
+    assert scores[1] >= ANOMALY_THRESHOLD
+    # No baseline for a subcategory or merchant seen for the first time
+    assert scores[2] == 0
+
+def test_baselines_refresh_after_enough_growth():
+    assert baselines_outdated(None, 10)
+    assert not baselines_outdated(1000, 1250)
+    assert baselines_outdated(1000, 1251)
@@ -0,0 +1,122 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import main
+import services.anomaly
+import services.storage
+from services.aggregation import STORED_ROLLUPS, build_rollups
+from services.anomaly import build_baselines
+from services.serialization import dumps, loads
+from services.storage import delete_statement, load_financial_data, load_rollup, load_statement
+from services.upload_index import _load_index, forget_file, record_upload
+
+EXCEL_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def make_excel(rows):
+    buffer = io.BytesIO()
+    pd.DataFrame(rows, columns=["Date", "Description", "Amount"]).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def test_append_skips_stored_transactions_and_updates_summary(client, auth_headers):
+    first = make_excel([
+        ["2024-03-01", "Salary Deposit", 5000.00],
+        ["2024-03-02", "Rent Payment", -1500.00],
+    ])
+    response = client.post("/upload/excel", files={"file": ("march.xlsx", first, EXCEL_TYPE)}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    file_id = response.json()["file_id"]
+
+    try:
+        second = make_excel([
+            ["2024-03-02", "Rent Payment", -1500.00],
+            ["2024-04-01", "Salary Deposit", 5000.00],
+            ["2024-04-03", "Grocery Shopping", -200.50],
+        ])
+        response = client.post(
+            "/upload/excel/append",
+            params={"file_id": file_id},
+            files={"file": ("april.xlsx", second, EXCEL_TYPE)},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, response.text
+        result = response.json()
+        assert result["added"] == 2
+        assert result["duplicates"] == 1
+        assert result["total_transactions"] == 4
+
+        data = load_financial_data(file_id)
+        assert data.summary["total_income"] == 10000.00
+        assert data.summary["total_expenses"] == 1700.50
+        assert data.summary["total_income"] == sum(t.amount for t in data.transactions if t.category == "income")
+
+        # Rollups merged from the appended rows match a rebuild over the whole statement
+        rebuilt = loads(dumps(build_rollups(load_statement(file_id)[0])))
+        assert {granularity: load_rollup(file_id, granularity) for granularity in STORED_ROLLUPS} == rebuilt
+        assert rebuilt["monthly"]["periods"] == ["2024-03", "2024-04"]
+
+        # The original bytes no longer map to the appended statement
+        again = client.post("/upload/excel", files={"file": ("march.xlsx", first, EXCEL_TYPE)}, headers=auth_headers)
+        assert again.status_code == 200
+        assert "x-upload-deduplicated" not in again.headers
+        assert len(again.json()["transactions"]) == 2
+        delete_statement(again.json()["file_id"])
+    finally:
+        delete_statement(file_id)
+
+def test_append_to_missing_file_returns_404(client, auth_headers):
+    response = client.post(
+        "/upload/excel/append",
+        params={"file_id": "does-not-exist"},
+        files={"file": ("april.xlsx", make_excel([]), EXCEL_TYPE)},
+        headers=auth_headers
+    )
+    assert response.status_code == 404
+
+def test_identical_upload_returns_existing_file_id(client, auth_headers):
+    contents = make_excel([
+        ["2024-05-01", "Salary Deposit", 5000.00],
+        ["2024-05-02", "Rent Payment", -1500.00],
+    ])
+    first = client.post("/upload/excel", files={"file": ("may.xlsx", contents, EXCEL_TYPE)}, headers=auth_headers)
+    assert first.status_code == 200, first.text
+    file_id = first.json()["file_id"]
+
+    try:
+        hits_before = client.get("/upload/stats", headers=auth_headers).json()["dedupe_hits"]
+        second = client.post("/upload/excel", files={"file": ("retry.xlsx", contents, EXCEL_TYPE)}, headers=auth_headers)
+        assert second.status_code == 200
+        assert second.json()["file_id"] == file_id
+        assert second.headers["x-upload-deduplicated"] == "true"
+        assert client.get("/upload/stats", headers=auth_headers).json()["dedupe_hits"] == hits_before + 1
+    finally:
+        delete_statement(file_id)
+
+def test_upload_builds_the_anomaly_baselines_once(client, auth_headers, monkeypatch):
+    built = []
+    def counting_build(table):
+        built.append(len(table))
+        return build_baselines(table)
+    monkeypatch.setattr(main, "build_baselines", counting_build)
+    monkeypatch.setattr(services.anomaly, "build_baselines", counting_build)
+    monkeypatch.setattr(services.storage, "build_baselines", counting_build)
+
+    contents = make_excel([["2024-06-01", "Salary Deposit", 5000.00], ["2024-06-02", "Coffee Shop", -4.50]])
+    response = client.post("/upload/excel", files={"file": ("june.xlsx", contents, EXCEL_TYPE)}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    file_id = response.json()["file_id"]
+    try:
+        assert built == [2]
+        assert load_statement(file_id)[1]["anomaly_baselines_rows"] == 2
+    finally:
+        delete_statement(file_id)
+
+def test_concurrent_index_updates_keep_every_entry():
+    digests = [f"digest-{i}" for i in range(20)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda digest: record_upload("index-user", digest, f"file-{digest}"), digests))
+    assert sorted(_load_index()["index-user"]) == sorted(digests)
+    for digest in digests:
+        forget_file(f"file-{digest}")
+    assert _load_index()["index-user"] == {}
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from models.transaction_table import TransactionTable
+from services.auto_rules import _rules_path, compile_rules, evaluate_rules, monthly_metrics
+from services.storage import load_statement, save_statement
+
+def statement(income, expenses):
+    """One income and one expense row per month, starting January 2024"""
+    records = []
+    for month, (earned, spent) in enumerate(zip(income, expenses), start=1):
+        date = f"2024-{month:02d}-15T00:00:00"
+        records.append({"id": f"i{month}", "date": date, "description": "Salary", "amount": earned, "category": "income"})
+        records.append({"id": f"e{month}", "date": date, "description": "Rent", "amount": spent, "category": "expense"})
+    return TransactionTable.from_records(records)
+
+@pytest.fixture
+def clean_rules():
+    yield
+    if os.path.exists(_rules_path("testuser")):
+        os.remove(_rules_path("testuser"))
+
+def test_rules_for_many_users_evaluate_in_one_pass():
+    surplus_rule = {"name": "surplus", "when": "surplus > 1000", "invest": "50% of surplus", "target": "S&P 500 Index ETF"}
+    frugal_rule = {"name": "frugal", "when": "expenses <= 2000 and income >= 3000",
+                   "invest": "10% of income", "target": "Treasury Bonds"}
+    compiled = compile_rules({"ann": [surplus_rule, frugal_rule], "bob": [surplus_rule], "cy": []})
+
+    actions = evaluate_rules(compiled, {
+        "ann": monthly_metrics(statement([3000, 4000], [2500, 2000])),
+        "bob": monthly_metrics(statement([5000], [1000])),
+        "cy": monthly_metrics(statement([9000], [0])),
+        "unknown": monthly_metrics(statement([9000], [0]))
+    })
+    assert sorted((a["user"], a["rule"], a["month"], a["amount"]) for a in actions) == [
+        ("ann", "frugal", "2024-02", 400.0),
+        ("ann", "surplus", "2024-02", 1000.0),
+        ("bob", "surplus", "2024-01", 2000.0),
+    ]
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        compile_rules({"ann": [{"name": "x", "when": "surplus >> 5", "invest": "10% of income", "target": "Treasury Bonds"}]})
+    with pytest.raises(ValueError):
+        compile_rules({"ann": [{"name": "x", "when": "surplus > 5", "invest": "10% of income", "target": "Lottery"}]})
+
+def test_auto_rules_endpoint(client, auth_headers, stored_file_id, clean_rules):
+    rules = {"rules": [{"name": "any income", "when": "income > 0", "invest": "10% of income", "target": "Treasury Bonds"}]}
+    response = client.post("/investment/auto-rules", params={"file_id": stored_file_id}, json=rules, headers=auth_headers)
+    assert response.status_code == 200
+    actions = response.json()["actions"]
+    assert [(a["rule"], a["month"]) for a in actions] == [("any income", "2024-03")]
+
+    stored = client.get("/investment/auto-rules", params={"file_id": stored_file_id}, headers=auth_headers).json()
+    assert stored == {"rules": rules["rules"], "actions": actions}
+
+    rules["rules"][0]["invest"] = "everything"
+    response = client.post("/investment/auto-rules", json=rules, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_rules_path_stays_in_rules_dir():
+    rules_dir = os.path.dirname(_rules_path("testuser"))
+    for username in ("../x", "a/b", "..", "/etc/passwd"):
+        assert os.path.dirname(_rules_path(username)) == rules_dir
+
+def test_actions_of_other_users_files_are_not_readable(client, auth_headers, stored_file_id):
+    table, info = load_statement(stored_file_id)
+    save_statement(stored_file_id, table, {**info, "user_id": "someone-else"})
+    response = client.get("/investment/auto-rules", params={"file_id": stored_file_id}, headers=auth_headers)
+    assert response.status_code == 403
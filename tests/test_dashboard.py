@@ -0,0 +1,61 @@
+def test_overview_matches_individual_endpoints(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id}
+    overview = client.get("/dashboard/overview", params=params, headers=auth_headers)
+    assert overview.status_code == 200
+    overview = overview.json()
+
+    summary = client.get("/dashboard/summary", params=params, headers=auth_headers).json()
+    cashflow = client.get("/analysis/cashflow", params=params, headers=auth_headers).json()
+    spending = client.get("/analysis/spending", params=params, headers=auth_headers).json()
+
+    assert overview["financial_summary"] == summary["financial_summary"]
+    assert overview["expense_breakdown"] == summary["expense_breakdown"]
+    assert overview["recommendations"] == summary["recommendations"]
+    assert overview["cashflow"] == cashflow
+    assert overview["spending"]["spending_by_category"] == spending["spending_by_category"]
+
+def test_overview_sections_parameter(client, auth_headers, stored_file_id):
+    response = client.get(
+        "/dashboard/overview",
+        params={"file_id": stored_file_id, "sections": "summary,cashflow"},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert set(response.json()) == {"financial_summary", "cashflow"}
+
+    response = client.get(
+        "/dashboard/overview",
+        params={"file_id": stored_file_id, "sections": "summary,bogus"},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+def test_date_range_filters_rows(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id, "start": "2024-03-05", "end": "2024-03-09"}
+    response = client.get("/analysis/cashflow", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    assert list(response.json()["cashflow_by_date"]) == [f"2024-03-0{day}" for day in range(5, 10)]
+
+    params = {"file_id": stored_file_id, "start": "2024-03-09", "end": "2024-03-05"}
+    assert client.get("/dashboard/summary", params=params, headers=auth_headers).status_code == 400
+
+def test_cashflow_granularity(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id}
+    daily = client.get("/analysis/cashflow", params=params, headers=auth_headers).json()
+
+    for granularity, periods in [("monthly", ["2024-03"]), ("yearly", ["2024"])]:
+        bucketed = client.get(
+            "/analysis/cashflow", params={**params, "granularity": granularity}, headers=auth_headers
+        ).json()
+        assert list(bucketed["cashflow_by_date"]) == periods
+        assert bucketed["net_cashflow"] == daily["net_cashflow"]
+
+    weekly = client.get(
+        "/analysis/cashflow", params={**params, "granularity": "weekly"}, headers=auth_headers
+    ).json()
+    # 2024-03-01 was a Friday, so the first bucket starts on Monday 2024-02-26
+    assert list(weekly["cashflow_by_date"])[:2] == ["2024-02-26", "2024-03-04"]
+    assert weekly["total_income"] == daily["total_income"]
+
+    params["granularity"] = "hourly"
+    assert client.get("/analysis/cashflow", params=params, headers=auth_headers).status_code == 400
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+
+from services.storage import save_financial_data
+
+def test_conditional_get_returns_304(client, auth_headers, stored_file_id):
+    response = client.get("/analysis/cashflow", params={"file_id": stored_file_id}, headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["last-modified"]
+
+    response = client.get(
+        "/analysis/cashflow",
+        params={"file_id": stored_file_id},
+        headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+def test_if_modified_since(client, auth_headers, stored_file_id):
+    response = client.get("/analysis/cashflow", params={"file_id": stored_file_id}, headers=auth_headers)
+    last_modified = parsedate_to_datetime(response.headers["last-modified"])
+
+    def status(since, **headers):
+        return client.get(
+            "/analysis/cashflow",
+            params={"file_id": stored_file_id},
+            headers={**auth_headers, **headers, "If-Modified-Since": format_datetime(since, usegmt=True)}
+        ).status_code
+
+    # Same second: a rewrite within it would keep the date, so the body is sent again
+    assert status(last_modified) == 200
+    assert status(last_modified + timedelta(seconds=1)) == 304
+    # With both validators only the ETag counts
+    assert status(last_modified + timedelta(seconds=1), **{"If-None-Match": '"other"'}) == 200
+
+def test_etag_changes_when_file_is_rewritten(client, auth_headers, stored_file_id):
+    response = client.get("/analysis/cashflow", params={"file_id": stored_file_id}, headers=auth_headers)
+    etag = response.headers["etag"]
+
+    save_financial_data(stored_file_id, {"file_id": stored_file_id, "transactions": []})
+    response = client.get(
+        "/analysis/cashflow",
+        params={"file_id": stored_file_id},
+        headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_large_responses_are_compressed(client, auth_headers, stored_file_id):
+    response = client.get(
+        "/analysis/cashflow",
+        params={"file_id": stored_file_id},
+        headers={**auth_headers, "Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "cashflow_by_date" in response.json()
+
+def test_missing_file_returns_404(client, auth_headers):
+    response = client.get("/analysis/cashflow", params={"file_id": "does-not-exist"}, headers=auth_headers)
+    assert response.status_code == 404
@@ -0,0 +1,49 @@
+import numpy as np
+
+from services.investment_advisor import efficient_frontier, generate_investment_suggestions, portfolio_statistics
+from services.monte_carlo import simulate_portfolio
+
+def test_simulation_is_deterministic_per_input():
+    first = simulate_portfolio(10_000, 0.07, 0.15, years=10, paths=2_000)
+    second = simulate_portfolio(10_000, 0.07, 0.15, years=10, paths=2_000)
+    assert first["final"] == second["final"]
+    assert first["seed"] != simulate_portfolio(10_000, 0.07, 0.15, years=11, paths=2_000)["seed"]
+
+    bands = first["percentiles"]
+    assert len(bands["p50"]) == 11
+    assert (bands["p5"] <= bands["p50"]).all() and (bands["p50"] <= bands["p95"]).all()
+    # The mean matches the expected annual return
+    assert abs(first["final"]["mean"] / (10_000 * 1.07 ** 10) - 1) < 0.05
+
+def test_contributions_compound_monthly():
+    # Without volatility every path is the annuity value
+    result = simulate_portfolio(10_000, 0.07, 0.0, years=5, monthly_contribution=100, paths=3)
+    monthly = 1.07 ** (1 / 12)
+    expected = 10_000 * monthly ** 60 + 100 * sum(monthly ** k for k in range(60))
+    assert abs(result["final"]["p5"] / expected - 1) < 1e-4
+    assert abs(result["final"]["p95"] / expected - 1) < 1e-4
+
+def test_projection_endpoint(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id, "years": 5, "paths": 1000}
+    response = client.get("/investment/projection", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    projection = response.json()
+    assert projection["years"] == list(range(6))
+    assert client.get("/investment/projection", params=params, headers=auth_headers).json() == projection
+
+def test_suggestions_are_reproducible():
+    first = generate_investment_suggestions(20_000, 0.4)
+    assert first == generate_investment_suggestions(20_000, 0.4)
+    expected_return, volatility = portfolio_statistics(first)
+    assert 0 < expected_return < 0.12 and 0 < volatility < 0.25
+
+def test_frontier_lookup_increases_risk_and_return():
+    frontier = efficient_frontier()
+    assert np.allclose(frontier.weights.sum(axis=1), 1)
+    assert (np.diff(frontier.returns) >= -1e-9).all()
+    assert (np.diff(frontier.volatilities) >= -1e-9).all()
+
+    cautious = generate_investment_suggestions(50_000, 0.1)
+    bold = generate_investment_suggestions(50_000, 0.9)
+    assert portfolio_statistics(cautious) < portfolio_statistics(bold)
+    assert abs(sum(s.allocation_percentage for s in bold) - 100) < 0.5
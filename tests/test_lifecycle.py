@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+import main
+import services.storage
+from services.lifecycle import SECONDS_PER_DAY, STALE_TMP_SECONDS, StorageCatalog, estimate_stored_bytes
+from services.storage import stored_bytes
+from tests.test_append import EXCEL_TYPE, make_excel
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    storage_dir = tmp_path / "storage"
+    storage_dir.mkdir()
+    monkeypatch.setattr(services.storage, "STORAGE_DIR", str(storage_dir))
+    return StorageCatalog(str(tmp_path / "catalog.sqlite3"), str(storage_dir))
+
+def write_file(catalog, name, size, user_id="alice"):
+    path = os.path.join(catalog.storage_dir, name)
+    with open(path, "wb") as f:
+        f.write(b'{"user_id": "%s"}' % user_id.encode() + b" " * size)
+    return path
+
+def test_expired_files_are_deleted(catalog):
+    keep = write_file(catalog, "keep.json", 100)
+    expire = write_file(catalog, "expire.json", 100)
+    catalog.register("keep", "alice", ttl_days=30)
+    catalog.register("expire", "alice", ttl_days=1)
+
+    stats = catalog.collect_garbage(now=time.time() + 2 * SECONDS_PER_DAY)
+    assert stats["expired"] == 1
+    assert stats["bytes_freed"] == 120
+    assert os.path.exists(keep) and not os.path.exists(expire)
+    assert catalog.usage("alice") == 120
+
+def test_stale_tmp_untracked_and_missing_files(catalog):
+    tmp = write_file(catalog, "partial.json.tmp", 10)
+    write_file(catalog, "legacy.json", 50, user_id="bob")
+    catalog.register("gone", "alice")  # no file on disk
+    orphan = os.path.join(catalog.storage_dir, "columns", "orphan")
+    os.makedirs(os.path.join(orphan, "generation"))
+    write_file(catalog, os.path.join("columns", "orphan", "generation", "date.npy"), 10)
+
+    stats = catalog.collect_garbage(now=time.time() + STALE_TMP_SECONDS + 1)
+    assert stats["stale_tmp"] == 1 and not os.path.exists(tmp)
+    assert stats["orphaned_columns"] == 1 and not os.path.exists(orphan)
+    assert stats["missing"] == 1
+    assert stats["adopted"] == 1
+    assert [(user["user_id"], user["files"]) for user in catalog.usage_report()] == [("bob", 1)]
+
+def test_adopted_files_expire_a_ttl_after_adoption(catalog):
+    legacy = write_file(catalog, "legacy.json", 50, user_id="bob")
+    written = time.time() - 90 * SECONDS_PER_DAY
+    os.utime(legacy, (written, written))
+
+    assert catalog.collect_garbage()["adopted"] == 1
+    assert catalog.collect_garbage(now=time.time() + 3600)["expired"] == 0
+    assert os.path.exists(legacy)
+    assert catalog.collect_garbage(now=time.time() + 31 * SECONDS_PER_DAY)["expired"] == 1
+
+def test_quota(catalog):
+    write_file(catalog, "a.json", 1024 * 1024)
+    catalog.register("a", "alice")
+    assert catalog.within_quota("alice", 512 * 1024, quota_mb=2)
+    assert not catalog.within_quota("alice", 1024 * 1024, quota_mb=2)
+    assert catalog.within_quota("bob", 1024 * 1024, quota_mb=1)
+    assert catalog.within_quota("alice", 10 ** 9, quota_mb=0)
+
+def test_admin_storage_endpoints(client, auth_headers, catalog, monkeypatch):
+    write_file(catalog, "a.json", 10, user_id="testuser")
+    catalog.register("a", "testuser")
+    monkeypatch.setattr(main, "storage_catalog", lambda: catalog)
+
+    assert client.get("/admin/storage", headers=auth_headers).status_code == 403
+
+    monkeypatch.setattr(main, "ADMIN_USERS", {"testuser"})
+    report = client.get("/admin/storage", headers=auth_headers).json()
+    assert report["total_files"] == 1
+    assert report["users"][0]["user_id"] == "testuser"
+    assert client.post("/admin/storage/gc", headers=auth_headers).json()["expired"] == 0
+
+def test_stored_size_estimate_covers_a_stored_statement(stored_file_id):
+    assert stored_bytes(stored_file_id) <= estimate_stored_bytes(200) < 2 * stored_bytes(stored_file_id)
+
+def test_upload_rejected_over_quota(client, auth_headers, catalog, monkeypatch):
+    requested = []
+    monkeypatch.setattr(main, "storage_catalog", lambda: catalog)
+    monkeypatch.setattr(catalog, "within_quota", lambda user_id, incoming_bytes: requested.append(incoming_bytes))
+    response = client.post(
+        "/upload/excel",
+        files={"file": ("statement.xlsx", make_excel([["2024-03-01", "Rent Payment", -1500.00]] * 3), EXCEL_TYPE)},
+        headers=auth_headers
+    )
+    assert response.status_code == 413
+    assert requested == [estimate_stored_bytes(3)]
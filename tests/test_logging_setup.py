@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.logging_setup import configure_logging
+from services.tracing import TracingMiddleware, span
+
+def test_queued_json_logging(tmp_path):
+    log_file = tmp_path / "test.log"
+    logger = logging.getLogger("test_logging_setup")
+    logger.propagate = False
+    listener = configure_logging(str(log_file), logger=logger, console=False)
+    try:
+        logger.info("processed %d rows", 42)
+        try:
+            raise ValueError("bad row")
+        except ValueError:
+            logger.exception("failed")
+    finally:
+        listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+    first, second = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert first["message"] == "processed 42 rows"
+    assert first["level"] == "INFO"
+    assert first["logger"] == "test_logging_setup"
+    assert second["message"] == "failed"
+    assert "ValueError: bad row" in second["exception"]
+
+def test_per_process_and_externally_rotated_files(tmp_path):
+    logger = logging.getLogger("test_logging_setup_files")
+    logger.propagate = False
+    listener = configure_logging(str(tmp_path / "app.{pid}.log"), logger=logger, console=False, rotation="external")
+    try:
+        logger.info("first")
+        listener.stop()
+        log_file = tmp_path / f"app.{os.getpid()}.log"
+        log_file.rename(tmp_path / "app.log.1")  # what logrotate does
+        listener.start()
+        logger.info("second")
+    finally:
+        listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+    assert json.loads((tmp_path / "app.log.1").read_text())["message"] == "first"
+    assert json.loads(log_file.read_text())["message"] == "second"
+
+def test_request_traces_are_logged_as_fields(tmp_path):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, log_spans=True)
+
+    @app.get("/traced")
+    def traced_route():
+        with span("work"):
+            return {"ok": True}
+
+    log_file = tmp_path / "trace.log"
+    logger = logging.getLogger("services.tracing")
+    logger.propagate = False
+    listener = configure_logging(str(log_file), logger=logger, console=False)
+    try:
+        response = TestClient(app).get("/traced", headers={"X-Request-ID": "trace-1"})
+    finally:
+        listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.propagate = True
+
+    entry = json.loads(log_file.read_text())
+    assert response.status_code == 200
+    assert entry["request_id"] == "trace-1"
+    assert (entry["method"], entry["path"], entry["status"]) == ("GET", "/traced", 200)
+    assert [item["name"] for item in entry["spans"]] == ["work"]
+    assert entry["message"].startswith("GET /traced 200 in ")
@@ -0,0 +1,58 @@
+import io
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from main import app
+from services import memory
+from services.memory import MemoryMiddleware, REQUEST_MEMORY_PEAK, estimate_forecast_bytes
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_BUDGET_MB", 0.5)
+
+def statement_bytes(rows: int) -> bytes:
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=rows),
+        "Description": [f"Grocery Store {i}" for i in range(rows)],
+        "Amount": [-12.5] * rows
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def test_upload_over_budget_is_rejected(client, auth_headers, small_budget):
+    before = memory.MEMORY_BUDGET_REJECTIONS.value("excel")
+    response = client.post(
+        "/upload/excel",
+        files={"file": ("big.xlsx", statement_bytes(500), XLSX_TYPE)},
+        headers=auth_headers
+    )
+    assert response.status_code == 413
+    assert memory.MEMORY_BUDGET_REJECTIONS.value("excel") == before + 1
+
+def test_forecast_over_budget_is_rejected(client, auth_headers, stored_file_id, small_budget):
+    assert estimate_forecast_bytes(28, 30) > 0.5 * 2**20
+    response = client.get("/predict/expenses", params={"file_id": stored_file_id}, headers=auth_headers)
+    assert response.status_code == 413
+
+def test_tracked_requests_record_peak(client, auth_headers, stored_file_id, monkeypatch):
+    middleware = next(m for m in app.user_middleware if m.cls is MemoryMiddleware)
+    monkeypatch.setitem(middleware.options, "mode", "tracemalloc")
+    monkeypatch.setattr(app, "middleware_stack", app.build_middleware_stack())
+
+    before = REQUEST_MEMORY_PEAK.count("/predict/savings")
+    try:
+        response = client.get("/predict/savings", params={"file_id": stored_file_id}, headers=auth_headers)
+    finally:
+        tracemalloc.stop()
+    assert response.status_code == 200
+    assert REQUEST_MEMORY_PEAK.count("/predict/savings") == before + 1
+
+def test_rss_peak_ignores_earlier_high_water_mark(monkeypatch):
+    # An earlier request pushed the process peak to 500 MB; this one allocates nothing
+    monkeypatch.setattr(memory, "_peak_rss", lambda: 500 * 2**20)
+    monkeypatch.setattr(memory, "_current_rss", lambda: 100 * 2**20)
+    assert memory._Measurement("rss").finish() == (0, 0)
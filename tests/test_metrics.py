@@ -0,0 +1,63 @@
+import threading
+
+from services.metrics import Counter, Histogram, REGISTRY, REQUEST_LATENCY
+
+def test_metrics_sum_thread_shards():
+    counter = Counter("test_events_total", "Events", ("kind",))
+    histogram = Histogram("test_duration_seconds", "Durations", buckets=(0.1, 1.0))
+    try:
+        def work():
+            for _ in range(1000):
+                counter.inc("a")
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value("a") == 4000
+        assert histogram.count() == 4000
+        lines = histogram.render()
+        assert 'test_duration_seconds_bucket{le="0.1"} 0' in lines
+        assert 'test_duration_seconds_bucket{le="1"} 4000' in lines
+        assert 'test_duration_seconds_bucket{le="+Inf"} 4000' in lines
+        assert "test_duration_seconds_sum 2000" in lines
+    finally:
+        REGISTRY.remove(counter)
+        REGISTRY.remove(histogram)
+
+def test_metrics_endpoint(client, auth_headers, stored_file_id):
+    route = "/analysis/spending"
+    before = REQUEST_LATENCY.count("GET", route, "200")
+    response = client.get(route, params={"file_id": stored_file_id}, headers=auth_headers)
+    etag = response.headers["etag"]
+    client.get(route, params={"file_id": stored_file_id}, headers={**auth_headers, "If-None-Match": etag})
+    assert REQUEST_LATENCY.count("GET", route, "200") == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert f'http_request_duration_seconds_count{{method="GET",route="{route}",status="304"}}' in body
+    assert 'cache_lookups_total{cache="http_conditional",result="hit"}' in body
+    assert 'cache_hit_ratio{cache="http_conditional"}' in body
+    assert "http_requests_in_flight 1" in body
+    assert "threadpool_queue_depth" in body
+
+def test_server_timing_header(client, auth_headers, stored_file_id):
+    response = client.get(
+        "/dashboard/summary",
+        params={"file_id": stored_file_id},
+        headers={**auth_headers, "X-Request-ID": "req-123"}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "req-123"
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert stages[0] == "auth"
+    assert {"load", "aggregate"} <= set(stages)
+    assert stages[-1] == "total"
+
+    response = client.get("/metrics")
+    assert 'stage_duration_seconds_count{stage="aggregate"}' in response.text
@@ -0,0 +1,38 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.profiling import ProfilingMiddleware
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def test_admin_header_profiles_request(tmp_path):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        busy_wait(0.1)
+        return {"item_id": item_id}
+
+    app.add_middleware(ProfilingMiddleware, admin_token="secret", interval_ms=1, profile_dir=str(tmp_path))
+    client = TestClient(app)
+
+    response = client.get("/items/1")
+    assert "x-profile-id" not in response.headers
+    assert not any(tmp_path.iterdir())
+
+    response = client.get("/items/2", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    summary = json.loads((tmp_path / "items_item_id" / f"{profile_id}.json").read_text())
+    assert summary["route"] == "/items/{item_id}"
+    assert summary["status"] == 200
+    assert summary["samples"] > 10
+    folded = (tmp_path / "items_item_id" / f"{profile_id}.folded").read_text()
+    assert "busy_wait" in folded
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+import main
+import services.rate_limit
+from services.rate_limit import CostClass, LocalLimiter, RateLimited, SharedLimiter
+from services.shared_cache import MemoryBackend
+
+CLASSES = {"forecast": CostClass(per_minute=6, burst=2, concurrency=1)}
+
+@pytest.fixture(params=["local", "shared"])
+def limiter(request):
+    if request.param == "local":
+        return LocalLimiter(CLASSES)
+    return SharedLimiter(MemoryBackend(), {"forecast": CostClass(per_minute=2, burst=2, concurrency=1)})
+
+def test_concurrency_cap_and_rate(limiter):
+    limiter.acquire("alice", "/predict/expenses", "forecast")
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire("alice", "/predict/savings", "forecast")
+    assert error.value.reason == "concurrency"
+    limiter.acquire("bob", "/predict/expenses", "forecast")
+    limiter.release("alice", "forecast")
+
+    limiter.acquire("alice", "/predict/expenses", "forecast")
+    limiter.release("alice", "forecast")
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire("alice", "/predict/expenses", "forecast")
+    assert error.value.reason == "rate"
+    assert error.value.retry_after >= 1
+
+def test_shared_slot_lease_expiring_mid_request(monkeypatch):
+    monkeypatch.setattr(services.rate_limit, "SLOT_LEASE_SECONDS", 0.1)
+    limiter = SharedLimiter(MemoryBackend(), {"forecast": CostClass(per_minute=60, burst=10, concurrency=1)})
+    limiter.acquire("alice", "/predict/expenses", "forecast")
+    time.sleep(0.15)  # the request outlives the lease
+    limiter.release("alice", "forecast")
+
+    # The cap still holds afterwards
+    limiter.acquire("alice", "/predict/expenses", "forecast")
+    with pytest.raises(RateLimited):
+        limiter.acquire("alice", "/predict/savings", "forecast")
+    limiter.release("alice", "forecast")
+    limiter.acquire("alice", "/predict/savings", "forecast")
+
+def test_token_bucket_retry_after():
+    limiter = LocalLimiter(CLASSES)
+    for _ in range(2):
+        limiter.acquire("alice", "/predict/expenses", "forecast")
+        limiter.release("alice", "forecast")
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire("alice", "/predict/expenses", "forecast")
+    assert error.value.retry_after == 10  # one token every 10 seconds at 6/min
+
+def test_refilled_buckets_are_dropped(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(services.rate_limit.time, "monotonic", lambda: clock[0])
+    limiter = LocalLimiter(CLASSES)
+    for user in ("alice", "bob"):
+        limiter.acquire(user, "/predict/expenses", "forecast")
+        limiter.release(user, "forecast")
+    assert len(limiter._buckets) == 2 and limiter._active == {}
+
+    # alice's bucket refills in 10 seconds; bob keeps using his
+    clock[0] += services.rate_limit.BUCKET_SWEEP_SECONDS
+    limiter.acquire("bob", "/predict/expenses", "forecast")
+    assert list(limiter._buckets) == [("bob", "/predict/expenses")]
+
+    # A dropped bucket starts full again
+    limiter.acquire("alice", "/predict/expenses", "forecast")
+    limiter.release("alice", "forecast")
+    limiter.acquire("alice", "/predict/expenses", "forecast")
+
+def test_endpoint_returns_429(client, auth_headers, stored_file_id, monkeypatch):
+    monkeypatch.setattr(main, "limiter", LocalLimiter({**main.limiter.classes, "forecast": CostClass(1, 1, 1)}))
+    params = {"file_id": stored_file_id, "horizon_days": 7}
+    assert client.get("/predict/expenses", params=params, headers=auth_headers).status_code == 200
+
+    response = client.get("/predict/expenses", params=params, headers=auth_headers)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
+    # Concurrency slots are released after each response
+    assert main.limiter._active.get(("testuser", "forecast"), 0) == 0
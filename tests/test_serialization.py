@@ -0,0 +1,39 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from models.financial import TransactionCategory
+from services.serialization import dumps, loads, dataframe_to_records
+
+def test_dumps_handles_numpy_and_pandas_types():
+    payload = {
+        "timestamp": pd.Timestamp("2024-03-01"),
+        "missing": pd.NaT,
+        "count": np.int64(3),
+        "value": np.float32(1.5),
+        "nan": float("nan"),
+        "category": TransactionCategory.EXPENSE,
+        "when": datetime.datetime(2024, 3, 1, 12, 30),
+    }
+    assert loads(dumps(payload)) == {
+        "timestamp": "2024-03-01T00:00:00",
+        "missing": None,
+        "count": 3,
+        "value": 1.5,
+        "nan": None,
+        "category": "expense",
+        "when": "2024-03-01T12:30:00",
+    }
+
+def test_dataframe_to_records_matches_to_dict():
+    df = pd.DataFrame({
+        "ds": pd.date_range("2024-03-01", periods=3, freq="D"),
+        "yhat": [1.0, 2.5, np.nan],
+    })
+    records = loads(dumps(dataframe_to_records(df)))
+    assert records == [
+        {"ds": "2024-03-01T00:00:00", "yhat": 1.0},
+        {"ds": "2024-03-02T00:00:00", "yhat": 2.5},
+        {"ds": "2024-03-03T00:00:00", "yhat": None},
+    ]
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+import services.shared_cache
+from services.shared_cache import MemoryBackend, SQLiteBackend, compute_once
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+
+def test_add_is_exclusive_until_expiry(backend):
+    assert backend.add("job:a", b"running", ttl=0.2)
+    assert not backend.add("job:a", b"running", ttl=0.2)
+    time.sleep(0.25)
+    assert backend.get("job:a") is None
+    assert backend.add("job:a", b"running", ttl=0.2)
+    backend.delete("job:a")
+    assert backend.get("job:a") is None
+
+def test_counters(backend):
+    assert backend.decr("slots") == 0
+    assert backend.get("slots") is None
+    assert backend.incr("slots", 1, ttl=0.2) == 1
+    assert backend.incr("slots", 1, ttl=0.2) == 2
+    assert backend.decr("slots", 3, ttl=0.2) == 0
+    time.sleep(0.25)
+    assert backend.get("slots") is None
+
+def test_expired_entries_are_purged(backend, monkeypatch):
+    monkeypatch.setattr(services.shared_cache, "PURGE_EVERY_WRITES", 3)
+    backend.set("old", b"1", ttl=0.05)
+    backend.set("kept", b"2")
+    time.sleep(0.1)
+    backend.set("new", b"3", ttl=60)  # third write purges
+    assert backend.purge_expired() == 0
+    assert backend.get("kept") == b"2" and backend.get("new") == b"3"
+
+    backend.set("old", b"1", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.purge_expired() == 1
+
+def test_compute_once_runs_a_job_once(backend):
+    calls = []
+
+    def fit():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"yhat": [1.0, 2.0]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(compute_once("forecast:x", fit, backend=backend)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"yhat": [1.0, 2.0]}] * 4
+    assert compute_once("forecast:x", fit, backend=backend) == {"yhat": [1.0, 2.0]}
+    assert len(calls) == 1
+
+def test_failed_job_is_not_cached(backend):
+    def fail():
+        raise ValueError("no data")
+
+    with pytest.raises(ValueError):
+        compute_once("forecast:y", fail, backend=backend)
+    assert compute_once("forecast:y", lambda: 42, backend=backend) == 42
+
+def test_forecast_is_reused(client, auth_headers, stored_file_id):
+    from services.metrics import CACHE_LOOKUPS
+
+    params = {"file_id": stored_file_id, "horizon_days": 7}
+    first = client.get("/predict/expenses", params=params, headers=auth_headers)
+    hits = CACHE_LOOKUPS.value("shared_results", "hit")
+    second = client.get("/predict/expenses", params=params, headers=auth_headers)
+    assert second.status_code == 200
+    assert CACHE_LOOKUPS.value("shared_results", "hit") == hits + 1
+    assert second.json() == first.json()
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pytest
+
+from services.serialization import dumps
+from services.storage import (
+    delete_statement, get_file_path, load_statement, save_statement, stored_bytes, stored_paths, update_lock
+)
+
+def test_columns_are_memory_mapped(stored_file_id):
+    table, info = load_statement(stored_file_id)
+    assert len(table) == 200 and info["user_id"] == "testuser"
+    assert isinstance(table.amount_cents.base, np.memmap)
+    assert not table.amount_cents.flags.writeable
+
+    window, _ = load_statement(stored_file_id, start=date(2024, 3, 5), end=date(2024, 3, 6))
+    assert len(window) == int(((table.dates >= np.datetime64("2024-03-05")) & (table.dates < np.datetime64("2024-03-07"))).sum())
+    assert np.shares_memory(window.dates, window.dates.base)
+    assert window.to_records() == table.between(date(2024, 3, 5), date(2024, 3, 6)).to_records()
+
+def test_rewrite_replaces_the_column_generation(stored_file_id):
+    table, info = load_statement(stored_file_id)
+    save_statement(stored_file_id, table[:50], info)
+
+    # Mappings taken before the rewrite stay readable
+    assert len(table.to_records()) == 200
+    assert len(load_statement(stored_file_id)[0]) == 50
+    generations = {os.path.dirname(path) for path in stored_paths(stored_file_id) if path.endswith(".npy")}
+    assert len(generations) == 1
+
+def test_concurrent_saves_keep_the_named_generation(stored_file_id):
+    table, info = load_statement(stored_file_id)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda rows: save_statement(stored_file_id, table[:rows], info), range(100, 116)))
+
+    assert len(load_statement(stored_file_id)[0]) in range(100, 116)
+    generations = {os.path.dirname(path) for path in stored_paths(stored_file_id) if path.endswith(".npy")}
+    assert len(generations) == 1
+
+def test_updates_under_the_update_lock_are_not_lost(stored_file_id):
+    extra, _ = load_statement(stored_file_id)
+
+    def append_row(row):
+        with update_lock(stored_file_id):
+            table, info = load_statement(stored_file_id)
+            save_statement(stored_file_id, table.concat(extra[row:row + 1]), info)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(append_row, range(8)))
+    assert len(load_statement(stored_file_id)[0]) == 208
+
+def test_delete_removes_document_and_columns(stored_file_id):
+    paths = stored_paths(stored_file_id)
+    assert get_file_path(stored_file_id) in paths and len(paths) > 1
+    size = sum(os.path.getsize(path) for path in paths)
+    assert delete_statement(stored_file_id) == size
+    assert stored_paths(stored_file_id) == [] and stored_bytes(stored_file_id) == 0
+    with pytest.raises(FileNotFoundError):
+        load_statement(stored_file_id)
+
+def test_documents_with_inline_columns_still_load(stored_file_id):
+    table, info = load_statement(stored_file_id)
+    with open(get_file_path(stored_file_id), "wb") as f:
+        f.write(dumps({**info, "sorted_by_date": True, "columns": table.to_columns()}))
+
+    restored, restored_info = load_statement(stored_file_id, start=date(2024, 3, 5))
+    assert restored_info["user_id"] == "testuser"
+    assert restored.to_records() == table.between(start=date(2024, 3, 5)).to_records()
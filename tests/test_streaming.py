@@ -0,0 +1,54 @@
+import json
+
+from services.storage import load_statement, save_statement
+
+def test_transactions_cursor_pagination(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id, "limit": 64}
+    seen = []
+    while True:
+        response = client.get("/transactions", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert page["total"] == 200
+        seen.extend(page["transactions"])
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert len({t["id"] for t in seen}) == 200
+    assert [t["date"] for t in seen] == sorted(t["date"] for t in seen)
+
+    # Cursors stop working once the stored file changes
+    table, info = load_statement(stored_file_id)
+    save_statement(stored_file_id, table[:100], info)
+    response = client.get("/transactions", params=params, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_cursor_is_bound_to_its_window(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id, "start": "2024-03-05", "limit": 10}
+    cursor = client.get("/transactions", params=params, headers=auth_headers).json()["next_cursor"]
+    assert client.get("/transactions", params={**params, "cursor": cursor}, headers=auth_headers).status_code == 200
+
+    response = client.get("/transactions", params={**params, "start": "2024-03-10", "cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_conditional_request_checks_ownership_first(client, auth_headers, stored_file_id):
+    table, info = load_statement(stored_file_id)
+    save_statement(stored_file_id, table, {**info, "user_id": "someone-else"})
+    response = client.get(
+        "/transactions", params={"file_id": stored_file_id}, headers={**auth_headers, "If-None-Match": "*"}
+    )
+    assert response.status_code == 403
+
+def test_ndjson_matches_json(client, auth_headers, stored_file_id):
+    params = {"file_id": stored_file_id}
+    cashflow = client.get("/analysis/cashflow", params=params, headers=auth_headers).json()
+
+    response = client.get("/analysis/cashflow", params={**params, "format": "ndjson"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {row.pop("date"): row for row in rows} == cashflow["cashflow_by_date"]
+
+    response = client.get("/transactions", params={**params, "format": "ndjson"}, headers=auth_headers)
+    assert len(response.text.splitlines()) == 200
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from models.financial import TransactionCategory
+from models.transaction_table import TransactionTable
+from services.aggregation import aggregate_transactions, build_cashflow, build_spending
+from services.serialization import dumps, loads
+
+RECORDS = [
+    {"id": "a", "date": "2024-03-01T00:00:00", "description": "Rent Payment", "amount": 1500.0,
+     "category": "expense", "subcategory": "Housing", "tags": ["potential_anomaly"], "metadata": {}},
+    {"id": "b", "date": datetime(2024, 3, 2, 9, 30), "description": "Salary Deposit", "amount": 5000.0,
+     "category": TransactionCategory.INCOME, "subcategory": "Salary", "tags": [], "metadata": {"source": "excel"}},
+    {"id": "c", "date": "2024-03-03", "description": "Rent Payment", "amount": 1500.0,
+     "category": "expense", "subcategory": "Housing", "tags": [], "metadata": {}},
+]
+
+def test_records_round_trip_through_columns():
+    table = TransactionTable.from_records(RECORDS)
+    assert len(table) == 3
+    assert table.description_values == ["Rent Payment", "Salary Deposit"]
+
+    restored = TransactionTable.from_columns(loads(dumps(table.to_columns())))
+    records = restored.to_records()
+    assert records[1] == {
+        "id": "b", "date": "2024-03-02T09:30:00", "description": "Salary Deposit", "amount": 5000.0,
+        "category": "income", "subcategory": "Salary", "tags": [], "metadata": {"source": "excel"},
+        "anomaly_score": 0.0
+    }
+    assert records[2]["date"] == "2024-03-03T00:00:00"
+    assert records[0]["tags"] == ["potential_anomaly"]
+
+def test_concat_merges_interned_values():
+    first = TransactionTable.from_records(RECORDS[:1])
+    second = TransactionTable.from_records(RECORDS[1:])
+    merged = first.concat(second)
+    assert [r["id"] for r in merged.to_records()] == ["a", "b", "c"]
+    assert merged.descriptions().tolist() == ["Rent Payment", "Salary Deposit", "Rent Payment"]
+    assert merged[merged.category_mask(TransactionCategory.EXPENSE)].amounts.tolist() == [1500.0, 1500.0]
+
+def test_dedup_keys():
+    table = TransactionTable.from_records(RECORDS)
+    assert ("2024-03-03", 150000, "Rent Payment") in table.dedup_keys()
+
+def test_totals_are_exact_in_cents():
+    records = [
+        {"id": str(i), "date": "2024-03-01", "description": "Coffee", "amount": 0.1,
+         "category": "expense", "subcategory": "Food"}
+        for i in range(1000)
+    ]
+    table = TransactionTable.from_records(records)
+    assert table.amount_cents.dtype == "int64"
+
+    aggregates = aggregate_transactions(table)
+    assert aggregates["totals_cents"][TransactionCategory.EXPENSE] == 10000
+    assert build_spending(aggregates)["total_spending"] == 100.0
+    assert build_cashflow(aggregates)["cashflow_by_date"]["2024-03-01"]["expense"] == 100.0
+    assert sum(r["amount"] for r in records) != 100.0